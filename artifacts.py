@@ -0,0 +1,216 @@
+# Failure artifacts: a screenshot, the form's serialized HTML and the page's network timings,
+# captured only for attempts that failed (submission .error, fill/navigation exceptions).
+# Successful attempts pay nothing: there are no listeners or tracing on the page. The network
+# trace is read from the browser's own Resource/Navigation Timing buffer at failure time.
+# The page is read on the failing attempt, then compressing and writing the files is handed to
+# a background thread. Output goes to ARTIFACTS_DIR/<run_id>/<page>-<region>-<n>/ and stops once
+# ARTIFACTS_MAX_MB would be exceeded: each capture reserves its (uncompressed) size when it is
+# queued, so a burst of failures cannot overshoot the budget before the writer catches up. At
+# most ARTIFACTS_QUEUE_SIZE captures wait in memory; failures beyond that are counted as dropped.
+import gzip
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Dict, Optional
+
+from playwright.async_api import Page
+
+from data_models import AttemptRecord
+from schema_cache import page_key
+
+from config import (
+    ARTIFACT_SCREENSHOT_TIMEOUT_MS,
+    ARTIFACTS_DIR,
+    ARTIFACTS_MAX_MB,
+    ARTIFACTS_QUEUE_SIZE,
+)
+
+# Attempt statuses that trigger a capture
+CAPTURE_STATUSES = frozenset(["submission_error", "error"])
+
+# JPEG keeps full-page screenshots small; quality is plenty to read an error message
+SCREENSHOT_QUALITY = 60
+
+# The first form with its current values written into the markup (outerHTML alone only has the
+# values the page was served with), or the whole document when there is no form (error pages)
+_FORM_HTML_JS = """
+() => {
+  const form = document.querySelector("form");
+  if (!form) return document.documentElement.outerHTML;
+  const copy = form.cloneNode(true);
+  const live = form.querySelectorAll("input, select, textarea");
+  copy.querySelectorAll("input, select, textarea").forEach((el, i) => {
+    const src = live[i];
+    if (el.tagName === "SELECT") {
+      Array.from(el.options).forEach((o, j) => {
+        o.toggleAttribute("selected", src.options[j].selected);
+      });
+    } else if (el.type === "checkbox" || el.type === "radio") {
+      el.toggleAttribute("checked", src.checked);
+    } else if (el.tagName === "TEXTAREA") {
+      el.textContent = src.value;
+    } else {
+      el.setAttribute("value", src.value);
+    }
+  });
+  return copy.outerHTML;
+}
+"""
+
+# Navigation + resource timing entries: what the page loaded, when, how long it took
+_NETWORK_JS = """
+() => performance.getEntries()
+  .filter((e) => e.entryType === "navigation" || e.entryType === "resource")
+  .map((e) => ({
+    url: e.name,
+    type: e.entryType === "navigation" ? "navigation" : e.initiatorType,
+    start_ms: Math.round(e.startTime),
+    duration_ms: Math.round(e.duration),
+    status: e.responseStatus ?? null,
+    transfer_bytes: e.transferSize ?? null,
+  }))
+"""
+
+
+# Folder name for one capture, e.g. CSI-283316-US-3 (a hash of the URL when it has no page key)
+def artifact_name(url: str, region: str, serial: int) -> str:
+    key = page_key(url)
+    name = "-".join(key) if key else hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]  # nosec
+    return f"{name}-{region}-{serial}"
+
+
+class ArtifactStore:
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        screenshot_timeout_ms: float = ARTIFACT_SCREENSHOT_TIMEOUT_MS,
+        queue_size: int = ARTIFACTS_QUEUE_SIZE,
+    ) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes  # 0 = no budget
+        self.screenshot_timeout_ms = screenshot_timeout_ms
+        self.bytes_written = 0  # Updated by the writer thread
+        self.captured = 0
+        self.dropped = 0  # Failures not captured because the budget was used up
+        self.dropped_busy = 0  # ... because ARTIFACTS_QUEUE_SIZE captures were already waiting
+        self._serial = 0
+        # Bytes counted against the budget: written files plus the estimates of queued captures
+        self._reserved = 0
+        self._lock = threading.Lock()  # _reserved is updated by both threads
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+        self._thread.start()
+
+    def over_budget(self, extra: int = 0) -> bool:
+        return bool(self.max_bytes) and self._reserved + extra > self.max_bytes
+
+    # Counts `size` bytes against the budget; False when they do not fit
+    def _reserve(self, size: int) -> bool:
+        with self._lock:
+            if self.over_budget(size):
+                return False
+            self._reserved += size
+            return True
+
+    def _release(self, size: int) -> None:
+        with self._lock:
+            self._reserved -= size
+
+    # Reads the failure evidence from the page and queues it for writing. Sets attempt.artifacts
+    # to the capture folder. Never raises: a page that cannot be read still gets what could be.
+    async def capture(self, page: Page, attempt: AttemptRecord) -> None:
+        if self.max_bytes and self._reserved >= self.max_bytes:
+            self.dropped += 1  # Used up: not even worth reading the page
+            return
+        if self._queue.full():
+            self.dropped_busy += 1
+            return
+        self._serial += 1
+        folder = os.path.join(
+            self.directory, artifact_name(attempt.url, attempt.region, self._serial)
+        )
+        files: Dict[str, bytes] = {}
+        try:
+            files["screenshot.jpg"] = await page.screenshot(
+                type="jpeg",
+                quality=SCREENSHOT_QUALITY,
+                full_page=True,
+                timeout=self.screenshot_timeout_ms,
+            )
+        except Exception as e:
+            logging.warning(f"No failure screenshot for {attempt.url} ({attempt.region}): {e}")
+        try:
+            files["form.html"] = (await page.evaluate(_FORM_HTML_JS)).encode("utf-8")
+            entries = await page.evaluate(_NETWORK_JS)
+            files["network.json"] = json.dumps(entries, indent=1).encode("utf-8")
+        except Exception as e:
+            logging.warning(
+                f"No failure DOM/network dump for {attempt.url} ({attempt.region}): {e}"
+            )
+        files["attempt.json"] = attempt.model_dump_json(indent=1).encode("utf-8")
+        # Upper bound of what the writer will put on disk (gzip only makes the text smaller)
+        estimate = sum(len(data) for data in files.values())
+        if not self._reserve(estimate):
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait((folder, files, estimate))
+        except queue.Full:
+            self._release(estimate)
+            self.dropped_busy += 1
+            return
+        attempt.artifacts = folder
+        self.captured += 1
+
+    # Writer thread: gzips text files (JPEG is already compressed) and writes them to disk
+    def _run(self) -> None:
+        for item in iter(self._queue.get, None):
+            try:
+                self._write(*item)
+            except Exception as e:
+                logging.error(f"Could not write failure artifacts to {item[0]}: {e}")
+
+    # Writes one capture, then swaps its reserved estimate for the bytes actually written
+    def _write(self, folder: str, files: Dict[str, bytes], estimate: int) -> None:
+        written = 0
+        try:
+            os.makedirs(folder, exist_ok=True)
+            for name, data in files.items():
+                if not name.endswith(".jpg"):
+                    name, data = name + ".gz", gzip.compress(data, compresslevel=6)
+                with open(os.path.join(folder, name), "wb") as f:
+                    f.write(data)
+                written += len(data)
+        finally:
+            self.bytes_written += written
+            self._release(estimate - written)
+
+    # Waits for queued captures to be written
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    # One-line report for the end-of-run log
+    def summary(self) -> str:
+        line = (
+            f"Failure artifacts: {self.captured} captures, "
+            f"{self.bytes_written / 1_048_576:.1f} MB in {self.directory}"
+        )
+        if self.dropped:
+            line += f" ({self.dropped} failures not captured: ARTIFACTS_MAX_MB reached)"
+        if self.dropped_busy:
+            line += f" ({self.dropped_busy} failures not captured: writer queue full)"
+        return line
+
+
+# Store per config.py (None when ARTIFACTS_DIR is empty). Each run writes to its own folder;
+# sharded runs split the disk budget across the `share` processes.
+def artifacts_from_config(run_id: str, share: int = 1) -> Optional[ArtifactStore]:
+    if not ARTIFACTS_DIR:
+        return None
+    max_bytes = int(ARTIFACTS_MAX_MB * 1_048_576 / max(1, share))
+    return ArtifactStore(os.path.join(ARTIFACTS_DIR, run_id), max_bytes)
@@ -0,0 +1,281 @@
+# Pooled browser manager.
+# One long-lived Chromium lends out fresh browser contexts, so a run (or a whole pytest session)
+# pays browser startup once instead of once per test case. Before each loan the browser is
+# health-checked (relaunched if it crashed or disconnected), and after a configurable number
+# of loans it is retired and replaced, so a long run never keeps one renderer process forever.
+# Contexts lent for a known URL can record or replay that page's traffic as HAR (har_replay.py).
+# Outside HAR mode, a context lent for a URL is kept after use and lent again to the next URL of
+# the same host, so pages of one gateway host share cookies/storage, HTTP cache and keep-alive
+# connections. A context is only ever lent to one URL at a time, so regions running in parallel
+# still get separate contexts.
+# Long runs also retire a host context after CONTEXT_MAX_USES URLs, and the browser as soon as the
+# memory policy asks for it (request_recycle, see memory.py), so renderer memory and listeners
+# leaked by pages never pile up for the whole run.
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Dict, List, Optional, TypeVar
+
+from playwright.async_api import (
+    APIRequestContext,
+    Browser,
+    BrowserContext,
+    Playwright,
+    async_playwright,
+)
+
+from config import (
+    BROWSER_RECYCLE_AFTER,
+    CONTEXT_MAX_USES,
+    HAR_DIR,
+    HAR_MODE,
+    REUSE_HOST_CONTEXTS,
+    HOST_CONTEXTS_MAX_IDLE,
+)
+from har_replay import HAR_MODES, attach_har
+from network_profile import (
+    NetworkProfile,
+    NetworkStats,
+    apply_network_profile,
+    host_of,
+    profile_from_config,
+)
+
+T = TypeVar("T")
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        headless: bool = True,
+        recycle_after: int = BROWSER_RECYCLE_AFTER,
+        network_profile: Optional[NetworkProfile] = None,
+        har_mode: str = HAR_MODE,
+        har_dir: str = HAR_DIR,
+        reuse_host_contexts: bool = REUSE_HOST_CONTEXTS,
+        max_idle_per_host: int = HOST_CONTEXTS_MAX_IDLE,
+        context_max_uses: int = CONTEXT_MAX_USES,
+    ) -> None:
+        if har_mode not in HAR_MODES:
+            raise ValueError(f"Unsupported HAR mode: {har_mode} (expected one of {HAR_MODES})")
+        self.headless = headless
+        self.recycle_after = recycle_after  # Contexts lent by one browser before it is replaced
+        self.network_profile = network_profile or profile_from_config()
+        self.network_stats = NetworkStats()
+        self.har_mode = har_mode  # "off", "record" or "replay"
+        self.har_dir = har_dir
+        # HAR routes are attached per URL, so recorded/replayed contexts are never shared
+        self.reuse_host_contexts = reuse_host_contexts and har_mode == "off"
+        self.max_idle_per_host = max_idle_per_host  # Unused contexts kept per host
+        self.context_max_uses = context_max_uses  # URLs per host context before it is closed
+
+        self.launches = 0  # How many browsers were started (1 for a healthy run)
+        self.contexts_lent = 0
+        self.contexts_reused = 0  # Loans served by an idle context of the same host
+        self.recycles: Dict[str, int] = {}  # Browsers retired early, per reason
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._lent_by_current = 0  # Loans made by the current browser
+        self._open_contexts: Dict[Browser, int] = {}  # Contexts still open, per browser
+        self._retired: set = set()  # Browsers waiting for their last context to close
+        self._idle: Dict[str, List[BrowserContext]] = {}  # Contexts ready for reuse, per host
+        self._context_hosts: Dict[BrowserContext, str] = {}  # Host a reusable context belongs to
+        self._context_uses: Dict[BrowserContext, int] = {}  # Loans of each reusable context
+        self._recycle_reason: Optional[str] = None  # Set by request_recycle()
+        self._request: Optional[APIRequestContext] = None  # HTTP client, created on first use
+        self._lock = asyncio.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Only set by start_sync()
+
+    # Starts Playwright and the first browser
+    async def start(self) -> "BrowserPool":
+        self._playwright = await async_playwright().start()
+        await self._launch()
+        return self
+
+    async def _launch(self) -> None:
+        self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        self._open_contexts[self._browser] = 0
+        self._lent_by_current = 0
+        self._recycle_reason = None  # A fresh browser answers any pending recycle request
+        self.launches += 1
+        logging.info(f"Browser pool launched Chromium (launch #{self.launches})")
+
+    # Health check + recycling, done before every loan
+    async def _ensure_browser(self) -> Browser:
+        browser = self._browser
+        if browser is None or not browser.is_connected():
+            logging.warning("Browser pool: browser disconnected, relaunching")
+            if browser is not None:
+                await self._drop_idle(browser)
+                self._open_contexts.pop(browser, None)
+            await self._launch()
+        elif self._recycle_reason or (
+            self.recycle_after and self._lent_by_current >= self.recycle_after
+        ):
+            # Retire the old browser; it is closed once its last lent context comes back
+            if self._recycle_reason:
+                logging.info(f"Browser pool: recycling browser ({self._recycle_reason})")
+                self.recycles[self._recycle_reason] = self.recycles.get(self._recycle_reason, 0) + 1
+            self._retired.add(browser)
+            await self._drop_idle(browser)
+            await self._close_if_idle(browser)
+            await self._launch()
+        return self._browser
+
+    # Closes the idle host contexts of a browser that is being retired or was lost
+    async def _drop_idle(self, browser: Browser) -> None:
+        for host, contexts in list(self._idle.items()):
+            keep = [c for c in contexts if c.browser is not browser]
+            for context in contexts:
+                if context.browser is browser:
+                    self._context_hosts.pop(context, None)
+                    self._context_uses.pop(context, None)
+                    if browser in self._open_contexts:
+                        self._open_contexts[browser] -= 1
+                    try:
+                        await context.close()
+                    except Exception as e:
+                        logging.warning(f"Browser pool: failed to close idle context: {e}")
+            if keep:
+                self._idle[host] = keep
+            else:
+                del self._idle[host]
+
+    async def _close_if_idle(self, browser: Browser) -> None:
+        if browser in self._retired and self._open_contexts.get(browser, 0) == 0:
+            self._retired.discard(browser)
+            self._open_contexts.pop(browser, None)
+            try:
+                await browser.close()
+            except Exception as e:
+                logging.warning(f"Browser pool: failed to close retired browser: {e}")
+
+    # Lends a fresh context (network profile attached). Give it back with release().
+    # Pass the URL the context is for to record or replay its traffic in HAR mode.
+    # reuse=False always opens a brand-new context and closes it on release, even when host
+    # contexts are reused (single tests must not inherit another test's cookies or storage).
+    async def new_context(self, url: Optional[str] = None, reuse: bool = True) -> BrowserContext:
+        reusable = url is not None and reuse and self.reuse_host_contexts
+        host = host_of(url) if reusable else ""
+        async with self._lock:
+            browser = await self._ensure_browser()
+            self._lent_by_current += 1
+            self.contexts_lent += 1
+            idle = self._idle.get(host)
+            if idle:
+                self.contexts_reused += 1
+                context = idle.pop()
+                self._context_uses[context] += 1
+                return context
+            self._open_contexts[browser] = self._open_contexts.get(browser, 0) + 1
+        context = await browser.new_context()
+        await apply_network_profile(context, self.network_profile, self.network_stats)
+        if host:
+            self._context_hosts[context] = host
+            self._context_uses[context] = 1
+        if url is not None:
+            try:
+                await attach_har(context, url, self.har_mode, self.har_dir)
+            except Exception:
+                await self.release(context)
+                raise
+        return context
+
+    # Closes a lent context and lets a retired browser shut down once it is unused.
+    # A host context of the current browser is parked for the next URL of its host instead,
+    # unless reuse=False (e.g. its page hung and was cancelled by the watchdog).
+    async def release(self, context: BrowserContext, reuse: bool = True) -> None:
+        browser = context.browser
+        host = self._context_hosts.get(context)
+        worn_out = 0 < self.context_max_uses <= self._context_uses.get(context, 0)
+        if reuse and host and not worn_out and browser is self._browser and browser.is_connected():
+            try:
+                for page in context.pages:  # Callers normally close their tabs already
+                    await page.close()
+                async with self._lock:
+                    idle = self._idle.setdefault(host, [])
+                    if browser is self._browser and len(idle) < self.max_idle_per_host:
+                        idle.append(context)
+                        return
+            except Exception as e:
+                logging.warning(f"Browser pool: host context not reusable: {e}")
+        self._context_hosts.pop(context, None)
+        self._context_uses.pop(context, None)
+        try:
+            await context.close()
+        except Exception as e:
+            logging.warning(f"Browser pool: failed to close context: {e}")
+        async with self._lock:
+            if browser in self._open_contexts:
+                self._open_contexts[browser] -= 1
+                await self._close_if_idle(browser)
+
+    # Retires the current browser before the next loan (the memory policy calls this when RSS
+    # crosses its limit); contexts already lent finish on the old browser
+    def request_recycle(self, reason: str) -> None:
+        self._recycle_reason = reason
+
+    # `async with pool.context() as context:` — borrow and always give back
+    @asynccontextmanager
+    async def context(
+        self, url: Optional[str] = None, reuse: bool = True
+    ) -> AsyncIterator[BrowserContext]:
+        context = await self.new_context(url, reuse)
+        try:
+            yield context
+        finally:
+            await self.release(context)
+
+    # Pooled HTTP client (keep-alive connections, no browser page) for fetches that do not need
+    # a rendered page, such as the pre-screen stage (prescreen.py)
+    async def api_request(self) -> APIRequestContext:
+        async with self._lock:
+            if self._request is None:
+                self._request = await self._playwright.request.new_context()
+        return self._request
+
+    # Shuts down every browser and Playwright itself
+    async def close(self) -> None:
+        if self._request is not None:
+            try:
+                await self._request.dispose()
+            except Exception as e:
+                logging.warning(f"Browser pool: failed to dispose HTTP client: {e}")
+            self._request = None
+        for browser in list(self._open_contexts):
+            try:
+                await browser.close()
+            except Exception as e:
+                logging.warning(f"Browser pool: failed to close browser: {e}")
+        self._open_contexts.clear()
+        self._retired.clear()
+        self._idle.clear()
+        self._context_hosts.clear()
+        self._context_uses.clear()
+        self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    # --- Synchronous helpers (pytest fixtures and run_test) ---
+    # Playwright objects belong to the event loop that created them, so a pool used from
+    # synchronous code keeps its own loop and runs every coroutine on it.
+
+    @classmethod
+    def start_sync(cls, **kwargs) -> "BrowserPool":
+        pool = cls(**kwargs)
+        pool._loop = asyncio.new_event_loop()
+        pool._loop.run_until_complete(pool.start())
+        return pool
+
+    def run(self, coro: Awaitable[T]) -> T:
+        if self._loop is None:
+            raise RuntimeError("BrowserPool.run() needs a pool created with start_sync()")
+        return self._loop.run_until_complete(coro)
+
+    def close_sync(self) -> None:
+        if self._loop is not None:
+            self._loop.run_until_complete(self.close())
+            self._loop.close()
+            self._loop = None
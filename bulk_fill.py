@@ -0,0 +1,103 @@
+# Bulk form filling: sets many fields with a single page.evaluate call.
+# Each field is set through the native value setter and then gets bubbling input/change events,
+# so page scripts react the same way they do to a normal fill()/select_option().
+from typing import Dict, List, Optional
+
+from playwright.async_api import Page
+
+from data_models import Address
+
+# Credit card test values, kept in config.py like everywhere else
+from config import CREDIT_CARD_NUMBER, CC_EXP_MONTH, CC_EXP_YEAR, CC_CVV
+
+
+# Runs inside the browser. Takes {field name: value} and reports what happened to each field.
+# Only enabled controls the user can see are filled: hidden inputs, and controls hidden by CSS
+# (display:none, visibility:hidden, zero size) are reported as missing, as fill() would refuse them.
+# Selects match an option by value, then by label.
+BULK_FILL_JS = """
+(values) => {
+    const result = { filled: [], missing: [], unmatched: [] };
+    // Same rule as the snapshot and waits.VISIBLE_JS
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        return el.getClientRects().length > 0
+            && (rect.width > 0 || rect.height > 0)
+            && window.getComputedStyle(el).visibility !== "hidden";
+    };
+    const protoFor = (el) =>
+        el instanceof HTMLSelectElement ? HTMLSelectElement.prototype
+        : el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+        : HTMLInputElement.prototype;
+    for (const [name, value] of Object.entries(values)) {
+        const el = Array.from(document.querySelectorAll(
+            `[name="${CSS.escape(name)}"]:not([type="hidden"]):not([disabled])`
+        )).find(isVisible);
+        if (!el) {
+            result.missing.push(name);
+            continue;
+        }
+        let newValue = value;
+        if (el instanceof HTMLSelectElement) {
+            const options = Array.from(el.options);
+            const match = options.find((o) => o.value === value)
+                || options.find((o) => (o.textContent || "").trim() === value);
+            if (!match) {
+                result.unmatched.push(name);
+                continue;
+            }
+            newValue = match.value;
+        }
+        Object.getOwnPropertyDescriptor(protoFor(el), "value").set.call(el, newValue);
+        el.dispatchEvent(new Event("input", { bubbles: true }));
+        el.dispatchEvent(new Event("change", { bubbles: true }));
+        result.filled.push(name);
+    }
+    return result;
+}
+"""
+
+
+# Sets every field in `values` in one round trip.
+# Returns {"filled": [...], "missing": [...], "unmatched": [...]} (field names).
+async def bulk_fill(page: Page, values: Dict[str, str]) -> Dict[str, List[str]]:
+    if not values:
+        return {"filled": [], "missing": [], "unmatched": []}
+    return await page.evaluate(BULK_FILL_JS, values)
+
+
+# Builds the text fields for an address block. prefix is "cds" for the buyer, "cds_donee1" for
+# the gift recipient. address_2 is filler text because some forms expect something there.
+def address_fields(prefix: str, address: Address, address_2: str) -> Dict[str, str]:
+    return {
+        f"{prefix}_name": address.name,
+        f"{prefix}_address_1": address.address1,
+        f"{prefix}_address_2": address_2,
+        f"{prefix}_city": address.city,
+    }
+
+
+# ZIP (US/CAN) or postal code (INTL) for an address block, if the address has one
+def postal_fields(prefix: str, address: Address, region: str) -> Dict[str, str]:
+    if region in ["US", "CAN"] and address.zip:
+        return {f"{prefix}_zip": address.zip}
+    if region == "INTL" and address.postal:
+        return {f"{prefix}_postal": address.postal}
+    return {}
+
+
+# Credit card fields from config.py. The CVV is only included when the page has one.
+def card_fields(include_cvv: bool) -> Dict[str, str]:
+    fields = {
+        "cds_cc_number": CREDIT_CARD_NUMBER,
+        "cds_cc_exp_month": CC_EXP_MONTH,
+        "cds_cc_exp_year": CC_EXP_YEAR,
+    }
+    if include_cvv:
+        fields["cds_cc_security_code"] = CC_CVV
+    return fields
+
+
+# Optional helper for the email field (None and empty emails are left out)
+def email_fields(prefix: str, email: Optional[str]) -> Dict[str, str]:
+    return {f"{prefix}_email": email} if email else {}
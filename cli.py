@@ -0,0 +1,150 @@
+# Headless command-line entry point for batch jobs (cron, CI) - no Tkinter unless --gui is given.
+# URLs are read one per line from a file or stdin and streamed into the engine, so the first
+# URL is being tested while the rest of the list is still being read.
+#   python cli.py urls.txt
+#   cat urls.txt | python cli.py
+#   python cli.py --processes 4 --parallel-regions urls.txt
+#   python cli.py --matrix --pay-types "Credit Card,PayPal" urls.txt
+#   python cli.py --gui                  # Old behaviour: collect the URLs with the Tkinter window
+# Exit status, from the status each URL x region ended with (a failed attempt that a retry
+# fixed does not count):
+#   0 - every region succeeded, was skipped or was carried forward (incremental runs)
+#   1 - at least one region ended failed (status error, submission_error or incomplete), a
+#       region was never attempted (e.g. its worker crashed) or the run itself failed
+#   2 - no URLs to test (or bad arguments, reported by argparse)
+import argparse
+import logging
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from config import MATRIX_MODE, MATRIX_PAY_TYPES, MAX_CONCURRENCY, PARALLEL_REGIONS, SHARD_PROCESSES
+
+# Final region statuses (AttemptRecord.status, or discover_fields.NOT_ATTEMPTED) that make the
+# run fail
+FAILED_STATUSES = frozenset(["error", "submission_error", "incomplete", "not_attempted"])
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_NO_URLS = 2
+
+
+# Yields the URLs of a text stream as they are read, skipping blank lines and # comments
+def iter_urls(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        url = line.strip()
+        if url and not url.startswith("#"):
+            yield url
+
+
+# Exit status for a finished run of `url_count` URLs, from its final region statuses per status.
+# Every URL should end with one status per region; fewer means a worker process was lost.
+def exit_code(url_count: int, final_counts: Dict[str, int], regions_per_url: int) -> int:
+    if url_count == 0:
+        return EXIT_NO_URLS
+    if any(final_counts.get(status) for status in FAILED_STATUSES):
+        return EXIT_FAILED
+    if sum(final_counts.values()) < url_count * regions_per_url:
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fill and submit order forms for a list of URLs.")
+    parser.add_argument(
+        "source",
+        nargs="?",
+        default="-",
+        help="file with one URL per line ('-' or omitted: read from stdin)",
+    )
+    parser.add_argument(
+        "--gui", action="store_true", help="collect the URLs with the Tkinter window instead"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=MAX_CONCURRENCY,
+        help=f"URLs in flight per process (default {MAX_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=SHARD_PROCESSES,
+        help=f"worker processes sharing the URL list (default {SHARD_PROCESSES})",
+    )
+    parser.add_argument(
+        "--parallel-regions",
+        action=argparse.BooleanOptionalAction,
+        default=PARALLEL_REGIONS,
+        help="test US, CAN and INTL of a URL at the same time (--no-parallel-regions: one after "
+        "another, overriding PARALLEL_REGIONS)",
+    )
+    parser.add_argument(
+        "--matrix",
+        action="store_true",
+        default=MATRIX_MODE,
+        help="submit every term x payment type of each region on one filled form",
+    )
+    parser.add_argument(
+        "--pay-types",
+        default=",".join(MATRIX_PAY_TYPES),
+        help="comma-separated payment types for --matrix (default %(default)s)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    # Imported after argument parsing so --help stays instant
+    from discover_fields import REGIONS, configure_logging, run_discovery_stream
+
+    configure_logging()
+
+    pay_types = [t.strip() for t in args.pay_types.split(",") if t.strip()]
+    matrix_pay_types = pay_types if args.matrix else None
+
+    url_source: Iterable[str]
+    stream: Optional[TextIO] = None
+    if args.gui:
+        # Tkinter is only loaded when the window is asked for
+        from gui import get_user_input
+
+        user_input = get_user_input()
+        url_source = user_input.get("urls", [])
+        if user_input.get("matrix"):
+            matrix_pay_types = user_input.get("pay_types", pay_types)
+    elif args.source == "-":
+        url_source = iter_urls(sys.stdin)
+    else:
+        stream = open(args.source, encoding="utf-8")
+        url_source = iter_urls(stream)
+
+    status_counts: Dict[str, int] = {}
+    final_counts: Dict[str, int] = {}
+    try:
+        results = run_discovery_stream(
+            url_source,
+            concurrency=args.concurrency,
+            parallel_regions=args.parallel_regions,
+            processes=args.processes,
+            status_counts=status_counts,
+            matrix_pay_types=matrix_pay_types,
+            final_counts=final_counts,
+        )
+    except Exception as e:
+        # e.g. the browser could not be launched
+        logging.error(f"Run failed: {e}")
+        print(f"Run failed: {e}", file=sys.stderr)
+        return EXIT_FAILED
+    finally:
+        if stream is not None:
+            stream.close()
+
+    tally = ", ".join(f"{status}: {count}" for status, count in sorted(final_counts.items()))
+    attempts = sum(status_counts.values())
+    print(f"{len(results)} URLs tested ({tally or 'no attempts'}; {attempts} attempts in total)")
+    return exit_code(len(results), final_counts, len(REGIONS))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
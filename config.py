@@ -13,3 +13,149 @@ CREDIT_CARD_NUMBER = os.getenv("CREDIT_CARD_NUMBER", "4111111111111111")
 CC_EXP_MONTH = os.getenv("CC_EXP_MONTH", "12")
 CC_EXP_YEAR = os.getenv("CC_EXP_YEAR", "2030")
 CC_CVV = os.getenv("CC_CVV", "123")
+
+# How many URLs run_discovery processes at once (one browser context per URL in flight)
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "4"))
+
+# When true, the US, CAN and INTL checks of a URL run at the same time in separate contexts
+PARALLEL_REGIONS = os.getenv("PARALLEL_REGIONS", "false").lower() in ("1", "true", "yes")
+
+# Network profile for form pages: "lean" aborts non-essential requests, "off" loads everything
+NETWORK_PROFILE = os.getenv("NETWORK_PROFILE", "lean").lower()
+# Resource types that are never needed to fill in a form (comma-separated Playwright types).
+# "stylesheet" is left out by default because CSS decides which gift/postal fields are visible.
+BLOCKED_RESOURCE_TYPES = [
+    t.strip()
+    for t in os.getenv("BLOCKED_RESOURCE_TYPES", "image,media,font").split(",")
+    if t.strip()
+]
+# Extra hosts treated as first party besides the hosts of the URLs under test (allowlist)
+ALLOWED_HOSTS = [h.strip() for h in os.getenv("ALLOWED_HOSTS", "").split(",") if h.strip()]
+# Hosts that are always blocked, e.g. analytics or ad servers (denylist)
+BLOCKED_HOSTS = [h.strip() for h in os.getenv("BLOCKED_HOSTS", "").split(",") if h.strip()]
+# When true, any request to a host outside the allowlist is aborted (except the page itself).
+# Off by default: some gateway pages load the scripts that reveal gift fields from a CDN.
+BLOCK_THIRD_PARTY = os.getenv("BLOCK_THIRD_PARTY", "false").lower() in ("1", "true", "yes")
+
+# The pooled browser is replaced after lending this many contexts (0 = never recycle)
+BROWSER_RECYCLE_AFTER = int(os.getenv("BROWSER_RECYCLE_AFTER", "500"))
+
+# Number of worker processes run_discovery splits the URL list across (1 = single process)
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", "1"))
+
+# On-disk cache of discovered form schemas, keyed by cds_mag_code / cds_page_id ("" disables it)
+SCHEMA_CACHE_PATH = os.getenv("SCHEMA_CACHE_PATH", "cache/form_schema.sqlite")
+# Cached schemas older than this are ignored and rediscovered
+SCHEMA_CACHE_TTL_HOURS = float(os.getenv("SCHEMA_CACHE_TTL_HOURS", "24"))
+# Least recently used schemas are evicted once the cache holds more than this many pages
+SCHEMA_CACHE_MAX_ENTRIES = int(os.getenv("SCHEMA_CACHE_MAX_ENTRIES", "5000"))
+
+# Structured per-attempt result records are appended here as they complete ("" disables a sink)
+RESULTS_JSONL_PATH = os.getenv("RESULTS_JSONL_PATH", "results/attempts.jsonl")
+RESULTS_SQLITE_PATH = os.getenv("RESULTS_SQLITE_PATH", "results/attempts.sqlite")
+# Most SQLite rows inserted per commit by the background writer (it also commits whenever it has
+# caught up, so rows are not held back waiting for a full batch)
+RESULTS_SQLITE_BATCH = int(os.getenv("RESULTS_SQLITE_BATCH", "200"))
+
+# Per-phase tracing: when set, a Chrome trace-event JSON file is written here at the end of the
+# run and a p50/p95/p99 summary per phase is logged ("" turns tracing off)
+TRACE_PATH = os.getenv("TRACE_PATH", "")
+
+# HAR record/replay of gateway pages: "off", "record" (save each page's traffic to HAR_DIR) or
+# "replay" (serve pages from HAR_DIR with no network; order submissions get a stub response)
+HAR_MODE = os.getenv("HAR_MODE", "off").lower()
+HAR_DIR = os.getenv("HAR_DIR", "har")
+
+# Matrix mode: every term x payment type of each supported region is submitted, reusing one
+# filled form. MATRIX_PAY_TYPES limits the payment types (same names as the GUI list; empty = all)
+MATRIX_MODE = os.getenv("MATRIX_MODE", "false").lower() in ("1", "true", "yes")
+MATRIX_PAY_TYPES = [
+    t.strip()
+    for t in os.getenv("MATRIX_PAY_TYPES", "Credit Card,PayPal,Amazon").split(",")
+    if t.strip()
+]
+
+# Retries of failed URL x region attempts (scheduler.py): passes per region for transient
+# failures (1 = no retry), exponential backoff bounds, and terms tried on country mismatches
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "2"))
+RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "30"))
+RETRY_MAX_TERMS = int(os.getenv("RETRY_MAX_TERMS", "5"))
+# Per-host circuit breaker: opens after this many consecutive transient failures (0 = never)
+# and lets one trial request through after BREAKER_RESET_SECONDS
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "60"))
+
+# Contexts are kept per host after use and lent again to later URLs of the same host, so they
+# share cookies/storage, HTTP cache and keep-alive connections (off in HAR mode). At most
+# HOST_CONTEXTS_MAX_IDLE unused contexts are kept per host.
+REUSE_HOST_CONTEXTS = os.getenv("REUSE_HOST_CONTEXTS", "true").lower() in ("1", "true", "yes")
+HOST_CONTEXTS_MAX_IDLE = int(os.getenv("HOST_CONTEXTS_MAX_IDLE", "4"))
+# Token bucket per host for page loads and order submissions: requests per second (0 = no
+# limit) and how many may go out back to back. Sharded runs split the rate across processes.
+HOST_RATE_LIMIT_RPS = float(os.getenv("HOST_RATE_LIMIT_RPS", "0"))
+HOST_RATE_LIMIT_BURST = int(os.getenv("HOST_RATE_LIMIT_BURST", "2"))
+
+# HTTP-only pre-screen: each URL's served HTML is fetched (no browser) and regions its static
+# cds_country field rules out are skipped before any browser context is used (off in HAR mode)
+PRESCREEN = os.getenv("PRESCREEN", "true").lower() in ("1", "true", "yes")
+PRESCREEN_CONCURRENCY = int(os.getenv("PRESCREEN_CONCURRENCY", "8"))
+PRESCREEN_TIMEOUT_MS = float(os.getenv("PRESCREEN_TIMEOUT_MS", "5000"))
+
+# Protocol-level submission: JS-free forms are posted over HTTP (no rendering, no click, no
+# 3 s wait); pages that need JavaScript fall back to the browser (off by default)
+PROTOCOL_SUBMIT = os.getenv("PROTOCOL_SUBMIT", "false").lower() in ("1", "true", "yes")
+PROTOCOL_TIMEOUT_MS = float(os.getenv("PROTOCOL_TIMEOUT_MS", "10000"))
+
+# Form fingerprints and last results per page, stored by every run that loads the form
+# ("" disables the store). In incremental mode a region whose form is unchanged and whose last
+# result passed within INCREMENTAL_MAX_AGE_HOURS is carried forward instead of re-submitted.
+FORM_STATE_PATH = os.getenv("FORM_STATE_PATH", "cache/form_state.sqlite")
+INCREMENTAL = os.getenv("INCREMENTAL", "false").lower() in ("1", "true", "yes")
+INCREMENTAL_MAX_AGE_HOURS = float(os.getenv("INCREMENTAL_MAX_AGE_HOURS", "168"))
+
+# Synthetic buyer/donee data (synthetic_data.py): distinct addresses pre-built per region and
+# handed out one per test (0 = every test uses make_test_data's fixed addresses). Emails are
+# plus-addressed variants of TEST_EMAIL so confirmations still reach one inbox.
+TEST_DATA_POOL_SIZE = int(os.getenv("TEST_DATA_POOL_SIZE", "2000"))
+TEST_EMAIL = os.getenv("TEST_EMAIL", "me@home.com")
+
+# Logging pipeline (log_pipeline.py): log calls only enqueue, a background thread writes
+# LOG_PATH in batches of up to LOG_BATCH_SIZE lines, rotating it at LOG_MAX_BYTES (0 = never)
+# and keeping LOG_BACKUPS old files. Records are held LOG_MERGE_WINDOW_MS so the lines of all
+# worker processes are written in timestamp order.
+LOG_PATH = os.getenv("LOG_PATH", "logs/field_log.txt")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "500"))
+LOG_MERGE_WINDOW_MS = float(os.getenv("LOG_MERGE_WINDOW_MS", "250"))
+
+# Failure artifacts (artifacts.py): screenshot, serialized form HTML and network timings of
+# failed attempts, written in the background to ARTIFACTS_DIR/<run_id>/ ("" disables capture)
+# until ARTIFACTS_MAX_MB have been written; at most ARTIFACTS_QUEUE_SIZE captures wait for the
+# writer (further failures in a burst are not captured)
+ARTIFACTS_DIR = os.getenv("ARTIFACTS_DIR", "artifacts")
+ARTIFACTS_MAX_MB = float(os.getenv("ARTIFACTS_MAX_MB", "200"))
+ARTIFACTS_QUEUE_SIZE = int(os.getenv("ARTIFACTS_QUEUE_SIZE", "16"))
+ARTIFACT_SCREENSHOT_TIMEOUT_MS = float(os.getenv("ARTIFACT_SCREENSHOT_TIMEOUT_MS", "3000"))
+
+# Time budgets (deadline.py): every Playwright call takes its timeout from the URL's and region's
+# remaining budget, capped per step (STEP_TIMEOUT_MS for calls without their own cap). A watchdog
+# cancels a region WATCHDOG_GRACE_MS after its budget and recycles its page and context.
+DEADLINES = os.getenv("DEADLINES", "true").lower() in ("1", "true", "yes")
+URL_BUDGET_MS = float(os.getenv("URL_BUDGET_MS", "90000"))
+REGION_BUDGET_MS = float(os.getenv("REGION_BUDGET_MS", "30000"))
+STEP_TIMEOUT_MS = float(os.getenv("STEP_TIMEOUT_MS", "5000"))
+WATCHDOG_GRACE_MS = float(os.getenv("WATCHDOG_GRACE_MS", "2000"))
+
+# Recycling and memory telemetry for long runs (memory.py). A host context is closed after
+# CONTEXT_MAX_USES URLs (0 = never). Memory is sampled every MEMORY_SAMPLE_EVERY URLs and appended
+# to MEMORY_SAMPLES_PATH ("" = not written; each sample walks /proc, so not on every URL); when
+# Chromium's PSS or Python's RSS crosses its limit (MB, 0 = no limit) the browser is recycled, at
+# most once per MEMORY_RECYCLE_COOLDOWN URLs.
+CONTEXT_MAX_USES = int(os.getenv("CONTEXT_MAX_USES", "50"))
+MEMORY_SAMPLE_EVERY = int(os.getenv("MEMORY_SAMPLE_EVERY", "10"))
+MEMORY_SAMPLES_PATH = os.getenv("MEMORY_SAMPLES_PATH", "results/memory.jsonl")
+BROWSER_RSS_LIMIT_MB = float(os.getenv("BROWSER_RSS_LIMIT_MB", "2048"))
+PYTHON_RSS_LIMIT_MB = float(os.getenv("PYTHON_RSS_LIMIT_MB", "1024"))
+MEMORY_RECYCLE_COOLDOWN = int(os.getenv("MEMORY_RECYCLE_COOLDOWN", "20"))
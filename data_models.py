@@ -5,7 +5,7 @@ from pydantic import BaseModel
 from pydantic import Field
 
 # Option[X] mean the field can either be type X or None (i.e. it's not required).
-from typing import Optional
+from typing import Dict, List, Optional
 
 import json  # Used for pretty-printing model data
 
@@ -31,81 +31,159 @@ class TestData(BaseModel):
     donee: Optional[Address] = None  # Gift recipient info, only used on gift pages
 
 
+# One <option> of a <select> field, as seen in the form snapshot.
+class OptionInfo(BaseModel):
+    value: Optional[str] = None  # Raw value attribute (None when the attribute is missing)
+    text: str = ""
+    selected: bool = False
+
+
+# One cds_* form control captured by the single-pass form snapshot.
+class FieldInfo(BaseModel):
+    name: str
+    tag: str  # "input", "select", "textarea", "button"
+    type: str = ""  # Lowercased type attribute ("" when missing)
+    value: Optional[str] = None  # Raw value attribute for inputs, current value for selects
+    checked: bool = False
+    disabled: bool = False
+    visible: bool = False  # Same rule Playwright uses: non-empty box and not visibility:hidden
+    label: str = ""  # Text of the first <label> for the field (tells payment radios apart)
+    options: List[OptionInfo] = []  # Only populated for <select> fields
+
+
+# Snapshot of every cds_* field on a page, taken with one page.evaluate call.
+# Region support and fill decisions are computed from this instead of querying the DOM.
+class FormSchema(BaseModel):
+    url: str
+    action: Optional[str] = None  # Resolved form action URL
+    method: str = "get"
+    fields: List[FieldInfo] = []
+
+    # All fields with this name (in DOM order), optionally limited to one tag
+    def find(self, name: str, tag: Optional[str] = None) -> List[FieldInfo]:
+        return [f for f in self.fields if f.name == name and (tag is None or f.tag == tag)]
+
+    # First field with this name, or None
+    def first(self, name: str, tag: Optional[str] = None) -> Optional[FieldInfo]:
+        matches = self.find(name, tag)
+        return matches[0] if matches else None
+
+    # True when at least one field with this name exists
+    def has(self, name: str, tag: Optional[str] = None) -> bool:
+        return self.first(name, tag) is not None
+
+    # Raw option values of the first <select> with this name
+    def option_values(self, name: str) -> List[Optional[str]]:
+        dropdown = self.first(name, tag="select")
+        return [opt.value for opt in dropdown.options] if dropdown else []
+
+
+# One URL x region attempt, streamed to the results files as soon as it finishes.
+# status is one of:
+#   "success"          - form submitted and no .error shown
+#   "submission_error" - form submitted but the page showed an .error message
+#   "incomplete"       - fill_form stopped before submitting (e.g. a required field was missing)
+#   "skipped"          - region not supported by the page (error holds the reason)
+#   "error"            - an exception was raised while filling or submitting
+#   "circuit_open"     - not attempted because the host's circuit breaker was open
+#   "carried_forward"  - incremental run: the form is unchanged and its last result passed, so it
+#                        was not re-submitted (error holds the run it was last tested in)
+# kind is "region" for the URL x region attempt, or "combination" for one term x payment type
+# submission of a matrix run (see form_matrix.py).
+class AttemptRecord(BaseModel):
+    run_id: str = ""
+    url: str
+    region: str
+    status: str = "incomplete"
+    error: Optional[str] = None
+    term: Optional[str] = None  # Term input used, e.g. "cds_term_value=12"
+    pay_type: Optional[str] = (
+        None  # Payment choice used in matrix runs, e.g. "cds_pay_type=2 (Visa)"
+    )
+    kind: str = "region"
+    worker: Optional[str] = None  # Process name, to tell sharded workers apart
+    started_at: float = 0.0  # Unix timestamp
+    duration_ms: float = 0.0
+    timings_ms: Dict[str, float] = {}  # Per-phase wall time, e.g. {"goto": 812.4, "fill": 1530.2}
+    artifacts: Optional[str] = None  # Folder with the failure screenshot/DOM/network capture
+    form_fingerprint: Optional[str] = None  # Structure of the form as loaded (form_state.py)
+
+
 # These example test cases are not used in automation but are kept as templates
 # for how TestData is structured, useful for debugging, documentation, or future tests.
-# Create an example US test case using the TestData model.
-us_test = TestData(
-    region="US",
-    term_index=0,
-    buyer=Address(
-        name="John Doe",
-        address1="123 Main St",
-        city="Des Moines",
-        state="IA",
-        zip="50309",
-        country="United States",
-        email="me@home.com",
-    ),
-)
-
-
-# Create an example Canada test case.
-can_test = TestData(
-    region="CAN",
-    term_index=1,
-    buyer=Address(
-        name="Sarah Maple",
-        address1="456 Maple Rd",
-        city="Toronto",
-        state="ON",  # Province — required for CAN
-        zip="M5H 2N2",  # Some Canadian forms may use 'zip' or 'postal'
-        country="CA",
-        email="me@home.com",
-    ),
-)
-
-# Create an example International test case.
-intl_test = TestData(
-    region="INTL",
-    term_index=2,
-    buyer=Address(
-        name="Alex Müller",
-        address1="789 Europa Strasse",
-        city="Berlin",
-        postal="10115",  # Postal code used for INTL instead of zip
-        country="DE",
-        email="me@home.com",
-    ),
-)
-
-# Create an example gift test case (US region).
-gift_test = TestData(
-    region="US",
-    term_index=0,
-    buyer=Address(
-        name="Buyer Person",
-        address1="123 Buyer St",
-        city="Chicago",
-        state="IL",
-        zip="60601",
-        email="me@home.com",
-    ),
-    donee=Address(
-        name="Gift Recipient",
-        address1="789 Gift Ave",
-        city="Springfield",
-        state="IL",
-        zip="62704",
-        email="me@home.com",
-    ),
-)
-
-
-# Dump the gift test case as a plain Python dictionary.
-gift_dict = gift_test.model_dump()
-
-# Print them out to verify structure
-print(json.dumps(us_test.model_dump(), indent=4))
-print(json.dumps(can_test.model_dump(), indent=4))
-print(json.dumps(intl_test.model_dump(), indent=4))
-print(json.dumps(gift_test.model_dump(), indent=4))
+# They are only built on demand (and printed with `python data_models.py`), so importing
+# this module has no side effects.
+def example_test_data() -> Dict[str, TestData]:
+    # Create an example US test case using the TestData model.
+    us_test = TestData(
+        region="US",
+        term_index=0,
+        buyer=Address(
+            name="John Doe",
+            address1="123 Main St",
+            city="Des Moines",
+            state="IA",
+            zip="50309",
+            country="United States",
+            email="me@home.com",
+        ),
+    )
+
+    # Create an example Canada test case.
+    can_test = TestData(
+        region="CAN",
+        term_index=1,
+        buyer=Address(
+            name="Sarah Maple",
+            address1="456 Maple Rd",
+            city="Toronto",
+            state="ON",  # Province — required for CAN
+            zip="M5H 2N2",  # Some Canadian forms may use 'zip' or 'postal'
+            country="CA",
+            email="me@home.com",
+        ),
+    )
+
+    # Create an example International test case.
+    intl_test = TestData(
+        region="INTL",
+        term_index=2,
+        buyer=Address(
+            name="Alex Müller",
+            address1="789 Europa Strasse",
+            city="Berlin",
+            postal="10115",  # Postal code used for INTL instead of zip
+            country="DE",
+            email="me@home.com",
+        ),
+    )
+
+    # Create an example gift test case (US region).
+    gift_test = TestData(
+        region="US",
+        term_index=0,
+        buyer=Address(
+            name="Buyer Person",
+            address1="123 Buyer St",
+            city="Chicago",
+            state="IL",
+            zip="60601",
+            email="me@home.com",
+        ),
+        donee=Address(
+            name="Gift Recipient",
+            address1="789 Gift Ave",
+            city="Springfield",
+            state="IL",
+            zip="62704",
+            email="me@home.com",
+        ),
+    )
+
+    return {"us": us_test, "can": can_test, "intl": intl_test, "gift": gift_test}
+
+
+if __name__ == "__main__":
+    # Print them out to verify structure
+    for example in example_test_data().values():
+        print(json.dumps(example.model_dump(), indent=4))
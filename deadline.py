@@ -0,0 +1,170 @@
+# Per-URL / per-region time budgets that bound tail latency.
+# Every Playwright call in run_discovery/fill_form takes its timeout from a Deadline: the step's
+# own cap (the old literal, or STEP_TIMEOUT_MS for calls that used Playwright's 30 s default),
+# cut down to what is left of the budget. Once the budget is gone the next call raises
+# DeadlineExceeded instead of waiting. Work that does not take a timeout (page.evaluate, a hung
+# renderer) is caught by the watchdog in run_region, which cancels the region after its budget
+# plus WATCHDOG_GRACE_MS; the page is closed and its context is closed instead of being reused.
+# Time spent waiting for a rate-limit token (rate_limit.throttle) is not charged to the budgets:
+# a region's clock only runs while it is doing its own work.
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+
+from config import (
+    DEADLINES,
+    REGION_BUDGET_MS,
+    STEP_TIMEOUT_MS,
+    URL_BUDGET_MS,
+    WATCHDOG_GRACE_MS,
+)
+
+# Start of AttemptRecord.error for regions cancelled by the watchdog
+WATCHDOG_ERROR = "Deadline exceeded (watchdog)"
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    def __init__(
+        self,
+        budget_ms: float,
+        clock: Callable[[], float] = time.perf_counter,
+        parent: Optional["Deadline"] = None,
+    ) -> None:
+        self.budget_ms = budget_ms  # math.inf = no budget, only the step caps apply
+        self._clock = clock
+        self._start = clock()
+        self._parent = parent  # The URL deadline a region's budget was cut from
+        self._paused_ms = 0.0  # Time spent in paused(), not charged to the budget
+        self._pauses = 0  # paused() blocks open right now (parallel regions share a parent)
+        self._paused_since = 0.0
+        self.clamped_ms = 0.0  # Waiting cut from step caps because the budget was running out
+
+    # No overall budget (run_test, matrix runs, deadlines turned off)
+    @classmethod
+    def unlimited(cls) -> "Deadline":
+        return cls(math.inf)
+
+    def elapsed_ms(self) -> float:
+        now = self._paused_since if self._pauses else self._clock()
+        return (now - self._start) * 1000 - self._paused_ms
+
+    def remaining_ms(self) -> float:
+        return self.budget_ms - self.elapsed_ms()
+
+    def expired(self) -> bool:
+        return self.remaining_ms() <= 0
+
+    # Timeout for one Playwright call: its cap, or what is left of the budget when that is less
+    def timeout(self, cap_ms: float = STEP_TIMEOUT_MS) -> float:
+        remaining = self.remaining_ms()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline exceeded: budget of {self.budget_ms:.0f} ms used up")
+        if remaining < cap_ms:
+            self.clamped_ms += cap_ms - remaining
+            return remaining
+        return cap_ms
+
+    # Budget for a part of this one (a region of a URL): `budget_ms`, or less if less is left
+    def child(self, budget_ms: float) -> "Deadline":
+        return Deadline(min(budget_ms, max(0.0, self.remaining_ms())), self._clock, self)
+
+    # Stops this budget (and the URL budget it was cut from) while the block runs
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        deadlines: List[Deadline] = []
+        deadline: Optional[Deadline] = self
+        while deadline is not None:
+            deadlines.append(deadline)
+            deadline = deadline._parent
+        now = self._clock()
+        for deadline in deadlines:
+            if not deadline._pauses:
+                deadline._paused_since = now
+            deadline._pauses += 1
+        try:
+            yield
+        finally:
+            now = self._clock()
+            for deadline in deadlines:
+                deadline._pauses -= 1
+                if not deadline._pauses:
+                    deadline._paused_ms += (now - deadline._paused_since) * 1000
+
+
+# Budgets from config.py, plus how often they ran out over the run
+class DeadlinePolicy:
+    def __init__(
+        self,
+        url_budget_ms: float = URL_BUDGET_MS,
+        region_budget_ms: float = REGION_BUDGET_MS,
+        grace_ms: float = WATCHDOG_GRACE_MS,
+    ) -> None:
+        self.url_budget_ms = url_budget_ms  # One pass over a URL's regions
+        self.region_budget_ms = region_budget_ms  # One region attempt
+        self.grace_ms = grace_ms  # Watchdog slack past the region budget
+        self.exhausted = 0  # Region attempts that used up their budget
+        self.watchdog_kills = 0  # ... of which the watchdog had to cancel
+        self.watchdog_overrun_ms = 0.0  # Time cancelled attempts ran past their budget, summed
+        self.max_overrun_ms = 0.0
+        # Step caps cut down on exhausted attempts: an upper bound on the waiting the budgets cut
+        # (a step may have finished well before its cap), not time actually saved
+        self.clamped_ms = 0.0
+
+    def for_url(self) -> Deadline:
+        return Deadline(self.url_budget_ms)
+
+    def for_region(self, url_deadline: Optional[Deadline]) -> Deadline:
+        if url_deadline is None:
+            return Deadline(self.region_budget_ms)
+        return url_deadline.child(self.region_budget_ms)
+
+    # Runs one region attempt under the watchdog. Returns False when it had to be cancelled.
+    # The watchdog is re-armed when it wakes up early because the budget was paused meanwhile.
+    async def watch(self, deadline: Deadline, work: Awaitable[Any]) -> bool:
+        task = asyncio.ensure_future(work)
+        try:
+            while True:
+                timeout = max(0.0, deadline.remaining_ms() + self.grace_ms) / 1000
+                done, _ = await asyncio.wait({task}, timeout=timeout)
+                if done:
+                    task.result()  # Re-raises what the attempt raised
+                    return True
+                if deadline.remaining_ms() + self.grace_ms <= 0:
+                    break
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        overrun = max(0.0, deadline.elapsed_ms() - deadline.budget_ms)
+        self.watchdog_kills += 1
+        self.watchdog_overrun_ms += overrun
+        self.max_overrun_ms = max(self.max_overrun_ms, overrun)
+        return False
+
+    # Counts a finished region attempt
+    def note(self, deadline: Deadline) -> None:
+        if deadline.expired():
+            self.exhausted += 1
+            self.clamped_ms += deadline.clamped_ms
+
+    # One-line report for the end-of-run log
+    def summary(self) -> str:
+        line = f"Deadlines: {self.exhausted} region attempts ran out of budget"
+        if self.watchdog_kills:
+            line += (
+                f", {self.watchdog_kills} cancelled by the watchdog "
+                f"({self.watchdog_overrun_ms / 1000:.1f} s past their budgets in total, "
+                f"at most {self.max_overrun_ms:.0f} ms)"
+            )
+        return line + f"; step caps cut by at most {self.clamped_ms / 1000:.1f} s (upper bound)"
+
+
+# Policy per config.py (None when DEADLINES is off: only the step caps apply)
+def deadlines_from_config() -> Optional[DeadlinePolicy]:
+    return DeadlinePolicy() if DEADLINES else None
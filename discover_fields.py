@@ -1,9 +1,10 @@
-# Used for checking if the logs folder exists and creating it
-import os
+# asyncio lets one Python process drive many browser contexts at the same time
+import asyncio
 
-# sync_playwright launches the browser; Page represents a single browser tab
-from playwright.sync_api import (
-    sync_playwright,
+# BrowserContext/Page are the async Playwright handles (the browser itself lives in BrowserPool)
+from playwright.async_api import (
+    APIRequestContext,
+    BrowserContext,
     Page,
 )
 
@@ -11,37 +12,104 @@ from playwright.sync_api import (
 from typing import (
     Dict,
     Any,
+    Callable,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
 )
 
 # Import the TestData model and Address class used to structure form input.
 # These Pydantic models ensure all test data is well-defined and validated before use.
-from data_models import TestData, Address
+from data_models import TestData, Address, FormSchema, AttemptRecord
+
+# Single-pass form snapshot and the region checks computed from it.
+# The country frozensets live there now and are re-exported here for existing callers.
+from form_schema import (  # noqa: F401
+    extract_schema,
+    region_skip_reason,
+    US_COUNTRIES,
+    CAN_COUNTRIES,
+    INTL_COUNTRIES,
+)
+
+# Condition-based waits that replace fixed sleeps (timeouts are upper bounds only)
+from waits import wait_for_donee_reveal, wait_for_options, wait_for_postal_field
+
+# Network profile that aborts non-essential requests (images, fonts, denylisted hosts, ...)
+from network_profile import NetworkProfile, allow_url_host, host_of, profile_from_config
+
+# Per-run services (schema cache, result recorder, ...) threaded down to every region attempt
+from run_services import RunServices
+
+# Span API: per-phase wall time for the result records, plus optional Chrome trace export
+from tracing import tracer
+
+# Long-lived browser that lends out fresh contexts (shared by run_discovery, run_test and pytest)
+from browser_pool import BrowserPool
+
+# Bulk fill helpers: one page.evaluate per block of fields instead of one fill() per field.
+# Credit card test values from config.py are pulled in there by card_fields().
+from bulk_fill import address_fields, bulk_fill, card_fields, email_fields, postal_fields
+
+# Term x payment-type matrix runs on one filled form
+from form_matrix import run_matrix, summarize_matrix
+
+# Work units, failure classification, retry backoff and the per-host circuit breaker
+from scheduler import WorkUnit, note_host_outcome, plan_retries
+
+# Per-host token bucket for page loads and submissions
+from rate_limit import HostRateLimiter, throttle
+
+# Form fingerprints and last results per page, for incremental runs
+from form_state import CARRIED_FORWARD, form_fingerprint
+
+# HTTP-only pre-screen: static HTML decides region support before any browser work
+from prescreen import Prescreener, PrescreenResult, StaticPage, parse_static_page
 
-# Import credit card test values from config.py.
-# These are stored separately from the main code to keep sensitive data organized and secure.
-from config import CREDIT_CARD_NUMBER, CC_EXP_MONTH, CC_EXP_YEAR, CC_CVV
+# Protocol-level submission of JS-free forms (no rendering, no click)
+from protocol_submit import browser_reason, submit_static_form
 
-# Imports your GUI function to get test inputs from the user
-from gui import (
-    get_user_input,
+# Failure screenshots/DOM/network dumps, written off the hot path
+from artifacts import CAPTURE_STATUSES
+
+# Per-URL / per-region time budgets and the watchdog that enforces them
+from deadline import WATCHDOG_ERROR, Deadline
+
+# Per-URL memory samples and memory-triggered browser recycling
+from memory import MemoryMonitor
+
+# Queue-based logging; log_context tags lines with the worker, URL and region being worked on
+from log_pipeline import log_context, set_log_context, start_log_pipeline
+
+# How many URLs are processed at the same time, and whether regions of a URL run side by side
+from config import (
+    MAX_CONCURRENCY,
+    PARALLEL_REGIONS,
+    SHARD_PROCESSES,
+    TRACE_PATH,
+    PROTOCOL_TIMEOUT_MS,
 )
 
+# Multi-process mode: splits the URL list across worker processes, each with its own browser
+from sharding import add_counts, run_sharded
+
 # For structured logging to file and console
 import logging
 
-logging.basicConfig(
-    filename="logs/field_log.txt",  # Log file path
-    level=logging.INFO,  # Log messages at INFO level and above
-    format="%(asctime)s - %(levelname)s - %(message)s",  # Timestamp, level, message
-    filemode="w",  # Overwrite log file each run (or change to "a" to append)
-)
+# Process name of the worker that made each attempt (sharded runs)
+import multiprocessing
 
+# Wall-clock timestamps and per-phase timings for the result records
+import time
 
-# Immutable sets of country names for region sets.
-US_COUNTRIES = frozenset(["united states"])
-CAN_COUNTRIES = frozenset(["canada"])
-# Not currently used. Reserved in case we need to explicitly check INTL countries later.
-INTL_COUNTRIES = frozenset(["united kingdom"])
+
+# Opens the log file. Called by the entry points (this script and cli.py) only, so importing this
+# module (tests, sharded worker processes) never truncates the log; workers send their records
+# to the main process instead (sharding.py). Log calls only enqueue; a background thread writes
+# the file (log_pipeline.py).
+def configure_logging() -> None:
+    start_log_pipeline()
 
 
 # Helper to map region code to full country name
@@ -54,10 +122,6 @@ def get_country_name(region: str) -> str:
         return "United Kingdom"
 
 
-# Ensure the log folder exists
-os.makedirs("logs", exist_ok=True)
-
-
 """ # This function inspects a single page and logs its form elements
 def inspect_page(page: Page, url: str) -> None:
     log(f"\n--- Inspecting: {url} ---")  # Start of a new URL block in the log
@@ -194,429 +258,1312 @@ def make_test_data(region: str, is_gift_page: bool) -> TestData:
         raise ValueError(f"Unsupported region: {region}")
 
 
-# This is the main loop that runs after collecting GUI input
-def run_discovery(user_input: Dict[str, Any]) -> None:
-    # Grab the list of URLs from the GUI return data
-    urls = user_input["urls"]
+# Test data for one region of one page: the next entry of the run's synthetic pool (with a
+# state/country the page offers), or make_test_data's fixed addresses when the pool is off.
+# Donee data is always generated; fill_form decides whether the page uses it.
+def region_test_data(
+    services: RunServices, region: str, term_index: int, schema: FormSchema
+) -> TestData:
+    if services.test_data is not None:
+        return services.test_data.take(region, term_index, is_gift_page=True, schema=schema)
+    test_data = make_test_data(region, is_gift_page=True)
+    test_data.term_index = term_index
+    return test_data
+
+
+# Regions every URL is checked against, in the order they are logged
+REGIONS = ["US", "CAN", "INTL"]
+
+# Final status of a region no attempt was recorded for (e.g. its pass raised before it ran)
+NOT_ATTEMPTED = "not_attempted"
+
+
+# Runs one region of one URL on the given page and returns its finished attempt record.
+# Every call streams that AttemptRecord (status, error, term, per-phase timings) to the results
+# and reports the outcome to the host's circuit breaker. term_index picks the term to submit
+# (the scheduler raises it when the gateway rejects a term for the country).
+async def run_region(
+    page: Page,
+    url: str,
+    region: str,
+    services: Optional[RunServices] = None,
+    term_index: int = 0,
+    url_deadline: Optional[Deadline] = None,
+) -> AttemptRecord:
+    services = services or RunServices()
+    attempt = new_attempt(url, region, services)
+    start = time.perf_counter()
+    # The region's share of the URL's budget (matrix runs submit many times and are not bounded)
+    policy = services.deadlines if services.matrix_pay_types is None else None
+    deadline = policy.for_region(url_deadline) if policy else Deadline.unlimited()
+    try:
+        # Whole-attempt span (trace only; the phases below fill attempt.timings_ms)
+        with tracer.span("region_attempt", url=url, region=region), log_context(region=region):
+            work = attempt_region(page, url, region, services, attempt, term_index, deadline)
+            if policy is None:
+                await work
+            elif not await policy.watch(deadline, work):
+                logging.error(
+                    f"Watchdog cancelled {url} for region {region} after "
+                    f"{deadline.elapsed_ms():.0f} ms"
+                )
+                attempt.status = "error"
+                attempt.error = f"{WATCHDOG_ERROR}: {deadline.budget_ms:.0f} ms region budget"
+                await close_stuck_page(page, policy.grace_ms)
+    except Exception as e:
+        # Navigation failures: the caller stops this pass, the scheduler decides on a retry
+        logging.error(f"Failed to inspect {url} for region {region}: {e}")
+        attempt.status = "error"
+        attempt.error = str(e)
+    finally:
+        if policy is not None:
+            policy.note(deadline)
+        # Failed attempts only: screenshot/DOM/network are read here, written in the background
+        if (
+            services.artifacts is not None
+            and attempt.status in CAPTURE_STATUSES
+            and not page.is_closed()
+        ):
+            with tracer.span("artifacts", attempt):
+                await services.artifacts.capture(page, attempt)
+        finish_attempt(attempt, services, start)
+    return attempt
+
+
+# Closes a page the watchdog gave up on (a hung renderer may not even answer that)
+async def close_stuck_page(page: Page, timeout_ms: float) -> None:
+    try:
+        await asyncio.wait_for(page.close(), timeout_ms / 1000)
+    except Exception as e:
+        logging.warning(f"Could not close a page cancelled by the watchdog: {e}")
 
-    # Start Playwright and launch the browser (Chromium in visible mode)
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
 
-        # Loop through each user-provided URL and inspect it
-        for url in urls:
-            try:
-                # Determine if the page has gift fields
-                regions_to_try = ["US", "CAN", "INTL"]
-                region_status = {r: "Skipped" for r in regions_to_try}
-
-                for region in regions_to_try:
-                    page.goto(url, timeout=5000)  # Reload page for each region
-
-                    # Add a separator in the logs
-                    # Write a visual separator and header for this URL/region inspection
-                    logging.info("\n" + "=" * 60)
-                    logging.info(f"Inspecting: {url}")
-                    logging.info(f"Region: {region}")
-
-                    page.wait_for_selector("body", timeout=5000)  # Make sure it's fully loaded
-
-                    # Check which regions the page supports based on the cds_country field
-                    country_selector = page.query_selector('select[name="cds_country"]')
-                    if country_selector:
-                        # Page uses a dropdown - get all visible country options
-                        options = [
-                            opt.get_attribute("value")
-                            for opt in country_selector.query_selector_all("option")
-                        ]
-
-                        # Normalize options to lowercase for comparison
-                        normalized_options = [opt.lower() for opt in options if opt]
-
-                        # Check if the current region is supported based on country presence
-                        if region == "US" and not any(
-                            opt in US_COUNTRIES for opt in normalized_options
-                        ):
-                            logging.warning(f"Skipping {url} - Region US not supported in dropdown")
+# Whether the watchdog cancelled this attempt (its page is closed, its context not reused)
+def watchdog_cancelled(attempt: Optional[AttemptRecord]) -> bool:
+    return attempt is not None and (attempt.error or "").startswith(WATCHDOG_ERROR)
 
-                            continue
-                        elif region == "CAN" and not any(
-                            opt in CAN_COUNTRIES for opt in normalized_options
-                        ):
-                            logging.warning(
-                                f"Skipping {url} - Region CAN not supported in dropdown"
-                            )
-                            continue
-                        elif region == "INTL":
-                            # For INTL testing, we want to ensure the dropdown includes *any* country besides US and CAN
-                            # First, assume INTL is supported only if the dropdown has other country options
-                            intl_supported = any(
-                                opt not in US_COUNTRIES | CAN_COUNTRIES
-                                for opt in normalized_options
-                            )
-                            # If there are no other countries, skip testing INTL for this page
-                            if not intl_supported:
-                                logging.warning(
-                                    f"Skipping {url} - Region INTL not supported (dropdown only includes US or CAN)"
-                                )
-                                continue
 
-                    else:
-                        # No dropdown - look for hidden input (used for US or CAN only)
-                        country_input = page.query_selector('input[name="cds_country"]')
-                        if country_input:
-                            value = country_input.get_attribute("value")
-                            normalized = value.lower().strip() if value else ""
-
-                            # Check region match using frozensets
-                            if region == "US" and normalized not in US_COUNTRIES:
-                                logging.warning(
-                                    f"Skipping {url} - Region US not supported (hidden in put shows {value})"
-                                )
-                                continue
-                            elif region == "CAN" and normalized not in CAN_COUNTRIES:
-                                logging.warning(
-                                    f"Skipping {url} - Region CAN not supported (hidden input shows {value})"
-                                )
-                                continue
-                            elif region == "INTL" and normalized in US_COUNTRIES | CAN_COUNTRIES:
-                                logging.warning(
-                                    f"Skipping {url} - Region INTL not supported (hidden input shows {value})"
-                                )
-                                continue
+# Fresh region-level record for one URL x region attempt of this run
+def new_attempt(url: str, region: str, services: RunServices) -> AttemptRecord:
+    return AttemptRecord(
+        run_id=services.run_id,
+        url=url,
+        region=region,
+        worker=multiprocessing.current_process().name,
+        started_at=time.time(),
+    )
 
-                    try:
-                        # This regions passed all checks and is being tested
-                        region_status[region] = "Tested"
 
-                        # Create a test data object for the current region
-                        is_gift_page = (
-                            True  # Always generate donee data; we'll decide later if it's used
-                        )
+# Stamps the duration, streams the record and reports the outcome to the host's breaker
+def finish_attempt(attempt: AttemptRecord, services: RunServices, start: float) -> None:
+    attempt.duration_ms = (time.perf_counter() - start) * 1000
+    services.record(attempt)
+    host = host_of(attempt.url)
+    if services.breaker is not None and note_host_outcome(services.breaker, host, attempt):
+        logging.error(f"Circuit breaker opened for {host} after repeated failures")
+
+
+# Skip checks shared by the browser and HTTP paths, made before the page is loaded: a cached
+# schema that rules the region out, or an open circuit breaker. Returns True when skipped.
+def skip_before_load(
+    url: str,
+    region: str,
+    services: RunServices,
+    attempt: AttemptRecord,
+    cached_schema: Optional[FormSchema],
+) -> bool:
+    # A cached schema for this cds_mag_code/cds_page_id lets us skip without loading the page
+    if cached_schema:
+        skip_reason = region_skip_reason(cached_schema, region)
+        if skip_reason:
+            logging.warning(f"Skipping {url} - {skip_reason} (cached schema, page not loaded)")
+            attempt.status = "skipped"
+            attempt.error = f"{skip_reason} (cached schema)"
+            return True
+
+    # A host whose circuit breaker is open is not contacted at all
+    host = host_of(url)
+    if services.breaker is not None and not services.breaker.allow(host):
+        logging.warning(f"Skipping {url} - circuit breaker open for {host}")
+        attempt.status = "circuit_open"
+        attempt.error = f"Circuit breaker open for {host}"
+        return True
+    return False
+
+
+# Incremental runs, once the page is loaded: fingerprints the form as loaded and, when it is
+# unchanged since a recent run in which this region passed, marks the attempt carried forward
+# instead of submitting it again. Returns True when carried forward.
+def carry_forward(
+    url: str, region: str, services: RunServices, attempt: AttemptRecord, schema: FormSchema
+) -> bool:
+    attempt.form_fingerprint = form_fingerprint(schema)
+    if not services.incremental or services.form_state is None:
+        return False
+    state = services.form_state.unchanged(url, attempt.form_fingerprint, [region])
+    if state is None:
+        return False
+    logging.info(f"Carrying forward {url} - form unchanged since run {state.run_id}")
+    attempt.status = CARRIED_FORWARD
+    attempt.error = (
+        f"Form unchanged since run {state.run_id} (last status: {state.statuses[region]})"
+    )
+    services.form_state.carried_forward += 1
+    return True
+
+
+# Body of run_region: fills in `attempt` as it goes
+async def attempt_region(
+    page: Page,
+    url: str,
+    region: str,
+    services: RunServices,
+    attempt: AttemptRecord,
+    term_index: int = 0,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    deadline = deadline or Deadline.unlimited()
+    # Write a visual separator and header for this URL/region inspection
+    logging.info("\n" + "=" * 60)
+    logging.info(f"Inspecting: {url}")
+    logging.info(f"Region: {region}")
+
+    # Cached schema / open circuit breaker: skipped without loading the page
+    cache = services.schema_cache
+    cached_schema = cache.get(url) if cache else None
+    if skip_before_load(url, region, services, attempt, cached_schema):
+        return "Skipped"
+
+    # Wait for the host's token (rate limit) before loading the page
+    await throttle(services.limiter, url, attempt, deadline)
+
+    with tracer.span("goto", attempt):
+        await page.goto(url, timeout=deadline.timeout(5000))  # Reload page for each region
+
+        # Make sure it's fully loaded
+        await page.wait_for_selector("body", timeout=deadline.timeout(5000))
+
+    # Snapshot the whole form in one round trip, then check region support in Python
+    with tracer.span("schema", attempt):
+        schema = await extract_schema(page)
+    if cache and cached_schema is None:
+        cache.put(url, schema)
+    skip_reason = region_skip_reason(schema, region)
+    if skip_reason:
+        logging.warning(f"Skipping {url} - {skip_reason}")
+        attempt.status = "skipped"
+        attempt.error = skip_reason
+        return "Skipped"
+    if carry_forward(url, region, services, attempt, schema):
+        return "Carried forward"
 
-                        test_data = make_test_data(region, is_gift_page)
+    try:
+        # Create a test data object for the current region
+        test_data = region_test_data(services, region, term_index, schema)
+
+        if services.matrix_pay_types is not None:
+            # Matrix mode: fill once, then submit every term x payment type from the same page
+            with tracer.span("fill", attempt):
+                await fill_form(page, test_data, schema, attempt, submit=False)
+            if attempt.status == "filled":
+                # After a click submission: same page, same data, filled again from scratch
+                async def refill(combination: AttemptRecord) -> None:
+                    await throttle(services.limiter, url, combination)
+                    await page.goto(url, timeout=5000)
+                    await page.wait_for_selector("body", timeout=5000)
+                    refilled = AttemptRecord(url=url, region=region)
+                    await fill_form(page, test_data, None, refilled, submit=False)
+                    if refilled.status != "filled":
+                        raise RuntimeError(refilled.error or "Could not refill the form")
+
+                combinations = await run_matrix(
+                    page,
+                    await extract_schema(page),
+                    services.matrix_pay_types,
+                    attempt,
+                    services.limiter,
+                    refill,
+                )
+                for combination in combinations:
+                    services.record(combination)
+                summarize_matrix(attempt, combinations)
+        else:
+            # Pass the full model (and the snapshot we already took) to fill_form
+            with tracer.span("fill_and_submit", attempt):
+                await fill_form(
+                    page,
+                    test_data,
+                    schema,
+                    attempt,
+                    limiter=services.limiter,
+                    deadline=deadline,
+                )
 
-                        # Pass the full model to fill_form
-                        fill_form(page, test_data)
+    except Exception as e:
+        logging.error(f"Error submitting form for region {region} at {page.url}: {e}")
+        attempt.status = "error"
+        attempt.error = str(e)
+
+    # This region passed all checks and was tested (even if the submission itself failed)
+    return "Tested"
+
+
+# HTTP path for one region: posts the form of the served page with the pooled HTTP client
+# (protocol_submit.py), loading the page first unless an earlier region of this pass (or the
+# pre-screen) already did. Fills in `attempt` and returns (the page, or None if it was not
+# needed; why the page needs the browser, when it was loaded here and does - nothing has been
+# submitted then).
+async def attempt_region_protocol(
+    request: APIRequestContext,
+    url: str,
+    region: str,
+    services: RunServices,
+    attempt: AttemptRecord,
+    term_index: int,
+    static_page: Optional[StaticPage] = None,
+    deadline: Optional[Deadline] = None,
+) -> Tuple[Optional[StaticPage], Optional[str]]:
+    deadline = deadline or Deadline.unlimited()
+    logging.info("\n" + "=" * 60)
+    logging.info(f"Inspecting over HTTP: {url}")
+    logging.info(f"Region: {region}")
+
+    cache = services.schema_cache
+    cached_schema = cache.get(url) if cache else None
+    if skip_before_load(url, region, services, attempt, cached_schema):
+        return static_page, None
+
+    if static_page is None:
+        await throttle(services.limiter, url, attempt, deadline)
+        with tracer.span("goto", attempt):
+            response = await request.get(url, timeout=deadline.timeout(PROTOCOL_TIMEOUT_MS))
+            if not response.ok:
+                raise RuntimeError(f"HTTP {response.status} loading {url}")
+            html = await response.text()
+        with tracer.span("schema", attempt):
+            static_page = parse_static_page(html, url)
+        reason = browser_reason(static_page)
+        if reason:
+            return static_page, reason
+
+    skip_reason = region_skip_reason(static_page.form, region)
+    if skip_reason:
+        logging.warning(f"Skipping {url} - {skip_reason}")
+        attempt.status = "skipped"
+        attempt.error = skip_reason
+        return static_page, None
+    if carry_forward(url, region, services, attempt, static_page.form):
+        return static_page, None
+
+    test_data = region_test_data(services, region, term_index, static_page.form)
+    await throttle(services.limiter, url, attempt, deadline)
+    await submit_static_form(
+        request, static_page, test_data, attempt, deadline.timeout(PROTOCOL_TIMEOUT_MS)
+    )
+    return static_page, None
+
+
+# Protocol-level counterpart of inspect_url: runs the given regions over HTTP, one after the
+# other, all from one load of the served page (`static_page`: the copy the pre-screen fetched).
+# Returns ({region: attempt}, None), or ({region: attempt}, reason) when the page needs
+# JavaScript: the attempts are then only the regions recorded before the page was loaded
+# (skipped by the cache or the circuit breaker), and the caller runs the rest in the browser.
+async def inspect_url_protocol(
+    pool: BrowserPool,
+    url: str,
+    services: RunServices,
+    regions: List[str],
+    term_indexes: Optional[Dict[str, int]] = None,
+    static_page: Optional[StaticPage] = None,
+) -> Tuple[Dict[str, AttemptRecord], Optional[str]]:
+    attempts: Dict[str, AttemptRecord] = {}
+    needs_browser = browser_reason(static_page) if static_page is not None else None
+    if needs_browser:
+        logging.info(f"{url} needs a browser ({needs_browser}), using the browser path")
+        return attempts, needs_browser
+    request = await pool.api_request()
+    term_indexes = term_indexes or {}
+    # Same budgets as the browser path (HTTP requests always time out, so no watchdog)
+    policy = services.deadlines
+    url_deadline = policy.for_url() if policy is not None else None
+    for region in regions:
+        attempt = new_attempt(url, region, services)
+        start = time.perf_counter()
+        deadline = policy.for_region(url_deadline) if policy is not None else None
+        try:
+            with (
+                tracer.span("region_attempt", url=url, region=region),
+                log_context(region=region),
+            ):
+                static_page, needs_browser = await attempt_region_protocol(
+                    request,
+                    url,
+                    region,
+                    services,
+                    attempt,
+                    term_indexes.get(region, 0),
+                    static_page,
+                    deadline,
+                )
+        except Exception as e:
+            logging.error(f"Failed to inspect {url} over HTTP for region {region}: {e}")
+            attempt.status = "error"
+            attempt.error = str(e)
+        if needs_browser:
+            # Nothing was sent for this region: its attempt is dropped, not recorded
+            logging.info(f"{url} needs a browser ({needs_browser}), using the browser path")
+            return attempts, needs_browser
+        if policy is not None:
+            policy.note(deadline)
+        finish_attempt(attempt, services, start)
+        attempts[region] = attempt
+        if attempt.status == "error" and static_page is None and "schema" not in attempt.timings_ms:
+            break  # The page did not load
+    return attempts, None
+
+
+# Region summary label for an attempt ("Tested" even if the submission itself failed)
+def region_label(attempt: AttemptRecord) -> str:
+    if attempt.status == CARRIED_FORWARD:
+        return "Carried forward"
+    return "Skipped" if attempt.status in ("skipped", "circuit_open") else "Tested"
+
+
+# Writes the per-URL region summary block to the log
+def log_region_summary(region_status: Dict[str, str]) -> None:
+    logging.info("Region summary for this URL:")
+    for r, status in region_status.items():
+        logging.info(f"  {r}: {status}")
+
+
+# Writes the merged, ordered report for a whole run (used when URLs were sharded)
+def log_run_report(results: Dict[str, Dict[str, str]]) -> None:
+    logging.info("\n" + "=" * 60)
+    logging.info(f"Run report ({len(results)} URLs):")
+    for url, region_status in results.items():
+        statuses = ", ".join(f"{r}: {status}" for r, status in region_status.items())
+        logging.info(f"  {url} -> {statuses}")
+
+
+# Runs the given regions of a single URL inside one browser context, one after the other.
+# Returns {region: attempt}. If the page cannot be loaded the pass stops there; the regions
+# after it are left out so the scheduler runs them again.
+async def inspect_url(
+    context: BrowserContext,
+    url: str,
+    services: Optional[RunServices] = None,
+    regions: Optional[List[str]] = None,
+    term_indexes: Optional[Dict[str, int]] = None,
+    url_deadline: Optional[Deadline] = None,
+) -> Dict[str, AttemptRecord]:
+    attempts: Dict[str, AttemptRecord] = {}
+    term_indexes = term_indexes or {}
+    page = await context.new_page()
+    try:
+        for region in regions or REGIONS:
+            attempt = await run_region(
+                page, url, region, services, term_indexes.get(region, 0), url_deadline
+            )
+            attempts[region] = attempt
+            if attempt.status == "error" and "schema" not in attempt.timings_ms:
+                break  # The page did not load
+            if watchdog_cancelled(attempt):
+                break  # The page is gone; the scheduler decides about the other regions
+    finally:
+        # Close the tab so the context can be handed to the next URL clean
+        await page.close()
+
+    return attempts
+
+
+# Runs one region on its own tab inside the region's own (isolated) context
+async def _run_region_in_context(
+    context: BrowserContext,
+    url: str,
+    region: str,
+    services: Optional[RunServices],
+    term_index: int,
+    url_deadline: Optional[Deadline] = None,
+) -> AttemptRecord:
+    page = await context.new_page()
+    try:
+        return await run_region(page, url, region, services, term_index, url_deadline)
+    finally:
+        await page.close()
+
+
+# Parallel-regions mode: the regions start at the same moment, each in its own context,
+# so wall time per URL is roughly that of the slowest region instead of the sum of all three.
+async def inspect_url_parallel(
+    contexts: List[BrowserContext],
+    url: str,
+    services: Optional[RunServices] = None,
+    regions: Optional[List[str]] = None,
+    term_indexes: Optional[Dict[str, int]] = None,
+    url_deadline: Optional[Deadline] = None,
+) -> Dict[str, AttemptRecord]:
+    regions = regions or REGIONS
+    term_indexes = term_indexes or {}
+
+    outcomes = await asyncio.gather(
+        *(
+            _run_region_in_context(
+                context, url, region, services, term_indexes.get(region, 0), url_deadline
+            )
+            for context, region in zip(contexts, regions)
+        ),
+        return_exceptions=True,  # One failing region must not cancel the others
+    )
 
-                    except Exception as e:
-                        logging.error(
-                            f"Error submitting form for region {region} at {page.url}: {e}"
-                        )
+    # Regions whose tab could not even be opened are left out (the scheduler retries them)
+    attempts: Dict[str, AttemptRecord] = {}
+    for region, outcome in zip(regions, outcomes):
+        if isinstance(outcome, Exception):
+            logging.error(f"Failed to inspect {url} for region {region}: {outcome}")
+        else:
+            attempts[region] = outcome
+    return attempts
+
+
+# Memory sample after a finished URL; recycles the browser when RSS is over its limit
+async def sample_memory(pool: BrowserPool, memory: MemoryMonitor, url: str) -> None:
+    sample = await memory.url_done(url)
+    reason = memory.recycle_reason(sample) if sample is not None else None
+    if reason:
+        logging.warning(f"Memory limit crossed after {url}: {reason}")
+        pool.request_recycle(reason)
+
+
+# Inspects one URL with contexts borrowed from the browser pool (one per region in parallel mode).
+# The URL's time budget starts here; contexts whose page the watchdog cancelled are closed
+# instead of going back to the pool.
+async def inspect_url_pooled(
+    pool: BrowserPool,
+    url: str,
+    parallel_regions: bool,
+    services: Optional[RunServices] = None,
+    regions: Optional[List[str]] = None,
+    term_indexes: Optional[Dict[str, int]] = None,
+) -> Dict[str, AttemptRecord]:
+    regions = regions or REGIONS
+    policy = services.deadlines if services is not None else None
+    url_deadline = policy.for_url() if policy is not None else None
+    attempts: Dict[str, AttemptRecord] = {}
+    if not parallel_regions:
+        context = await pool.new_context(url)
+        try:
+            attempts = await inspect_url(
+                context, url, services, regions, term_indexes, url_deadline
+            )
+        finally:
+            stuck = any(watchdog_cancelled(a) for a in attempts.values())
+            await pool.release(context, reuse=not stuck)
+        return attempts
+
+    contexts = [await pool.new_context(url) for _ in regions]
+    try:
+        attempts = await inspect_url_parallel(
+            contexts, url, services, regions, term_indexes, url_deadline
+        )
+    finally:
+        for context, region in zip(contexts, regions):
+            await pool.release(context, reuse=not watchdog_cancelled(attempts.get(region)))
+    return attempts
+
+
+# Pre-screen stage for one new work unit: fetches the served HTML without a browser and records
+# the regions its static cds_country field rules out as skipped. Returns the unit with only the
+# regions the browser still has to run, and the pre-screen result (None when the page was not
+# fetched). URLs whose host's circuit breaker is open, or with a cached schema, are passed
+# through untouched: the browser stage handles those without loading the page.
+async def prescreen_unit(
+    pool: BrowserPool, unit: WorkUnit, services: RunServices, prescreener: Prescreener
+) -> Tuple[WorkUnit, Optional[PrescreenResult]]:
+    host = host_of(unit.url)
+    if services.breaker is not None and not services.breaker.allow(host):
+        return unit, None
+    if services.schema_cache is not None and services.schema_cache.get(unit.url) is not None:
+        return unit, None
+
+    started_at = time.time()
+    start = time.perf_counter()
+    await throttle(services.limiter, unit.url)
+    with tracer.span("prescreen", url=unit.url):
+        result = await prescreener.screen(await pool.api_request(), unit.url, unit.regions)
+    if result is None:
+        return unit, None
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for region, reason in result.skipped.items():
+        logging.warning(f"Skipping {unit.url} for region {region} - {reason} (static HTML)")
+        services.record(
+            AttemptRecord(
+                run_id=services.run_id,
+                url=unit.url,
+                region=region,
+                status="skipped",
+                error=f"{reason} (static HTML)",
+                worker=multiprocessing.current_process().name,
+                started_at=started_at,
+                duration_ms=elapsed_ms,
+                timings_ms={"prescreen": elapsed_ms},
+            )
+        )
+    return unit.model_copy(update={"regions": result.testable}), result
+
+
+# Async engine: processes up to `concurrency` URLs at once, each on a fresh browser context
+# lent by a BrowserPool. With parallel_regions=True each URL gets one context per region.
+# Pass `pool` to reuse an already running browser; otherwise one is started for this run.
+# Returns {url: region_status} in the same order the URLs were given.
+async def run_discovery_async(
+    urls: List[str],
+    concurrency: int = MAX_CONCURRENCY,
+    parallel_regions: bool = PARALLEL_REGIONS,
+    network_profile: Optional[NetworkProfile] = None,
+    pool: Optional[BrowserPool] = None,
+    services: Optional[RunServices] = None,
+) -> Dict[str, Dict[str, str]]:
+    return await run_discovery_stream_async(
+        urls,
+        max(1, min(concurrency, len(urls) or 1)),
+        parallel_regions,
+        network_profile or profile_from_config(urls),
+        pool,
+        services,
+    )
 
-                # After trying all regions, log a quick summary for this URL
-                logging.info("Region summary for this URL:")
-                for r, status in region_status.items():
-                    logging.info(f"  {r}: {status}")
 
+# Same engine for a URL source that is still being read (an open file, stdin, a generator).
+# A reader task turns URLs into work units while `concurrency` workers run them, so the first
+# URL is already running before the rest of the list has been read. With a prescreener in
+# `services`, new URLs first go through the HTTP-only pre-screen stage, and only their testable
+# regions reach the browser workers. Failed regions are classified and, when worth it, put back
+# on the queue after a backoff delay (scheduler.py).
+# on_result(index, url, region_status) is called as soon as a URL is completely done.
+async def run_discovery_stream_async(
+    url_source: Iterable[str],
+    concurrency: int = MAX_CONCURRENCY,
+    parallel_regions: bool = PARALLEL_REGIONS,
+    network_profile: Optional[NetworkProfile] = None,
+    pool: Optional[BrowserPool] = None,
+    services: Optional[RunServices] = None,
+    on_result: Optional[Callable[[int, str, Dict[str, str]], None]] = None,
+) -> Dict[str, Dict[str, str]]:
+    concurrency = max(1, concurrency)
+
+    # Schema cache and other per-run services (built from config.py unless passed in)
+    owns_services = services is None
+    if owns_services:
+        services = RunServices.from_config()
+
+    # Abort images/fonts/etc. (and optionally third-party hosts) on every context we create
+    owns_pool = pool is None
+    if owns_pool:
+        pool = await BrowserPool(network_profile=network_profile or profile_from_config()).start()
+
+    loop = asyncio.get_running_loop()
+    # Units ready to run: new URLs from the reader, and retries whose backoff has elapsed
+    ready: asyncio.Queue = asyncio.Queue()
+    # New URLs waiting for the pre-screen stage (HAR runs must not touch the network, and
+    # recorded runs need every page in the recording, so HAR mode goes straight to the browser)
+    prescreener = services.prescreener
+    if prescreener is not None and pool.har_mode != "off":
+        prescreener = None
+    if services.incremental and services.form_state is None:
+        logging.warning("Incremental mode needs the form state store (FORM_STATE_PATH): off")
+    # Protocol-level submission of JS-free pages (not for HAR runs, and matrix runs need the
+    # filled page to post each combination from)
+    use_protocol = (
+        services.protocol_submit and services.matrix_pay_types is None and pool.har_mode == "off"
+    )
+    screening: Optional[asyncio.Queue] = asyncio.Queue() if prescreener is not None else None
+    # Reading stays just ahead of the browser instead of buffering the whole list
+    room = asyncio.Semaphore(concurrency * 2)
+    urls: List[str] = []
+    summaries: Dict[int, Dict[str, str]] = {}
+    units_left: Dict[int, int] = {}  # Units (first pass + scheduled retries) per unfinished URL
+    # Form fingerprint (as the region attempts loaded it) and latest status per region of each
+    # unfinished URL, stored in services.form_state once the URL is done
+    fingerprints: Dict[int, str] = {}
+    final_statuses: Dict[int, Dict[str, str]] = {}
+    # Page the pre-screen fetched per URL, handed to the first protocol-level pass instead of
+    # loading it again
+    static_pages: Dict[int, StaticPage] = {}
+    reading = True
+
+    # Once the source is exhausted and no URL is unfinished, tell every worker to stop
+    def stop_if_done() -> None:
+        if not reading and not units_left:
+            for _ in range(concurrency):
+                ready.put_nowait(None)
+
+    async def reader() -> None:
+        nonlocal reading
+        iterator = iter(url_source)
+        try:
+            while True:
+                await room.acquire()
+                # File/stdin reads block, so they run on a thread while earlier URLs are tested
+                url = await asyncio.to_thread(next, iterator, None)
+                if url is None:
+                    room.release()
+                    break
+                allow_url_host(pool.network_profile, url)
+                index = len(urls)
+                urls.append(url)
+                summaries[index] = {r: "Skipped" for r in REGIONS}
+                final_statuses[index] = {}
+                units_left[index] = 1
+                unit = WorkUnit(index=index, url=url, regions=list(REGIONS))
+                (screening if screening is not None else ready).put_nowait(unit)
+        except Exception as e:
+            logging.error(f"Stopped reading URLs: {e}")
+        reading = False
+        if screening is not None:
+            for _ in range(prescreener.concurrency):
+                screening.put_nowait(None)
+        stop_if_done()
+
+    # One unit (first pass or retry) is over; the URL is done once none of its units are left
+    def unit_done(unit: WorkUnit) -> None:
+        units_left[unit.index] -= 1
+        if units_left[unit.index] == 0:
+            del units_left[unit.index]
+            room.release()
+            statuses = final_statuses.pop(unit.index)
+            static_pages.pop(unit.index, None)
+            services.record_final({r: statuses.get(r, NOT_ATTEMPTED) for r in REGIONS})
+            fingerprint = fingerprints.pop(unit.index, None)
+            if fingerprint and services.form_state is not None:
+                services.form_state.put(unit.url, fingerprint, statuses, services.run_id)
+            logging.info(f"Finished {unit.url}")
+            log_region_summary(summaries[unit.index])
+            if on_result is not None:
+                on_result(unit.index, unit.url, summaries[unit.index])
+            stop_if_done()
+
+    async def screener(number: int) -> None:
+        set_log_context(worker=f"screen-{number}")
+        while True:
+            unit = await screening.get()
+            if unit is None:  # Sentinel: the reader is done
+                return
+            try:
+                with log_context(url=unit.url):
+                    unit, result = await prescreen_unit(pool, unit, services, prescreener)
+                if result is not None:
+                    if use_protocol and result.page is not None:
+                        static_pages[unit.index] = result.page
+                    for region in result.skipped:
+                        final_statuses[unit.index][region] = "skipped"
             except Exception as e:
-                logging.error(f"Failed to inspect {url}: {e}")
+                logging.error(f"Prescreen failed for {unit.url}: {e}")
+            if unit.regions:
+                ready.put_nowait(unit)
+            else:
+                unit_done(unit)  # Nothing left for the browser
 
-        input("\n Press Enter to close the browser...")
+    async def worker(number: int) -> None:
+        set_log_context(worker=f"w{number}")
+        while True:
+            unit = await ready.get()
+            if unit is None:  # Sentinel: no more work
+                return
+            attempts: Dict[str, AttemptRecord] = {}
+            try:
+                with log_context(url=unit.url):
+                    browser_regions = unit.regions
+                    if use_protocol and not unit.browser_only:
+                        attempts, needs_browser = await inspect_url_protocol(
+                            pool,
+                            unit.url,
+                            services,
+                            unit.regions,
+                            unit.term_indexes,
+                            static_pages.pop(unit.index, None),
+                        )
+                        browser_regions = []
+                        if needs_browser:  # The page needs JavaScript, from now on too
+                            unit = unit.model_copy(update={"browser_only": True})
+                            browser_regions = [r for r in unit.regions if r not in attempts]
+                    if browser_regions:
+                        attempts.update(
+                            await inspect_url_pooled(
+                                pool,
+                                unit.url,
+                                parallel_regions,
+                                services,
+                                browser_regions,
+                                unit.term_indexes,
+                            )
+                        )
+            except Exception as e:
+                logging.error(f"Failed to inspect {unit.url}: {e}")
+            for region, attempt in attempts.items():
+                # A term retry that found no further term keeps the last real mismatch as label
+                if unit.term_indexes.get(region) and (attempt.error or "").startswith("No term at"):
+                    continue
+                summaries[unit.index][region] = region_label(attempt)
+                final_statuses[unit.index][region] = attempt.status
+                if attempt.form_fingerprint:
+                    fingerprints[unit.index] = attempt.form_fingerprint
+
+            retries = plan_retries(unit, attempts, services.retry) if services.retry else []
+            for delay, retry in retries:
+                logging.info(
+                    f"Retrying {retry.url} ({', '.join(retry.regions)}) in {delay:.1f} s "
+                    f"(pass {retry.tries + 1})"
+                )
+                units_left[unit.index] += 1
+                loop.call_later(delay, ready.put_nowait, retry)
 
-        # Close browser when finished with all URLs
-        browser.close()
+            unit_done(unit)
+            if services.memory is not None and unit.index not in units_left:
+                await sample_memory(pool, services.memory, unit.url)
 
+    screeners = [screener(n) for n in range(prescreener.concurrency)] if prescreener else []
+    try:
+        await asyncio.gather(reader(), *screeners, *(worker(n) for n in range(concurrency)))
+    finally:
+        # Close browser when finished with all URLs (only if this run started it)
+        if owns_pool:
+            await pool.close()
+        if owns_services:
+            services.close()
+
+    if pool.network_profile.enabled:
+        logging.info(pool.network_stats.summary())
+    if pool.contexts_reused:
+        logging.info(
+            f"Browser pool reused a host's context for {pool.contexts_reused} of "
+            f"{pool.contexts_lent} loans"
+        )
+    if services.limiter is not None:
+        logging.info(services.limiter.summary())
+    if prescreener is not None:
+        logging.info(prescreener.summary())
+    if services.incremental and services.form_state is not None:
+        logging.info(
+            f"Incremental run carried forward {services.form_state.carried_forward} regions"
+        )
+    if services.test_data is not None and services.test_data.handed_out:
+        logging.info(services.test_data.summary())
+    if services.artifacts is not None and (
+        services.artifacts.captured or services.artifacts.dropped or services.artifacts.dropped_busy
+    ):
+        logging.info(services.artifacts.summary())
+    if services.deadlines is not None and services.deadlines.exhausted:
+        logging.info(services.deadlines.summary())
+    if services.memory is not None and services.memory.samples:
+        logging.info(services.memory.summary())
+    if pool.recycles:
+        logging.info(f"Browser pool recycled the browser early: {pool.recycles}")
+    if services.breaker is not None and services.breaker.open_hosts():
+        logging.warning(f"Circuit breaker open at end of run for: {services.breaker.open_hosts()}")
+
+    # URLs finish out of order; report them in the order they were read
+    return {url: summaries[index] for index, url in enumerate(urls)}
 
-def fill_form(page: Page, test_data: TestData) -> None:
-    region = test_data.region
-    # Try selecting both self and gift subscription terms (if present).
-    # Some page may only have one or the other, or both.
-    # This allows us to support self-only, and mixed pages.
 
-    # Look for a standard self-subscription term radio button
-    self_term = page.query_selector(
-        'input[name="cds_term_value"]:not([disabled]):not([type="hidden"])'
+# This is the main loop that runs after collecting GUI input
+def run_discovery(user_input: Dict[str, Any]) -> Dict[str, Dict[str, str]]:
+    # Grab the list of URLs from the GUI return data
+    urls = user_input["urls"]
+
+    return run_discovery_stream(
+        urls,
+        # Optional override for how many URLs run at once
+        concurrency=user_input.get("concurrency", MAX_CONCURRENCY),
+        # Optional override for testing the three regions of a URL side by side
+        parallel_regions=user_input.get("parallel_regions", PARALLEL_REGIONS),
+        # Optional override for how many worker processes share the URL list
+        processes=user_input.get("processes", SHARD_PROCESSES),
+        # Payment types picked in the GUI; used when matrix mode is on
+        matrix_pay_types=user_input.get("pay_types") if user_input.get("matrix") else None,
     )
-    if self_term:
+
+
+# Runs a whole discovery over any URL source (list, open file, stdin) without user interaction.
+# Pass `status_counts` to have the number of attempts per status (AttemptRecord.status, retries
+# included) added to it, and `final_counts` for the number of URL x region pairs per the status
+# they ended with; cli.py turns the latter into the exit code. `matrix_pay_types` turns on
+# term x payment matrix runs for those payment types (default: MATRIX_MODE / MATRIX_PAY_TYPES
+# from config.py).
+def run_discovery_stream(
+    url_source: Iterable[str],
+    concurrency: int = MAX_CONCURRENCY,
+    parallel_regions: bool = PARALLEL_REGIONS,
+    processes: int = SHARD_PROCESSES,
+    status_counts: Optional[Dict[str, int]] = None,
+    matrix_pay_types: Optional[List[str]] = None,
+    final_counts: Optional[Dict[str, int]] = None,
+) -> Dict[str, Dict[str, str]]:
+    # Span tracing is only collected when TRACE_PATH is set
+    tracer.configure(enabled=bool(TRACE_PATH))
+
+    if processes > 1:
+        results = run_sharded(
+            url_source,
+            processes,
+            concurrency,
+            parallel_regions,
+            status_counts=status_counts,
+            matrix_pay_types=matrix_pay_types,
+            final_counts=final_counts,
+        )
+    else:
+        services = RunServices.from_config(matrix_pay_types=matrix_pay_types)
         try:
-            # Attempt to check the self-subscription radio button
-            self_term.check(timeout=500)
-            logging.info("Selected self-subscription term (cds_term_value)")
+            results = asyncio.run(
+                run_discovery_stream_async(
+                    url_source, concurrency, parallel_regions, services=services
+                )
+            )
+        finally:
+            services.close()
+        add_counts(status_counts, services.status_counts)
+        add_counts(final_counts, services.final_counts)
+
+    # Chrome trace file + p50/p95/p99 per phase (no-op when tracing is off)
+    tracer.finish(TRACE_PATH)
+
+    return results
+
+
+# Buyer/payment fields the form cannot be submitted without
+REQUIRED_BUYER_FIELDS = frozenset(
+    [
+        "cds_name",
+        "cds_address_1",
+        "cds_city",
+        "cds_email",
+        "cds_cc_number",
+        "cds_cc_exp_month",
+        "cds_cc_exp_year",
+    ]
+)
 
-            logging.info("Selected self-subscription term (cds_term_value)")
 
-            # Attempt to select a gift term checkbox if present
-            gift_term_checkbox = page.query_selector('input[name="cds_donee1_term_value"]')
-            if gift_term_checkbox:
-                try:
-                    gift_term_checkbox.check()
-                    logging.info("Checked gift term checkbox (cds_donee1_term_value)")
-                    page.wait_for_timeout(1000)  # Let UI reveal gift fields
-                except Exception as e:
-                    logging.warning(f"Failed to check gift term checkbox: {e}")
+# Logs the fields a bulk fill could not set (missing from the page, or no matching option)
+def log_missing_fields(result: Dict[str, List[str]], who: str) -> None:
+    if result["missing"]:
+        logging.warning(f"Skipping {who} fields not found on page: {', '.join(result['missing'])}")
+    if result["unmatched"]:
+        logging.warning(
+            f"Skipping {who} fields with no matching option: {', '.join(result['unmatched'])}"
+        )
 
-        except Exception as e:
-            # If checking fails, log the error and continue
-            logging.warning(f"Could not select the self-subscription term: {e}")
 
-    # Attempt to select a gift subscription term — can be dropdown, checkbox, or radio input.
-    # These usually follow the pattern: cds_donee1_term_value, cds_donee2_term_value, etc.
-    gift_term_elements = page.query_selector_all(
-        '[name^="cds_donee"][name$="_term_value"]:not([disabled]):not([type="hidden"])'
-    )
+# Logs why fill_form stopped before submitting and records it on the attempt
+def stop_attempt(attempt: AttemptRecord, message: str) -> AttemptRecord:
+    logging.warning(message)
+    attempt.status = "incomplete"
+    attempt.error = message
+    return attempt
+
+
+# Fills and submits the form for test_data.region.
+# Returns the attempt record (the one passed in, or a new one) with status, error and term set.
+# With submit=False it stops once every field is filled and sets the status to "filled"
+# (matrix runs then submit each term x payment combination themselves).
+# A `limiter` makes the submission wait for the host's rate-limit token, and a `deadline` bounds
+# every Playwright call (without one only the per-step caps apply).
+async def fill_form(
+    page: Page,
+    test_data: TestData,
+    schema: Optional[FormSchema] = None,
+    attempt: Optional[AttemptRecord] = None,
+    submit: bool = True,
+    limiter: Optional[HostRateLimiter] = None,
+    deadline: Optional[Deadline] = None,
+) -> AttemptRecord:
+    region = test_data.region
+    if attempt is None:
+        attempt = AttemptRecord(url=page.url, region=region, started_at=time.time())
+    # Every Playwright call below takes its timeout from here (step cap, or what is left)
+    deadline = deadline or Deadline.unlimited()
 
-    # Try each matching gift term until one can be selected
-    for term in gift_term_elements:
-        try:
-            tag = term.evaluate("el => el.tagName.toLowerCase()")
-            input_type = term.get_attribute("type") or ""
+    # All "does this field exist / what options does it have" questions are answered from a
+    # single-pass form snapshot. It is only re-taken after steps that can reveal new fields.
+    if schema is None:
+        schema = await extract_schema(page)
 
-            if tag == "select":
-                term.select_option(index=0)
-                logging.info(f"Selected gift term from dropdown: {term.get_attribute('name')}")
-                page.wait_for_timeout(500)
-                break  # Stop after successful selection
-            elif input_type in ["checkbox", "radio"]:
-                term.check()
-                logging.info(f"Checked gift term input: {term.get_attribute('name')}")
-                page.wait_for_timeout(500)
-                break  # Stop after successful selection
-        except Exception as e:
-            logging.warning(f"Could not select gift term ({term.get_attribute('name')}): {e}")
+    # Try selecting both self and gift subscription terms (if present).
+    # Some page may only have one or the other, or both.
+    # This allows us to support self-only, and mixed pages.
 
-    # Fill out donee fields if test_data includes a gift recipient
-    if test_data.donee:
-        # Check that the donee name field is now visible before attempting to fill
-        if page.query_selector('[name="cds_donee1_name"]'):
-            donee = test_data.donee
+    with tracer.span("term_select", attempt):
+        # Look for a standard self-subscription term radio button
+        self_terms = [
+            f
+            for f in schema.find("cds_term_value", tag="input")
+            if not f.disabled and f.type != "hidden"
+        ]
+        # test_data.term_index picks the term (raised by the scheduler on country mismatches)
+        term_index = test_data.term_index
+        if self_terms and term_index >= len(self_terms):
+            return stop_attempt(
+                attempt, f"No term at index {term_index} ({len(self_terms)} self terms on page)"
+            )
+        if self_terms:
+            try:
+                # Attempt to check the self-subscription radio button
+                await (
+                    page.locator(
+                        'input[name="cds_term_value"]:not([disabled]):not([type="hidden"])'
+                    )
+                    .nth(term_index)
+                    .check(timeout=deadline.timeout(500))
+                )
+                logging.info(f"Selected self-subscription term #{term_index} (cds_term_value)")
+                attempt.term = f"cds_term_value={self_terms[term_index].value}"
 
-            donee_name = page.locator('[name="cds_donee1_name"]')
+                # Attempt to select a gift term checkbox if present
+                if schema.has("cds_donee1_term_value", tag="input"):
+                    try:
+                        await page.locator('input[name="cds_donee1_term_value"]').first.check(
+                            timeout=deadline.timeout()
+                        )
+                        logging.info("Checked gift term checkbox (cds_donee1_term_value)")
+                        # Let UI reveal gift fields (returns as soon as they show; 1 s at most)
+                        await wait_for_donee_reveal(page, deadline.timeout(1000))
+                        schema = await extract_schema(page)  # Gift fields may have appeared
+                    except Exception as e:
+                        logging.warning(f"Failed to check gift term checkbox: {e}")
 
+            except Exception as e:
+                # If checking fails, log the error and continue
+                logging.warning(f"Could not select the self-subscription term: {e}")
+
+        # Attempt to select a gift subscription term — can be dropdown, checkbox, or radio input.
+        # These usually follow the pattern: cds_donee1_term_value, cds_donee2_term_value, etc.
+        gift_terms = [
+            f
+            for f in schema.fields
+            if f.name.startswith("cds_donee")
+            and f.name.endswith("_term_value")
+            and not f.disabled
+            and f.type != "hidden"
+        ]
+
+        # Try each matching gift term until one can be selected
+        for term in gift_terms:
+            term_locator = page.locator(
+                f'[name="{term.name}"]:not([disabled]):not([type="hidden"])'
+            ).first
             try:
-                donee_name.wait_for(
-                    state="visible", timeout=3000
-                )  # Wait max 3 seconds for visibility
-                donee_name.fill(donee.name, timeout=1000)  # Timeout after 1 second if not editable
-            except Exception:
-                logging.warning("Gift name field never became visible — skipping donee fill")
-                return
+                if term.tag == "select":
+                    # On gift-only pages the term index applies to the gift term dropdown
+                    option_index = 0 if self_terms else term_index
+                    if option_index and option_index >= len(term.options):
+                        return stop_attempt(
+                            attempt, f"No term at index {term_index} in {term.name} dropdown"
+                        )
+                    await term_locator.select_option(index=option_index, timeout=deadline.timeout())
+                    logging.info(f"Selected gift term #{option_index} from dropdown: {term.name}")
+                    attempt.term = attempt.term or f"{term.name}={term.options[option_index].value}"
+                    await wait_for_donee_reveal(page, deadline.timeout(1000))
+                    schema = await extract_schema(page)
+                    break  # Stop after successful selection
+                elif term.type in ["checkbox", "radio"]:
+                    await term_locator.check(timeout=deadline.timeout())
+                    logging.info(f"Checked gift term input: {term.name}")
+                    attempt.term = attempt.term or f"{term.name}={term.value}"
+                    await wait_for_donee_reveal(page, deadline.timeout(1000))
+                    schema = await extract_schema(page)
+                    break  # Stop after successful selection
+            except Exception as e:
+                logging.warning(f"Could not select gift term ({term.name}): {e}")
 
-            page.locator('[name="cds_donee1_address_1"]').fill(donee.address1)
-            page.locator('[name="cds_donee1_address_2"]').fill("Unit 7")  # optional
-            page.locator('[name="cds_donee1_city"]').fill(donee.city)
+    with tracer.span("donee_fill", attempt):
+        # Fill out donee fields if test_data includes a gift recipient
+        if test_data.donee:
+            # Check that the donee name field is now present before attempting to fill
+            if schema.has("cds_donee1_name"):
+                donee = test_data.donee
 
-            # For CAN/US use cds_donee1_zip, for INTL use cds_donee1_postal
-            if region in ["US", "CAN"] and donee.zip:
-                if page.query_selector('[name="cds_donee1_zip"]'):
-                    page.locator('[name="cds_donee1_zip"]').fill(donee.zip)
-                else:
-                    logging.warning("Donee ZIP field not found — skipping ZIP for donee")
+                donee_name = page.locator('[name="cds_donee1_name"]')
 
-            if region == "INTL" and donee.postal:
-                if page.query_selector('[name="cds_donee1_postal"]'):
-                    page.locator('[name="cds_donee1_postal"]').fill(donee.postal)
-                else:
+                try:
+                    # Wait max 3 seconds for visibility
+                    await donee_name.wait_for(state="visible", timeout=deadline.timeout(3000))
+                except Exception:
+                    return stop_attempt(
+                        attempt, "Gift name field never became visible — skipping donee fill"
+                    )
+
+                # All donee text fields go into the page in a single round trip
+                donee_values = address_fields("cds_donee1", donee, "Unit 7")
+
+                # For CAN/US use cds_donee1_zip, for INTL use cds_donee1_postal
+                if region in ["US", "CAN"] and donee.zip and not schema.has("cds_donee1_zip"):
+                    logging.warning("Donee ZIP field not found — skipping ZIP for donee")
+                elif region == "INTL" and donee.postal and not schema.has("cds_donee1_postal"):
                     logging.warning("Donee POSTAL field not found — skipping postal for donee")
+                else:
+                    donee_values.update(postal_fields("cds_donee1", donee, region))
 
-            if donee.email and page.query_selector('[name="cds_donee1_email"]'):
-                page.locator('[name="cds_donee1_email"]').fill(donee.email)
-            else:
-                logging.info("Skipping donee email: not found or not provided")
-            # Select donee country if dropdown exists
-            if page.query_selector('select[name="cds_donee1_country"]') and donee.country:
-                try:
-                    gift_country_dropdown = page.locator('select[name="cds_donee1_country"]')
+                if donee.email and schema.has("cds_donee1_email"):
+                    donee_values.update(email_fields("cds_donee1", donee.email))
+                else:
+                    logging.info("Skipping donee email: not found or not provided")
 
-                    # Wait until the dropdown is visible
-                    page.wait_for_selector(
-                        'select[name="cds_donee1_country"]', state="visible", timeout=3000
+                result = await bulk_fill(page, donee_values)
+                if "cds_donee1_name" in result["missing"]:
+                    return stop_attempt(
+                        attempt, "Gift name field not editable — skipping donee fill"
                     )
-                    page.wait_for_timeout(500)  # Give time for animation to fully complete
-
-                    # Wait up to 2 seconds total for options to appear
-                    for _ in range(10):
-                        options = gift_country_dropdown.locator("option").all()
-                        if len(options) > 1:
-                            break
-                        page.wait_for_timeout(200)
-                    else:
-                        logging.warning("Gift country dropdown never populated with options")
+                log_missing_fields(result, "donee")
 
-                    gift_country_dropdown.select_option(donee.country)
-                    logging.info(f"Selected donee country: {donee.country}")
+                # Select donee country if dropdown exists
+                if schema.has("cds_donee1_country", tag="select") and donee.country:
+                    try:
+                        gift_country_dropdown = page.locator('select[name="cds_donee1_country"]')
 
-                except Exception as e:
-                    logging.warning(f"Failed to select donee country: {e}")
+                        # Wait until the dropdown is visible
+                        await page.wait_for_selector(
+                            'select[name="cds_donee1_country"]',
+                            state="visible",
+                            timeout=deadline.timeout(3000),
+                        )
 
-            # Set state if it's a US/CAN region and dropdown exists
-            if region in ["US", "CAN"] and donee.state:
-                try:
-                    donee_state_dropdown = page.locator('select[name="cds_donee1_state"]')
-                    donee_state_dropdown.wait_for(state="visible", timeout=1000)
-
-                    # Get all option values once
-                    values = [
-                        opt.get_attribute("value")
-                        for opt in donee_state_dropdown.locator("option").all()
-                    ]
-                    if not any(val and val.upper() == donee.state for val in values):
-                        logging.warning(
-                            f"Donee state '{donee.state}' not found in dropdown — skipping"
+                        # Wait for the options list to be populated (2.5 s at most).
+                        # select_option below already waits for the element to be stable.
+                        if not await wait_for_options(
+                            page, 'select[name="cds_donee1_country"]', deadline.timeout(2500)
+                        ):
+                            logging.warning("Gift country dropdown never populated with options")
+
+                        await gift_country_dropdown.select_option(
+                            donee.country, timeout=deadline.timeout()
                         )
-                        return
+                        logging.info(f"Selected donee country: {donee.country}")
 
-                    donee_state_dropdown.select_option(donee.state)
-                except Exception:
-                    logging.warning("Skipping donee state: not visible or not selectable")
+                        # The donee state list may be rebuilt for the chosen country
+                        schema = await extract_schema(page)
 
-            logging.info("Filled donee (gift recipient) fields")
-        else:
-            logging.info("Gift form not visible — skipping donee field fill")
+                    except Exception as e:
+                        logging.warning(f"Failed to select donee country: {e}")
+
+                # Set state if it's a US/CAN region and dropdown exists
+                if region in ["US", "CAN"] and donee.state:
+                    try:
+                        donee_state_dropdown = page.locator('select[name="cds_donee1_state"]')
+                        await donee_state_dropdown.wait_for(
+                            state="visible", timeout=deadline.timeout(1000)
+                        )
+
+                        # Option values come from the snapshot, not from the DOM
+                        values = schema.option_values("cds_donee1_state")
+                        if not any(val and val.upper() == donee.state for val in values):
+                            return stop_attempt(
+                                attempt,
+                                f"Donee state '{donee.state}' not found in dropdown — skipping",
+                            )
 
-    # Fill out buyer name and address using test_data
+                        await donee_state_dropdown.select_option(
+                            donee.state, timeout=deadline.timeout()
+                        )
+                    except Exception:
+                        logging.warning("Skipping donee state: not visible or not selectable")
+
+                logging.info("Filled donee (gift recipient) fields")
+            else:
+                logging.info("Gift form not visible — skipping donee field fill")
+
+    # Buyer text fields are collected here and filled in one round trip after payment selection
     buyer = test_data.buyer
-    page.locator('[name="cds_name"]').fill(buyer.name)
-    page.locator('[name="cds_address_1"]').fill(buyer.address1)
-    page.locator('[name="cds_address_2"]').fill("Apt 28")  # optional
-    page.locator('[name="cds_city"]').fill(buyer.city)
+    buyer_values = address_fields("cds", buyer, "Apt 28")
 
-    # Select country before ZIP/postal (some fields only appear after country is selected)
-    if page.query_selector('select[name="cds_country"]') and buyer.country:
-        page.locator('select[name="cds_country"]').select_option(buyer.country)
+    with tracer.span("country_select", attempt):
+        # Select country before ZIP/postal (some fields only appear after country is selected)
+        if schema.has("cds_country", tag="select") and buyer.country:
+            await page.locator('select[name="cds_country"]').select_option(
+                buyer.country, timeout=deadline.timeout()
+            )
 
-        page.wait_for_timeout(500)  # Allow time for postal fields to appear
+            # Allow time for postal fields to appear (returns as soon as they do; 0.5 s at most)
+            await wait_for_postal_field(page, region, deadline.timeout(500))
+            schema = await extract_schema(page)  # ZIP/postal and state fields may have changed
 
     # Fill ZIP for US/CAN
     if region in ["US", "CAN"] and buyer.zip:
-        if page.query_selector('[name="cds_zip"]'):
-            page.locator('[name="cds_zip"]').fill(buyer.zip)
-        else:
-            logging.warning("Skipping page: ZIP field not found for US/CAN")
-            return  # Exit early if zip field is unexpectedly missing
+        if not schema.has("cds_zip"):
+            # Exit early if zip field is unexpectedly missing
+            return stop_attempt(attempt, "Skipping page: ZIP field not found for US/CAN")
 
     # Zip/Postal
     if region == "INTL" and buyer.postal:
-        if page.query_selector('[name="cds_postal"]'):
-            postal_field = page.locator('input[name="cds_postal"]:not([type="hidden"])')
-            if postal_field.count() == 0:
-                logging.warning(
-                    "Skipping page: INTL selected but no visible cds_postal field found"
-                )
-                return
-            postal_field.first.fill(buyer.postal)
-        else:
-            logging.warning("Skipping page: INTL selected but no cds_postal field found")
-            return  # Exit form fill early.
-
-    page.locator('[name="cds_email"]').fill(buyer.email)
-
-    # State/Province for buyer (only for US and CAN)
-    if region in ["US", "CAN"] and buyer.state:
-        try:
-            buyer_state_dropdown = page.locator('select[name="cds_state"]')
-            buyer_state_dropdown.wait_for(state="visible", timeout=1000)
-
-            values = [
-                opt.get_attribute("value") for opt in buyer_state_dropdown.locator("option").all()
-            ]
-            if not any(val and val.upper() == buyer.state for val in values):
-                logging.warning(f"Buyer state '{buyer.state}' not found in dropdown — skipping")
-                return
+        if not schema.has("cds_postal"):
+            # Exit form fill early.
+            return stop_attempt(
+                attempt, "Skipping page: INTL selected but no cds_postal field found"
+            )
+        if not [f for f in schema.find("cds_postal", tag="input") if f.type != "hidden"]:
+            return stop_attempt(
+                attempt, "Skipping page: INTL selected but no visible cds_postal field found"
+            )
+
+    buyer_values.update(postal_fields("cds", buyer, region))
+    buyer_values.update(email_fields("cds", buyer.email))
+
+    with tracer.span("state_select", attempt):
+        # State/Province for buyer (only for US and CAN)
+        if region in ["US", "CAN"] and buyer.state:
+            try:
+                buyer_state_dropdown = page.locator('select[name="cds_state"]')
+                await buyer_state_dropdown.wait_for(state="visible", timeout=deadline.timeout(1000))
 
-            buyer_state_dropdown.select_option(buyer.state)
-        except Exception:
-            logging.warning("Skipping buyer state: not visible or not selectable")
+                values = schema.option_values("cds_state")
+                if not any(val and val.upper() == buyer.state for val in values):
+                    return stop_attempt(
+                        attempt, f"Buyer state '{buyer.state}' not found in dropdown — skipping"
+                    )
 
-    # Fill in Credit card info
-    # Handle payment method: dropdown or radio
-    pay_type_selector = page.query_selector('[name="cds_pay_type"]')
-    if pay_type_selector:
-        tag = pay_type_selector.evaluate("el => el.tagName.toLowerCase()")
+                await buyer_state_dropdown.select_option(buyer.state, timeout=deadline.timeout())
+            except Exception:
+                logging.warning("Skipping buyer state: not visible or not selectable")
 
-        if tag == "select":
-            try:
-                pay_type_selector.select_option("2")  # Visa
-                logging.info("Selected payment type from dropdown: Visa (2)")
-            except Exception as e:
-                logging.warning(f"Failed to select Visa from payment dropdown: {e}")  # nosec B608: false positive, not SQL
+    with tracer.span("payment_select", attempt):
+        # Fill in Credit card info
+        # Handle payment method: dropdown or radio
+        pay_types = schema.find("cds_pay_type")
+        if pay_types:
+            tag = pay_types[0].tag
+            pay_type_locator = page.locator('[name="cds_pay_type"]')
 
-        elif tag == "input":
-            try:
-                radios = page.locator('[name="cds_pay_type"]')
-                checked_radio = radios.locator(":checked")
+            if tag == "select":
+                try:
+                    await pay_type_locator.first.select_option(  # Visa
+                        "2", timeout=deadline.timeout()
+                    )
+                    logging.info("Selected payment type from dropdown: Visa (2)")
+                except Exception as e:
+                    logging.warning(f"Failed to select Visa from payment dropdown: {e}")  # nosec B608: false positive, not SQL
 
-                if checked_radio.count() > 0:
-                    logging.info("Payment radio already selected — skipping selection")
-                else:
-                    visa_radio = page.query_selector('[name="cds_pay_type"][value="2"]')
-                    if visa_radio:
-                        visa_radio.check()
+            elif tag == "input":
+                try:
+                    if any(f.checked for f in pay_types):
+                        logging.info("Payment radio already selected — skipping selection")
+                    elif any(f.value == "2" for f in pay_types):
+                        await page.locator('[name="cds_pay_type"][value="2"]').first.check(
+                            timeout=deadline.timeout()
+                        )
                         logging.info("Checked Visa radio button (value=2)")
                     else:
-                        radios.first.check()
+                        await pay_type_locator.first.check(timeout=deadline.timeout())
                         logging.info("Checked first available payment radio as fallback")
-            except Exception as e:
-                logging.warning(f"Failed to handle payment radio buttons: {e}")
+                except Exception as e:
+                    logging.warning(f"Failed to handle payment radio buttons: {e}")
+
+            else:
+                logging.warning(f"cds_pay_type tag not supported: {tag}")
 
         else:
-            logging.warning(f"cds_pay_type tag not supported: {tag}")
+            logging.warning("cds_pay_type not found on page")
 
-    else:
-        logging.warning("cds_pay_type not found on page")
+    # Fill CVV if the field exists
+    has_cvv = schema.has("cds_cc_security_code")
+    if not has_cvv:
+        logging.warning("Skipping CVV: cds_cc_security_code not found on page")
 
-    page.locator('[name="cds_cc_number"]').fill(CREDIT_CARD_NUMBER)
+    with tracer.span("buyer_fill", attempt):
+        # One round trip for buyer address, ZIP/postal, email and credit card fields
+        buyer_values.update(card_fields(include_cvv=has_cvv))
+        result = await bulk_fill(page, buyer_values)
+        log_missing_fields(result, "buyer")
 
-    page.locator('select[name="cds_cc_exp_month"]').select_option(CC_EXP_MONTH)
-    page.locator('select[name="cds_cc_exp_year"]').select_option(CC_EXP_YEAR)
+    # These fields used to make fill() time out and abort the attempt; keep failing loudly
+    required_missing = [
+        name for name in result["missing"] + result["unmatched"] if name in REQUIRED_BUYER_FIELDS
+    ]
+    if required_missing:
+        raise RuntimeError(f"Required fields missing or not selectable: {required_missing}")
 
-    # Fill CVV if the field exists
-    if page.query_selector('[name="cds_cc_security_code"]'):
-        page.locator('[name="cds_cc_security_code"]').fill(CC_CVV)
-    else:
-        logging.warning("Skipping CVV: cds_cc_security_code not found on page")
+    if not submit:
+        attempt.status = "filled"
+        return attempt
 
     # Log the region just before submission
     logging.info(f"Submitting form for region {region} at URL: {page.url}")
 
-    # Click the order button
-    page.locator('[name="send"]').click()
+    await throttle(limiter, page.url, attempt, deadline)
+
+    with tracer.span("submit", attempt):
+        # Click the order button
+        await page.locator('[name="send"]').click(timeout=deadline.timeout())
+
+    with tracer.span("post_submit_wait", attempt):
+        # Wait a few seconds to observe confirmation page
+        await page.wait_for_timeout(deadline.timeout(3000))  # waits 3 seconds
+
+    with tracer.span("result_check", attempt):
+        # Check for error messages after submission
+        if await page.query_selector(".error"):
+            error_text = await page.locator(".error").inner_text(timeout=deadline.timeout())
+            logging.error(f"Submission error detected for region {region}: {error_text}")
+            attempt.status = "submission_error"
+            attempt.error = error_text
+            if "country" in error_text.lower() and "match" in error_text.lower():
+                return attempt  # Try the next term
+            else:
+                return attempt  # Stop on unrelated error
+        else:
+            logging.info(f"Submission successful for region {region}")
+            attempt.status = "success"
+            return attempt  # Stop if successful
 
-    # Wait a few seconds to observe confirmation page
-    page.wait_for_timeout(3000)  # waits 3 seconds
 
-    # Check for error messages after submission
-    if page.query_selector(".error"):
-        error_text = page.locator(".error").inner_text()
-        logging.error(f"Submission error detected for region {region}: {error_text}")
-        if "country" in error_text.lower() and "match" in error_text.lower():
-            return  # Try the next term
-        else:
-            return  # Stop on unrelated error
-    else:
-        logging.info(f"Submission successful for region {region}")
-        return  # Stop if successful
+async def run_test_async(url: str, test_data: TestData, pool: BrowserPool) -> bool:
+    # Always a fresh context: a parked host context would carry the previous test's state
+    async with pool.context(url, reuse=False) as context:
+        page = await context.new_page()
+        await page.goto(url, timeout=10000)
+
+        await fill_form(page, test_data)
+
+        # Very basic success check — customize later if needed
+        return page.url != url
 
 
-def run_test(url: str, test_data: TestData) -> bool:
+def run_test(url: str, test_data: TestData, pool: Optional[BrowserPool] = None) -> bool:
     """
     Entry point for pytest to run a single form submission test.
     Uses Playwright to submit the form using provided test data.
+    Pass a pool started with BrowserPool.start_sync() (see the browser_pool fixture in
+    tests/conftest.py) to reuse one browser across tests; otherwise a browser is started
+    and shut down for this call.
     Returns True if submission appears successful, False otherwise.
     """
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            page = browser.new_page()
-            page.goto(url, timeout=10000)
+        if pool is not None:
+            return pool.run(run_test_async(url, test_data, pool))
 
-            fill_form(page, test_data)
+        async def run_once() -> bool:
+            own_pool = await BrowserPool(network_profile=profile_from_config([url])).start()
+            try:
+                return await run_test_async(url, test_data, own_pool)
+            finally:
+                await own_pool.close()
 
-            # Very basic success check — customize later if needed
-            if page.url != url:
-                return True
-            else:
-                return False
+        return asyncio.run(run_once())
     except Exception as e:
         print(f"run_test() failed: {e}")
         return False
 
 
-# This runs when the script is launched directly
+# This runs when the script is launched directly (headless batch runs use cli.py instead)
 if __name__ == "__main__":
+    # Tkinter is only needed here, so it is imported on demand
+    from gui import get_user_input
+
+    configure_logging()
+
     # Open the GUI and collect URLs + test options
     user_input = get_user_input()
 
     # Run the inspection process on the collected URLs
     run_discovery(user_input)
+
+    input("\n Press Enter to close the browser...")
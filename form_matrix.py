@@ -0,0 +1,247 @@
+# Term x payment-type matrix runs.
+# The buyer/donee fields are filled once (fill_form with submit=False). Then, for every
+# combination, only the term and payment selections are changed and the form is submitted.
+# A page without scripts or inline handlers is submitted from inside the page with fetch(), so it
+# never navigates away and the filled state is reused by the next combination. Any other page is
+# submitted like a real order (click on `send`, so its onsubmit/JS handlers run) and reloaded and
+# refilled before the next combination.
+# Each combination is streamed as its own AttemptRecord (kind="combination").
+import logging
+import time
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+from playwright.async_api import Page
+
+from data_models import AttemptRecord, FieldInfo, FormSchema
+from prescreen import parse_static_page
+from protocol_submit import browser_reason
+from rate_limit import HostRateLimiter, throttle
+from tracing import tracer
+from waits import wait_for_donee_reveal
+
+# Payment type names offered by the GUI, and the option/label words that identify each one
+PAY_TYPE_KEYWORDS = {
+    "Credit Card": ("visa", "master", "amex", "american express", "discover", "credit"),
+    "PayPal": ("paypal",),
+    "Amazon": ("amazon",),
+}
+
+# One selection: (field name, value, human-readable text)
+Choice = Tuple[str, str, str]
+
+# Checks a radio/checkbox or selects a dropdown option, firing the events page scripts listen to
+SELECT_CHOICE_JS = """
+([name, value]) => {
+    const els = Array.from(document.getElementsByName(name));
+    const select = els.find((el) => el.tagName.toLowerCase() === "select");
+    const target = select || els.find((el) => el.value === value);
+    if (!target) return false;
+    if (select) {
+        select.value = value;
+    } else {
+        target.checked = true;
+    }
+    target.dispatchEvent(new Event("input", { bubbles: true }));
+    target.dispatchEvent(new Event("change", { bubbles: true }));
+    return true;
+}
+"""
+
+# Time given to the page a click on `send` leads to before its .error element is read (the same
+# observation window fill_form uses), and to the donee block after a term change
+POST_SUBMIT_WAIT_MS = 3000
+DONEE_REVEAL_MS = 1000
+
+# Submits the current form state with fetch() and reports the response's .error text (if any)
+SUBMIT_IN_PAGE_JS = """
+async () => {
+    const anchor = document.querySelector('[name="cds_name"], [name="send"]');
+    const form = (anchor && anchor.form) || document.forms[0];
+    if (!form) return { status: 0, error: "No form on the page" };
+    const data = new FormData(form);
+    // A real click on the order button submits its name/value too
+    const send = form.querySelector('[name="send"]');
+    if (send) data.append("send", send.value || "");
+    const method = (form.getAttribute("method") || "get").toUpperCase();
+    const body = new URLSearchParams(data);
+    const response = method === "GET"
+        ? await fetch(form.action + (form.action.includes("?") ? "&" : "?") + body, { credentials: "include" })
+        : await fetch(form.action, { method: method, body: body, credentials: "include" });
+    const doc = new DOMParser().parseFromString(await response.text(), "text/html");
+    const error = doc.querySelector(".error");
+    return { status: response.status, error: error ? error.textContent.trim() : null };
+}
+"""
+
+
+# Payment type name (as in PAY_TYPE_KEYWORDS) for an option text or radio label, or None
+def pay_type_name(text: str) -> Optional[str]:
+    lowered = text.lower()
+    for name, keywords in PAY_TYPE_KEYWORDS.items():
+        if any(word in lowered for word in keywords):
+            return name
+    return None
+
+
+# Every selectable term: the self-subscription radios, or the gift terms on gift-only pages
+def term_choices(schema: FormSchema) -> List[Choice]:
+    def usable(field: FieldInfo) -> bool:
+        return not field.disabled and field.type != "hidden"
+
+    choices: List[Choice] = []
+    for field in schema.find("cds_term_value", tag="input"):
+        if usable(field) and field.value is not None:
+            choices.append((field.name, field.value, field.label or field.value))
+    if choices:
+        return _unique(choices)
+
+    for field in schema.fields:
+        if not (field.name.startswith("cds_donee") and field.name.endswith("_term_value")):
+            continue
+        if not usable(field):
+            continue
+        if field.tag == "select":
+            choices.extend((field.name, o.value, o.text) for o in field.options if o.value)
+        elif field.value is not None:
+            choices.append((field.name, field.value, field.label or field.value))
+        break  # Only the first gift term field is varied
+    return _unique(choices)
+
+
+# Every payment choice belonging to one of the wanted payment types (all of them when empty)
+def pay_type_choices(schema: FormSchema, wanted: List[str]) -> List[Choice]:
+    choices: List[Choice] = []
+    for field in schema.find("cds_pay_type"):
+        if field.disabled:
+            continue
+        if field.tag == "select":
+            options = [(o.value, o.text) for o in field.options if o.value]
+        elif field.value is not None:
+            options = [(field.value, field.label)]
+        else:
+            options = []
+        for value, text in options:
+            if not wanted or pay_type_name(text) in wanted:
+                choices.append((field.name, value, text or value))
+    return _unique(choices)
+
+
+# Drops repeated (name, value) pairs, keeping the first
+def _unique(choices: List[Choice]) -> List[Choice]:
+    seen = set()
+    unique = []
+    for choice in choices:
+        if choice[:2] not in seen:
+            seen.add(choice[:2])
+            unique.append(choice)
+    return unique
+
+
+# Posts the current form state with fetch(); returns the error it led to, or None
+async def submit_in_page(page: Page) -> Optional[str]:
+    response = await page.evaluate(SUBMIT_IN_PAGE_JS)
+    if response["error"]:
+        return response["error"]
+    if response["status"] >= 400:
+        return f"HTTP {response['status']}"
+    return None
+
+
+# Clicks the order button like fill_form does; returns the error the resulting page shows, or None
+async def submit_by_click(page: Page) -> Optional[str]:
+    await page.locator('[name="send"]').click()
+    await page.wait_for_timeout(POST_SUBMIT_WAIT_MS)
+    if await page.query_selector(".error"):
+        return await page.locator(".error").inner_text()
+    return None
+
+
+# Why combinations have to be submitted with a click, or None when the fetch() shortcut is safe:
+# the same check that keeps a page off the protocol-level path, run on the loaded document
+async def click_reason(page: Page) -> Optional[str]:
+    return browser_reason(parse_static_page(await page.content(), page.url))
+
+
+# Submits every term x payment combination on an already filled page.
+# Returns one finished AttemptRecord per combination (not yet recorded).
+# A `limiter` makes each post wait for the host's rate-limit token. `refill` reloads and refills
+# the page after a click submission navigated away (required unless the page has no scripts).
+async def run_matrix(
+    page: Page,
+    schema: FormSchema,
+    pay_types: List[str],
+    base: AttemptRecord,
+    limiter: Optional[HostRateLimiter] = None,
+    refill: Optional[Callable[[AttemptRecord], Awaitable[None]]] = None,
+) -> List[AttemptRecord]:
+    terms: List[Optional[Choice]] = list(term_choices(schema)) or [None]
+    pays: List[Optional[Choice]] = list(pay_type_choices(schema, pay_types)) or [None]
+    logging.info(
+        f"Matrix: {len(terms)} term(s) x {len(pays)} payment type(s) for region {base.region}"
+    )
+    reason = await click_reason(page)
+    if reason is not None and refill is None:
+        raise RuntimeError(f"Matrix needs real submits ({reason}) but cannot refill the page")
+    if reason is not None:
+        logging.info(f"Matrix submits by clicking send: {reason}")
+    has_donee = schema.has("cds_donee1_name") or schema.has("cds_donee1_term_value")
+
+    combinations = []
+    submitted = False  # Whether the page has navigated away since it was filled
+    for term in terms:
+        for pay in pays:
+            combination = AttemptRecord(
+                run_id=base.run_id,
+                url=base.url,
+                region=base.region,
+                worker=base.worker,
+                kind="combination",
+                started_at=time.time(),
+                term=f"{term[0]}={term[1]}" if term else base.term,
+                pay_type=f"{pay[0]}={pay[1]} ({pay[2]})" if pay else None,
+            )
+            start = time.perf_counter()
+            try:
+                if submitted and refill is not None:
+                    with tracer.span("matrix_refill", combination):
+                        await refill(combination)
+                    submitted = False
+                with tracer.span("matrix_select", combination):
+                    for choice in (term, pay):
+                        if choice and not await page.evaluate(SELECT_CHOICE_JS, list(choice[:2])):
+                            raise RuntimeError(f"Could not select {choice[0]}={choice[1]}")
+                    if term and has_donee:
+                        # A new term may reveal (or rebuild) the donee block
+                        await wait_for_donee_reveal(page, DONEE_REVEAL_MS)
+                await throttle(limiter, page.url, combination)
+                with tracer.span("matrix_submit", combination):
+                    if reason is None:
+                        error = await submit_in_page(page)
+                    else:
+                        submitted = True
+                        error = await submit_by_click(page)
+                if error:
+                    combination.status = "submission_error"
+                    combination.error = error
+                else:
+                    combination.status = "success"
+            except Exception as e:
+                combination.status = "error"
+                combination.error = str(e)
+            combination.duration_ms = (time.perf_counter() - start) * 1000
+            logging.info(
+                f"Matrix {combination.term} / {combination.pay_type}: {combination.status}"
+                + (f" ({combination.error})" if combination.error else "")
+            )
+            combinations.append(combination)
+    return combinations
+
+
+# Region-level status for a finished matrix: success only if every combination succeeded
+def summarize_matrix(attempt: AttemptRecord, combinations: List[AttemptRecord]) -> None:
+    failed = [c for c in combinations if c.status != "success"]
+    if not failed:
+        attempt.status = "success"
+        return
+    attempt.status = failed[0].status
+    attempt.error = f"{len(failed)} of {len(combinations)} combinations failed"
@@ -0,0 +1,98 @@
+# Single-pass form schema extraction.
+# Instead of dozens of query_selector/get_attribute round trips, one page.evaluate call
+# returns every cds_* field (tag, type, visibility, disabled state, options) as a FormSchema.
+# Region support is then decided here in plain Python from that snapshot.
+from typing import Optional
+
+from playwright.async_api import Page
+
+from data_models import FormSchema
+
+
+# Immutable sets of country names for region sets.
+US_COUNTRIES = frozenset(["united states"])
+CAN_COUNTRIES = frozenset(["canada"])
+# Not currently used. Reserved in case we need to explicitly check INTL countries later.
+INTL_COUNTRIES = frozenset(["united kingdom"])
+
+
+# Runs inside the browser. Collects every cds_* control plus the submit button in DOM order.
+# Option and input values use getAttribute so a missing value attribute stays null.
+EXTRACT_SCHEMA_JS = """
+() => {
+    const isVisible = (el) => {
+        const rect = el.getBoundingClientRect();
+        const style = window.getComputedStyle(el);
+        return (rect.width > 0 || rect.height > 0) && style.visibility !== "hidden";
+    };
+    const fields = [];
+    for (const el of document.querySelectorAll('[name^="cds_"], [name="send"]')) {
+        const tag = el.tagName.toLowerCase();
+        fields.push({
+            name: el.getAttribute("name"),
+            tag: tag,
+            type: (el.getAttribute("type") || "").toLowerCase(),
+            value: tag === "select" ? el.value : el.getAttribute("value"),
+            checked: !!el.checked,
+            disabled: !!el.disabled,
+            visible: isVisible(el),
+            label: el.labels && el.labels.length ? (el.labels[0].textContent || "").trim() : "",
+            options: tag === "select"
+                ? Array.from(el.options).map((o) => ({
+                      value: o.getAttribute("value"),
+                      text: (o.textContent || "").trim(),
+                      selected: o.selected,
+                  }))
+                : [],
+        });
+    }
+    const anchor = document.querySelector('[name="cds_name"], [name="send"]');
+    const form = (anchor && anchor.form) || document.forms[0] || null;
+    return {
+        url: location.href,
+        action: form ? form.action : null,
+        method: form ? (form.getAttribute("method") || "get").toLowerCase() : "get",
+        fields: fields,
+    };
+}
+"""
+
+
+# Takes the form snapshot with a single protocol round trip
+async def extract_schema(page: Page) -> FormSchema:
+    raw = await page.evaluate(EXTRACT_SCHEMA_JS)
+    return FormSchema.model_validate(raw)
+
+
+# Decides from the snapshot whether a region can be tested on this page.
+# Returns None when the region is supported, otherwise the reason it should be skipped.
+def region_skip_reason(schema: FormSchema, region: str) -> Optional[str]:
+    country_dropdown = schema.first("cds_country", tag="select")
+    if country_dropdown:
+        # Page uses a dropdown - normalize option values to lowercase for comparison
+        normalized_options = [opt.value.lower() for opt in country_dropdown.options if opt.value]
+
+        if region == "US" and not any(opt in US_COUNTRIES for opt in normalized_options):
+            return "Region US not supported in dropdown"
+        if region == "CAN" and not any(opt in CAN_COUNTRIES for opt in normalized_options):
+            return "Region CAN not supported in dropdown"
+        # For INTL testing, the dropdown must include *any* country besides US and CAN
+        if region == "INTL" and not any(
+            opt not in US_COUNTRIES | CAN_COUNTRIES for opt in normalized_options
+        ):
+            return "Region INTL not supported (dropdown only includes US or CAN)"
+        return None
+
+    # No dropdown - look for hidden input (used for US or CAN only)
+    country_input = schema.first("cds_country", tag="input")
+    if country_input:
+        value = country_input.value
+        normalized = value.lower().strip() if value else ""
+
+        if region == "US" and normalized not in US_COUNTRIES:
+            return f"Region US not supported (hidden input shows {value})"
+        if region == "CAN" and normalized not in CAN_COUNTRIES:
+            return f"Region CAN not supported (hidden input shows {value})"
+        if region == "INTL" and normalized in US_COUNTRIES | CAN_COUNTRIES:
+            return f"Region INTL not supported (hidden input shows {value})"
+    return None
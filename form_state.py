@@ -0,0 +1,134 @@
+# Form fingerprints and last results, for incremental runs.
+# Most gateway pages do not change between nightly runs. Each page's form, as the region attempt
+# loaded it (the browser snapshot after scripts ran, or the served HTML of a script-free page on
+# the protocol path), gets a stable fingerprint (field names/tags/types, option sets and the
+# action URL; no values, so session tokens in hidden inputs do not count as changes), stored with
+# the last status of every region. In incremental mode a region is only re-submitted when the
+# fingerprint changed, the page's last result is older than the maximum age, or any region of it
+# did not pass; otherwise the stored result is carried forward.
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Callable, Dict, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit
+
+from pydantic import BaseModel
+
+from data_models import FormSchema
+
+from config import FORM_STATE_PATH, INCREMENTAL_MAX_AGE_HOURS
+
+# Region statuses that count as a pass (anything else is re-submitted next time)
+PASSED_STATUSES = frozenset(["success", "skipped"])
+
+# Status of a region that was not re-submitted because its page was unchanged
+CARRIED_FORWARD = "carried_forward"
+
+
+# Stable hash of a form's structure: the same served form always gives the same fingerprint
+def form_fingerprint(schema: FormSchema) -> str:
+    fields = sorted(
+        {
+            (f.name, f.tag, f.type, tuple(sorted(o.value or o.text for o in f.options)))
+            for f in schema.fields
+        }
+    )
+    action = urlunsplit(urlsplit(schema.action or "")._replace(fragment=""))
+    canonical = json.dumps({"action": action, "method": schema.method, "fields": fields})
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+# What the last run that tested a page found
+class PageState(BaseModel):
+    url: str
+    fingerprint: str
+    statuses: Dict[str, str]  # Region -> AttemptRecord.status
+    run_id: str = ""
+    tested_at: float = 0.0  # Unix timestamp
+
+    def passed(self) -> bool:
+        return all(status in PASSED_STATUSES for status in self.statuses.values())
+
+
+class FormStateStore:
+    def __init__(
+        self,
+        path: str = FORM_STATE_PATH,
+        max_age_seconds: float = INCREMENTAL_MAX_AGE_HOURS * 3600,
+        clock: Callable[[], float] = time.time,  # Replaceable in tests
+    ) -> None:
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+        self.carried_forward = 0  # Regions not re-submitted this run
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # timeout + WAL let sharded worker processes share the file safely
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS page_state (
+                url TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                statuses TEXT NOT NULL,
+                run_id TEXT NOT NULL,
+                tested_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[PageState]:
+        row = self._db.execute(
+            "SELECT fingerprint, statuses, run_id, tested_at FROM page_state WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        fingerprint, statuses, run_id, tested_at = row
+        return PageState(
+            url=url,
+            fingerprint=fingerprint,
+            statuses=json.loads(statuses),
+            run_id=run_id,
+            tested_at=tested_at,
+        )
+
+    # Records the result of testing a page now. Carried forward regions keep the status (and,
+    # when nothing was re-tested, the run and age) they were last tested with.
+    def put(self, url: str, fingerprint: str, statuses: Dict[str, str], run_id: str) -> None:
+        carried = [region for region, status in statuses.items() if status == CARRIED_FORWARD]
+        if carried:
+            last = self.get(url)
+            if last is None or len(carried) == len(statuses):
+                return  # Nothing new was learned about this page
+            statuses = {**statuses, **{r: last.statuses.get(r, "") for r in carried}}
+        self._db.execute(
+            "INSERT OR REPLACE INTO page_state VALUES (?, ?, ?, ?, ?)",
+            (url, fingerprint, json.dumps(statuses), run_id, self.clock()),
+        )
+        self._db.commit()
+
+    # The stored state when the page can be carried forward (same fingerprint, every region
+    # passed, not older than the maximum age), otherwise None
+    def unchanged(self, url: str, fingerprint: str, regions: Iterable[str]) -> Optional[PageState]:
+        state = self.get(url)
+        if state is None or state.fingerprint != fingerprint or not state.passed():
+            return None
+        if self.clock() - state.tested_at > self.max_age_seconds:
+            return None
+        if any(region not in state.statuses for region in regions):
+            return None
+        return state
+
+    def close(self) -> None:
+        self._db.close()
+
+
+# Opens the store configured in config.py, or returns None when it is turned off
+def state_store_from_config() -> Optional[FormStateStore]:
+    if not FORM_STATE_PATH:
+        return None
+    return FormStateStore()
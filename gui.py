@@ -36,6 +36,7 @@ def get_user_input() -> Dict[str, List[str]]:
         input_data["urls"] = urls
         # input_data["region"] = region
         input_data["pay_types"] = pay_types
+        input_data["matrix"] = matrix_var.get()
 
         # Close the GUI window
         root.destroy()
@@ -70,6 +71,12 @@ def get_user_input() -> Dict[str, List[str]]:
         pay_listbox.insert(tk.END, option)
     pay_listbox.pack(padx=10, pady=(0, 10))
 
+    # Matrix mode: submit every term x selected payment type instead of one order per region
+    matrix_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(root, text="Test every term x payment type (matrix)", variable=matrix_var).pack(
+        pady=(0, 10)
+    )
+
     # Submit button to trigger the test
     tk.Button(root, text="Run Tests", command=submit).pack(pady=(0, 15))
 
@@ -0,0 +1,58 @@
+# HAR record/replay of gateway pages, for deterministic, network-free reruns while debugging.
+#   record - each context lent for a URL saves that page's traffic to HAR_DIR/<page>.har when
+#            the context is closed
+#   replay - the page is served from its HAR file with route_from_har. Anything missing from the
+#            recording is aborted, and order submissions (POSTs) are answered with a stub
+#            confirmation page, so a replayed run is fast, repeatable and fully offline.
+# One file per cds_mag_code / cds_page_id (same key as the schema cache).
+import hashlib
+import logging
+import os
+
+from playwright.async_api import BrowserContext, Route
+
+from schema_cache import page_key
+
+HAR_MODES = ("off", "record", "replay")
+
+# Answer to every submission POST during replay (no .error, so the attempt counts as a success)
+STUB_ORDER_HTML = "<html><body><h1>Order received (HAR replay stub)</h1></body></html>"
+
+
+# HAR file used for a URL, e.g. har/CSI-283316.har (a hash of the URL when it has no page key)
+def har_path(har_dir: str, url: str) -> str:
+    key = page_key(url)
+    name = "-".join(key) if key else hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]  # nosec
+    return os.path.join(har_dir, f"{name}.har")
+
+
+# Stubs POST requests; everything else falls through to the HAR handler
+async def _stub_post(route: Route) -> None:
+    if route.request.method != "POST":
+        await route.fallback()
+        return
+    logging.info(f"HAR replay: stubbed submission to {route.request.url}")
+    await route.fulfill(status=200, content_type="text/html", body=STUB_ORDER_HTML)
+
+
+# Attaches recording or replay for `url` to a freshly created context
+async def attach_har(context: BrowserContext, url: str, mode: str, har_dir: str) -> None:
+    if mode == "off":
+        return
+    path = har_path(har_dir, url)
+
+    if mode == "record":
+        os.makedirs(har_dir, exist_ok=True)
+        # Written to disk by Playwright when the context is closed
+        await context.route_from_har(
+            path, update=True, update_content="embed", update_mode="minimal"
+        )
+        return
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"No HAR recording for {url} (expected {path}); run with HAR_MODE=record first"
+        )
+    await context.route_from_har(path, not_found="abort")
+    # Registered last, so it sees every request before the HAR handler
+    await context.route("**/*", _stub_post)
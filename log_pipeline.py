@@ -0,0 +1,198 @@
+# Non-blocking logging: the hot path (run_discovery, fill_form, ...) only enqueues records, and a
+# background thread writes them to LOG_PATH in batches with size-based rotation.
+# Every line is tagged with the worker that logged it (process / engine worker task) and the
+# URL and region it was working on, taken from log_context() (a contextvar, so each asyncio task
+# keeps its own). Sharded worker processes tag their records before sending them through the
+# multiprocessing log queue (sharding.py); the writer holds records for LOG_MERGE_WINDOW_MS and
+# writes them in timestamp order, so the processes merge into one ordered log.
+import atexit
+import contextvars
+import heapq
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import LOG_BACKUPS, LOG_BATCH_SIZE, LOG_MAX_BYTES, LOG_MERGE_WINDOW_MS, LOG_PATH
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - [%(worker)s|%(region)s|%(url)s] %(message)s"
+
+# Fields of the current task: worker, url, region (missing ones are logged as "-")
+_context: contextvars.ContextVar[Dict[str, str]] = contextvars.ContextVar("log_context", default={})
+
+_STOP = object()  # Tells the writer thread to flush everything and exit
+
+
+# Tags every record logged inside the block (and in tasks started from it) with the given fields
+@contextmanager
+def log_context(**fields: str) -> Iterator[None]:
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+# Sets fields for the rest of the current task (e.g. an engine worker's name)
+def set_log_context(**fields: str) -> None:
+    _context.set({**_context.get(), **fields})
+
+
+# Adds worker/url/region to a record, unless a worker process already did before sending it
+def tag_record(record: logging.LogRecord) -> None:
+    if hasattr(record, "worker"):
+        return
+    fields = _context.get()
+    process = "main" if record.processName == "MainProcess" else record.processName
+    task = fields.get("worker")
+    record.worker = f"{process}/{task}" if task else process
+    record.url = fields.get("url", "-")
+    record.region = fields.get("region", "-")
+
+
+# Filter form of tag_record, for the queue handlers (runs in the logging thread/process)
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        tag_record(record)
+        return True
+
+
+# Queue handler for the hot path: tags the record and enqueues it, nothing else
+def queue_handler(log_queue) -> logging.handlers.QueueHandler:
+    handler = logging.handlers.QueueHandler(log_queue)
+    handler.addFilter(ContextFilter())
+    return handler
+
+
+# Handlers for records forwarded from other processes (sharding.py's QueueListener): the root
+# logger's, or a stderr handler when this process never set logging up (run_discovery used as a
+# library), so worker records are not silently dropped
+def forwarding_handlers() -> List[logging.Handler]:
+    handlers = list(logging.getLogger().handlers)
+    if handlers:
+        return handlers
+    fallback = logging.StreamHandler(sys.stderr)
+    fallback.setFormatter(logging.Formatter(LOG_FORMAT))
+    fallback.addFilter(ContextFilter())
+    return [fallback]
+
+
+# Background writer: batches queued records, orders them by time and rotates the file by size
+class LogWriter:
+    def __init__(
+        self,
+        path: str = LOG_PATH,
+        max_bytes: int = LOG_MAX_BYTES,
+        backups: int = LOG_BACKUPS,
+        batch_size: int = LOG_BATCH_SIZE,
+        merge_window_ms: float = LOG_MERGE_WINDOW_MS,
+    ) -> None:
+        self.path = path
+        self.max_bytes = max_bytes  # 0 = never rotate
+        self.backups = backups  # Rotated files kept (path.1 is the newest)
+        self.batch_size = max(1, batch_size)
+        self.merge_window = merge_window_ms / 1000
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.formatter = logging.Formatter(LOG_FORMAT)
+        # Records waiting for the merge window: (created, arrival order, record)
+        self._pending: List[Tuple[float, int, logging.LogRecord]] = []
+        self._order = itertools.count()
+        self._file = None
+        self._size = 0
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+
+    # Truncates the log (like the old filemode="w") and starts the writer thread
+    def start(self) -> "LogWriter":
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "wb")
+        self._size = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    # Writes everything still queued and closes the file
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+        self._file.close()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                items = [self.queue.get(timeout=self.merge_window or None)]
+            except queue.Empty:
+                items = []
+            # Take whatever else is already queued, up to one batch
+            while items and len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    heapq.heappush(self._pending, (item.created, next(self._order), item))
+            try:
+                self._flush(everything=stopping)
+            except Exception as e:  # A full disk must not kill the thread and block the run
+                self._pending.clear()
+                sys.stderr.write(f"Log writer failed: {e}\n")
+
+    # Writes the records older than the merge window (all of them when stopping, or when more
+    # than a batch is waiting) in timestamp order, as one write
+    def _flush(self, everything: bool) -> None:
+        cutoff = time.time() - self.merge_window
+        lines = []
+        while self._pending and (
+            everything or self._pending[0][0] <= cutoff or len(self._pending) > self.batch_size
+        ):
+            _, _, record = heapq.heappop(self._pending)
+            tag_record(record)  # Records that reached the queue without the filter
+            lines.append(self.formatter.format(record))
+        if not lines:
+            return
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        if self.max_bytes and self._size and self._size + len(data) > self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+        self._size += len(data)
+        self.written += len(lines)
+        self.batches += 1
+
+    # field_log.txt -> field_log.txt.1 -> ... -> field_log.txt.<backups> (the oldest is dropped)
+    def _rotate(self) -> None:
+        self._file.close()
+        for n in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{n}"):
+                os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "wb")
+        self._size = 0
+        self.rotations += 1
+
+
+# Installs the pipeline as the root logger's only handler; the writer is stopped (and the queue
+# flushed) at interpreter exit. Returns the writer.
+def start_log_pipeline(writer: Optional[LogWriter] = None) -> LogWriter:
+    writer = (writer or LogWriter()).start()
+    root = logging.getLogger()
+    root.handlers = [queue_handler(writer.queue)]
+    root.setLevel(logging.INFO)
+    atexit.register(writer.stop)
+    return writer
@@ -0,0 +1,204 @@
+# Memory telemetry and the memory side of the recycling policy for long runs.
+# After every MEMORY_SAMPLE_EVERY URLs the engine samples the resident memory of this Python
+# process and the proportional set size (PSS) of the browser processes it started (the Playwright
+# driver and every Chromium process below it), appends the sample to MEMORY_SAMPLES_PATH and, when either side is over its
+# limit, asks the browser pool to recycle the browser (BrowserPool.request_recycle). Closing the
+# browser frees the renderers and the driver-side objects of every page it served. The Python
+# side also gets a gc.collect(). Later recycles wait MEMORY_RECYCLE_COOLDOWN URLs, so a process
+# that simply stays large does not recycle on every URL.
+# Chromium's processes share most of their pages (the binary, shared memory with the GPU and
+# browser processes), so summing their RSS counts those pages once per process. PSS splits each
+# shared page between the processes that map it, so the browser total adds up to real usage.
+# Memory is read from /proc (Linux); elsewhere the samples are written with null values and the
+# limits never trigger.
+import asyncio
+import gc
+import multiprocessing
+import os
+import time
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+from config import (
+    BROWSER_RSS_LIMIT_MB,
+    MEMORY_RECYCLE_COOLDOWN,
+    MEMORY_SAMPLE_EVERY,
+    MEMORY_SAMPLES_PATH,
+    PYTHON_RSS_LIMIT_MB,
+)
+
+PROC = "/proc"
+
+
+# One line of MEMORY_SAMPLES_PATH
+class MemorySample(BaseModel):
+    run_id: str = ""
+    worker: Optional[str] = None  # Process name, to tell sharded workers apart
+    url: str  # Last URL finished before the sample
+    urls_done: int  # URLs finished by this process so far
+    python_rss_mb: Optional[float] = None
+    browser_pss_mb: Optional[float] = None  # Driver + all Chromium processes of this process
+    taken_at: float = 0.0  # Unix timestamp
+
+
+# VmRSS of one process in MB, or None when it cannot be read (gone, not Linux, ...)
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"{PROC}/{pid}/status", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024  # Reported in kB
+    except (OSError, ValueError, IndexError):
+        return None
+    return None  # Kernel threads have no VmRSS
+
+
+# PSS of one process in MB, or None when it cannot be read. Kernels without smaps_rollup
+# (before 4.14) fall back to the resident pages not shared with other processes, from statm.
+def pss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"{PROC}/{pid}/smaps_rollup", encoding="ascii", errors="replace") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) / 1024  # Reported in kB
+        return None  # Kernel threads have an empty rollup
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, IndexError):
+        return None
+    try:
+        with open(f"{PROC}/{pid}/statm", encoding="ascii", errors="replace") as f:
+            resident, shared = (int(pages) for pages in f.read().split()[1:3])
+        return (resident - shared) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return None
+
+
+# Parent pid of every process, from /proc/<pid>/stat (the comm field may contain spaces)
+def _parents() -> Dict[int, int]:
+    parents: Dict[int, int] = {}
+    for entry in os.listdir(PROC):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"{PROC}/{entry}/stat", encoding="ascii", errors="replace") as f:
+                stat = f.read()
+            parents[int(entry)] = int(stat[stat.rindex(")") + 2 :].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+    return parents
+
+
+# Every process below `root` (children, grandchildren, ...)
+def descendants(root: int) -> List[int]:
+    children: Dict[int, List[int]] = {}
+    for pid, parent in _parents().items():
+        children.setdefault(parent, []).append(pid)
+    found: List[int] = []
+    stack = list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        found.append(pid)
+        stack.extend(children.get(pid, []))
+    return found
+
+
+# Total PSS of the processes this process started (Playwright driver + Chromium), in MB
+def browser_pss_mb(root: Optional[int] = None) -> Optional[float]:
+    if not os.path.isdir(PROC):
+        return None
+    sizes = [pss_mb(pid) for pid in descendants(root or os.getpid())]
+    return sum(size for size in sizes if size is not None)
+
+
+class MemoryMonitor:
+    def __init__(
+        self,
+        run_id: str = "",
+        samples_path: str = MEMORY_SAMPLES_PATH,
+        every: int = MEMORY_SAMPLE_EVERY,
+        python_limit_mb: float = PYTHON_RSS_LIMIT_MB,
+        browser_limit_mb: float = BROWSER_RSS_LIMIT_MB,
+        cooldown: int = MEMORY_RECYCLE_COOLDOWN,
+    ) -> None:
+        self.run_id = run_id
+        self.every = max(1, every)
+        self.python_limit_mb = python_limit_mb  # 0 = no limit
+        self.browser_limit_mb = browser_limit_mb  # 0 = no limit
+        self.cooldown = cooldown  # URLs between two memory-triggered recycles
+        self.urls_done = 0
+        self.samples = 0
+        self.peak_python_mb = 0.0
+        self.peak_browser_mb = 0.0
+        self.recycles = 0
+        self._last_recycle_at: Optional[int] = None  # urls_done at the last recycle
+        self._fd: Optional[int] = None
+        if samples_path:
+            if os.path.dirname(samples_path):
+                os.makedirs(os.path.dirname(samples_path), exist_ok=True)
+            # O_APPEND + one write() per sample keeps lines whole across sharded workers
+            self._fd = os.open(samples_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    # Counts a finished URL and returns a sample when one is due (the /proc reads run on a
+    # thread so the event loop keeps going)
+    async def url_done(self, url: str) -> Optional[MemorySample]:
+        self.urls_done += 1
+        if self.urls_done % self.every:
+            return None
+        return await asyncio.to_thread(self.sample, url)
+
+    def sample(self, url: str) -> MemorySample:
+        sample = MemorySample(
+            run_id=self.run_id,
+            worker=multiprocessing.current_process().name,
+            url=url,
+            urls_done=self.urls_done,
+            python_rss_mb=rss_mb(os.getpid()),
+            browser_pss_mb=browser_pss_mb(),
+            taken_at=time.time(),
+        )
+        self.samples += 1
+        self.peak_python_mb = max(self.peak_python_mb, sample.python_rss_mb or 0.0)
+        self.peak_browser_mb = max(self.peak_browser_mb, sample.browser_pss_mb or 0.0)
+        if self._fd is not None:
+            os.write(self._fd, (sample.model_dump_json() + "\n").encode("utf-8"))
+        return sample
+
+    # Why the browser should be recycled after this sample, or None
+    def recycle_reason(self, sample: MemorySample) -> Optional[str]:
+        if (
+            self._last_recycle_at is not None
+            and self.urls_done - self._last_recycle_at < self.cooldown
+        ):
+            return None
+        reason = None
+        if self.browser_limit_mb and (sample.browser_pss_mb or 0) > self.browser_limit_mb:
+            reason = f"browser PSS {sample.browser_pss_mb:.0f} MB > {self.browser_limit_mb:.0f} MB"
+        elif self.python_limit_mb and (sample.python_rss_mb or 0) > self.python_limit_mb:
+            reason = f"Python RSS {sample.python_rss_mb:.0f} MB > {self.python_limit_mb:.0f} MB"
+        if reason:
+            self.recycles += 1
+            self._last_recycle_at = self.urls_done
+            gc.collect()
+        return reason
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # One-line report for the end-of-run log
+    def summary(self) -> str:
+        return (
+            f"Memory: {self.samples} samples over {self.urls_done} URLs, peak Python RSS "
+            f"{self.peak_python_mb:.0f} MB, peak browser PSS {self.peak_browser_mb:.0f} MB, "
+            f"{self.recycles} memory-triggered browser recycles"
+        )
+
+
+# Monitor per config.py (None when MEMORY_SAMPLE_EVERY is 0: no samples, no memory recycling)
+def monitor_from_config(run_id: str) -> Optional[MemoryMonitor]:
+    if MEMORY_SAMPLE_EVERY <= 0:
+        return None
+    return MemoryMonitor(run_id)
@@ -0,0 +1,118 @@
+# Resource-blocking network profile for form pages.
+# Only the form DOM matters to the runner, so images, fonts, media and (optionally) third-party
+# requests are aborted with page.route before they are downloaded. Every decision is counted
+# so a run can report how many requests were blocked and how many bytes were still loaded.
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+
+from playwright.async_api import BrowserContext, Response, Route
+from pydantic import BaseModel
+
+from config import (
+    NETWORK_PROFILE,
+    BLOCKED_RESOURCE_TYPES,
+    ALLOWED_HOSTS,
+    BLOCKED_HOSTS,
+    BLOCK_THIRD_PARTY,
+)
+
+
+# Which requests a context should abort
+class NetworkProfile(BaseModel):
+    enabled: bool = True
+    blocked_resource_types: List[str] = []
+    allowed_hosts: List[str] = []  # First-party hosts (the URLs under test are added at run time)
+    blocked_hosts: List[str] = []  # Always aborted, whatever the resource type
+    block_third_party: bool = False
+
+
+# Counters filled in by the route and response handlers of every context using the profile
+class NetworkStats(BaseModel):
+    allowed_requests: int = 0
+    allowed_bytes: int = 0  # From Content-Length; chunked responses without it are not counted
+    blocked_requests: int = 0
+    blocked_by_type: Dict[str, int] = {}
+    blocked_by_host: Dict[str, int] = {}
+
+    # One line for the end-of-run log
+    def summary(self) -> str:
+        by_type = ", ".join(f"{t}: {n}" for t, n in sorted(self.blocked_by_type.items()))
+        return (
+            f"Network profile blocked {self.blocked_requests} requests ({by_type or 'none'}); "
+            f"allowed {self.allowed_requests} requests, {self.allowed_bytes / 1024:.1f} KiB loaded"
+        )
+
+
+# Builds the profile from config.py, adding the hosts of the URLs under test to the allowlist
+def profile_from_config(urls: Iterable[str] = ()) -> NetworkProfile:
+    return NetworkProfile(
+        enabled=NETWORK_PROFILE != "off",
+        blocked_resource_types=BLOCKED_RESOURCE_TYPES,
+        allowed_hosts=ALLOWED_HOSTS + sorted({host_of(url) for url in urls if host_of(url)}),
+        blocked_hosts=BLOCKED_HOSTS,
+        block_third_party=BLOCK_THIRD_PARTY,
+    )
+
+
+# Adds the host of a URL under test to the allowlist. Streamed URL lists are not known when the
+# profile is built, so each URL is allowed as it is read (route handlers see the change at once).
+def allow_url_host(profile: NetworkProfile, url: str) -> None:
+    host = host_of(url)
+    if host and host not in profile.allowed_hosts:
+        profile.allowed_hosts.append(host)
+
+
+# Lowercased host name of a URL ("" when it has none)
+def host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+# True when host is one of the listed domains or a subdomain of one
+def host_matches(host: str, domains: Iterable[str]) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+# Decides whether one request should be aborted. Returns the reason, or "" to let it through.
+def block_reason(profile: NetworkProfile, resource_type: str, url: str) -> str:
+    if not profile.enabled:
+        return ""
+    host = host_of(url)
+    if host_matches(host, profile.blocked_hosts):
+        return "denylist"
+    # The page itself must always load, whatever its host
+    if resource_type == "document":
+        return ""
+    if resource_type in profile.blocked_resource_types:
+        return resource_type
+    if profile.block_third_party and not host_matches(host, profile.allowed_hosts):
+        return "third-party"
+    return ""
+
+
+# Attaches the profile to a browser context and records what it blocks into `stats`
+async def apply_network_profile(
+    context: BrowserContext, profile: NetworkProfile, stats: NetworkStats
+) -> None:
+    if not profile.enabled:
+        return
+
+    async def handle_route(route: Route) -> None:
+        request = route.request
+        reason = block_reason(profile, request.resource_type, request.url)
+        if not reason:
+            await route.continue_()
+            return
+        stats.blocked_requests += 1
+        stats.blocked_by_type[reason] = stats.blocked_by_type.get(reason, 0) + 1
+        host = host_of(request.url)
+        stats.blocked_by_host[host] = stats.blocked_by_host.get(host, 0) + 1
+        await route.abort("blockedbyclient")
+
+    def handle_response(response: Response) -> None:
+        stats.allowed_requests += 1
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            stats.allowed_bytes += int(length)
+
+    await context.route("**/*", handle_route)
+    context.on("response", handle_response)
@@ -0,0 +1,217 @@
+# HTTP-only pre-screen stage.
+# Region support only depends on the cds_country dropdown or hidden input in the served HTML, so
+# each URL is first fetched with Playwright's pooled HTTP client (APIRequestContext, no browser
+# page) and its static form is parsed with html.parser into the same FormSchema the browser
+# snapshot produces. Regions that schema rules out are recorded as skipped right there; only the
+# testable URL x region pairs go on to the browser stage.
+# The static HTML is not the rendered page: when it has no usable cds_country field (built by
+# JavaScript, fetch failed, ...) nothing is decided and every region goes to the browser.
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from playwright.async_api import APIRequestContext
+from pydantic import BaseModel
+
+from data_models import FieldInfo, FormSchema, OptionInfo
+from form_schema import region_skip_reason
+
+from config import PRESCREEN, PRESCREEN_CONCURRENCY, PRESCREEN_TIMEOUT_MS
+
+
+# <script> type values browsers run ("" = no type attribute); other types are data blocks
+SCRIPT_TYPES = frozenset(
+    ["", "text/javascript", "application/javascript", "text/ecmascript", "module"]
+)
+
+
+# Collects every cds_* control (and the send button) of a static HTML page, like
+# EXTRACT_SCHEMA_JS does in the browser. Visibility only reflects type="hidden".
+# Inline event handlers on the form and its controls are noted in `script_hooks`
+# (e.g. "form onsubmit", "send onclick") and <script> elements in `scripts` (e.g. "inline",
+# "src=/js/order.js"): a script can intercept the submit (addEventListener, preventDefault +
+# fetch), so a POST built without running it may be wrong.
+class _StaticFormParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.fields: List[FieldInfo] = []
+        self.form: Optional[Dict[str, Optional[str]]] = None  # Attributes of the first <form>
+        self.script_hooks: List[str] = []
+        self.scripts: List[str] = []
+        self._select: Optional[FieldInfo] = None  # <select> being read
+        self._option: Optional[OptionInfo] = None  # <option> whose text is being read
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        name = attributes.get("name") or ""
+        if tag == "form" and self.form is None:
+            self.form = attributes
+            self.script_hooks += [f"form {a}" for a in attributes if a.startswith("onsubmit")]
+        elif tag == "script":
+            if (attributes.get("type") or "").strip().lower() in SCRIPT_TYPES:
+                src = attributes.get("src")
+                self.scripts.append(f"src={src}" if src else "inline")
+        elif tag == "option" and self._select is not None:
+            self._close_option()
+            self._option = OptionInfo(
+                value=attributes.get("value"), selected="selected" in attributes
+            )
+        elif tag in ("input", "select", "textarea", "button") and (
+            name.startswith("cds_") or name == "send"
+        ):
+            field_type = (attributes.get("type") or "").lower()
+            field = FieldInfo(
+                name=name,
+                tag=tag,
+                type=field_type,
+                value=attributes.get("value"),
+                checked="checked" in attributes,
+                disabled="disabled" in attributes,
+                visible=field_type != "hidden",
+            )
+            self.fields.append(field)
+            if name == "send":
+                self.script_hooks += [f"send {a}" for a in attributes if a.startswith("onclick")]
+            if tag == "select":
+                self._select = field
+
+    def handle_data(self, data: str) -> None:
+        if self._option is not None:
+            self._option.text += data
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "option":
+            self._close_option()
+        elif tag == "select" and self._select is not None:
+            self._close_option()
+            options = self._select.options
+            chosen = next((o for o in options if o.selected), options[0] if options else None)
+            if chosen is not None:
+                # Like the DOM, an option without a value attribute submits its text
+                self._select.value = chosen.value if chosen.value is not None else chosen.text
+            self._select = None
+
+    # <option> end tags are optional in HTML, so an option also ends at the next one
+    def _close_option(self) -> None:
+        if self._option is not None and self._select is not None:
+            self._option.text = self._option.text.strip()
+            self._select.options.append(self._option)
+        self._option = None
+
+
+# A served HTML page as the static parser sees it
+class StaticPage(BaseModel):
+    form: FormSchema
+    script_hooks: List[str] = []  # Inline handlers on the form / send button
+    scripts: List[str] = []  # <script> elements ("inline" or "src=<url>")
+
+
+# Parses a served HTML page (no JavaScript is run)
+def parse_static_page(html: str, url: str) -> StaticPage:
+    parser = _StaticFormParser()
+    parser.feed(html)
+    parser.close()
+    form = parser.form or {}
+    schema = FormSchema(
+        url=url,
+        action=urljoin(url, form.get("action") or "") if parser.form is not None else None,
+        method=(form.get("method") or "get").lower(),
+        fields=parser.fields,
+    )
+    return StaticPage(form=schema, script_hooks=parser.script_hooks, scripts=parser.scripts)
+
+
+# Parses the form of a served HTML page into a FormSchema (no JavaScript is run)
+def parse_static_form(html: str, url: str) -> FormSchema:
+    return parse_static_page(html, url).form
+
+
+# What the static HTML says about one URL
+class PrescreenResult(BaseModel):
+    url: str
+    testable: List[str]  # Regions the browser stage still has to run
+    skipped: Dict[str, str] = {}  # Region -> reason it is not supported
+    decided: bool = False  # False when the static HTML had no usable cds_country field
+    has_gift_fields: bool = False
+    term_count: int = 0  # cds_term_value controls in the served HTML
+    page: Optional[StaticPage] = None  # The parsed page, reused by the protocol-level path
+
+
+# True when the static form carries the country data region support is decided from
+def country_decidable(schema: FormSchema) -> bool:
+    dropdown = schema.first("cds_country", tag="select")
+    if dropdown is not None:
+        return any(option.value for option in dropdown.options)
+    country_input = schema.first("cds_country", tag="input")
+    return country_input is not None and bool((country_input.value or "").strip())
+
+
+# Splits `regions` into testable and skipped ones using the static schema
+def screen_schema(schema: FormSchema, regions: List[str]) -> PrescreenResult:
+    result = PrescreenResult(
+        url=schema.url,
+        testable=list(regions),
+        decided=country_decidable(schema),
+        has_gift_fields=schema.has("cds_donee1_term_value") or schema.has("cds_donee1_name"),
+        term_count=len(schema.find("cds_term_value")),
+    )
+    if not result.decided:
+        return result
+    for region in regions:
+        reason = region_skip_reason(schema, region)
+        if reason:
+            result.skipped[region] = reason
+    result.testable = [r for r in regions if r not in result.skipped]
+    return result
+
+
+class Prescreener:
+    def __init__(
+        self, concurrency: int = PRESCREEN_CONCURRENCY, timeout_ms: float = PRESCREEN_TIMEOUT_MS
+    ) -> None:
+        self.concurrency = max(1, concurrency)  # Pages fetched at the same time
+        self.timeout_ms = timeout_ms
+        self.screened = 0
+        self.undecided = 0  # Pages whose HTML could not decide anything (all regions forwarded)
+        self.regions_skipped = 0
+
+    # Fetches and screens one URL. Returns None when the page could not be fetched, in which
+    # case the browser stage runs every region (and the scheduler handles the failure).
+    async def screen(
+        self, request: APIRequestContext, url: str, regions: List[str]
+    ) -> Optional[PrescreenResult]:
+        self.screened += 1
+        try:
+            response = await request.get(url, timeout=self.timeout_ms)
+            if not response.ok:
+                raise RuntimeError(f"HTTP {response.status}")
+            html = await response.text()
+        except Exception as e:
+            logging.info(f"Prescreen could not fetch {url}, every region goes to the browser: {e}")
+            self.undecided += 1
+            return None
+
+        page = parse_static_page(html, url)
+        result = screen_schema(page.form, regions)
+        result.page = page
+        if not result.decided:
+            self.undecided += 1
+        self.regions_skipped += len(result.skipped)
+        logging.info(
+            f"Prescreen {url}: testable {result.testable or 'none'}, "
+            f"gift fields: {'yes' if result.has_gift_fields else 'no'}, terms: {result.term_count}"
+        )
+        return result
+
+    # One line for the end-of-run log
+    def summary(self) -> str:
+        return (
+            f"Prescreen fetched {self.screened} pages, skipped {self.regions_skipped} regions "
+            f"without a browser ({self.undecided} pages left to the browser to decide)"
+        )
+
+
+# Prescreener built from config.py, or None when PRESCREEN is off
+def prescreener_from_config() -> Optional[Prescreener]:
+    return Prescreener() if PRESCREEN else None
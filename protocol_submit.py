@@ -0,0 +1,279 @@
+# Protocol-level form submission for JS-free gateway pages.
+# Many gateway forms are plain HTML POSTs, so rendering the page, clicking [name="send"] and
+# waiting for the confirmation is pure overhead. Here the POST body is built from the static form
+# (every successful control, hidden inputs included) with the same TestData and config.py card
+# values fill_form uses, sent through Playwright's HTTP client (APIRequestContext), and the
+# response body is classified the way fill_form reads the confirmation page (.error text).
+# Pages whose submission depends on JavaScript are detected by browser_reason() and left to the
+# browser path.
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+from playwright.async_api import APIRequestContext
+
+from bulk_fill import address_fields, card_fields, email_fields, postal_fields
+from data_models import AttemptRecord, FieldInfo, FormSchema, TestData
+from prescreen import StaticPage
+from tracing import tracer
+
+# Buyer/payment fields an order cannot be placed without (same list as fill_form)
+REQUIRED_FIELDS = (
+    "cds_name",
+    "cds_address_1",
+    "cds_city",
+    "cds_email",
+    "cds_cc_number",
+    "cds_cc_exp_month",
+    "cds_cc_exp_year",
+)
+
+# Input types that are never part of a submitted form body
+NON_SUBMITTED_TYPES = frozenset(["submit", "button", "image", "reset", "file"])
+
+
+# Why a page has to go through the browser, or None when a plain POST can submit it
+def browser_reason(page: StaticPage) -> Optional[str]:
+    schema = page.form
+    if not schema.action:
+        return "no <form> in the served HTML"
+    if page.script_hooks:
+        return f"inline script handlers ({', '.join(page.script_hooks)})"
+    if page.scripts:
+        return f"<script> elements that may intercept the submit ({', '.join(page.scripts)})"
+    missing = [name for name in REQUIRED_FIELDS if not schema.has(name)]
+    if missing:
+        return f"fields built by JavaScript ({', '.join(missing)})"
+    country = schema.first("cds_country", tag="select")
+    if country is not None and not country.options:
+        return "cds_country options filled in by JavaScript"
+    return None
+
+
+# What a browser would send for the form as served: enabled controls with a name, checked
+# radios/checkboxes only, and the send button as the submitter
+def default_form_values(schema: FormSchema) -> Dict[str, str]:
+    values: Dict[str, str] = {}
+    for field in schema.fields:
+        if field.disabled or (field.tag == "button" and field.name != "send"):
+            continue
+        if field.tag == "input" and field.type in NON_SUBMITTED_TYPES and field.name != "send":
+            continue
+        if field.type in ("radio", "checkbox") and not field.checked:
+            continue
+        if field.tag == "select" and field.value is None:
+            continue
+        values.setdefault(field.name, field.value if field.value is not None else "")
+    return values
+
+
+# Only the entries of `values` whose field is on the page (bulk_fill skips the others too)
+def present(schema: FormSchema, values: Dict[str, str]) -> Dict[str, str]:
+    return {name: value for name, value in values.items() if schema.has(name)}
+
+
+# Option value of a <select> matching `wanted` by value, then by text (like bulk_fill)
+def choose_option(field: FieldInfo, wanted: str) -> Optional[str]:
+    for option in field.options:
+        if option.value == wanted:
+            return option.value
+    for option in field.options:
+        if option.text == wanted:
+            return option.value if option.value is not None else option.text
+    return None
+
+
+# Builds the POST body for test_data.region the way fill_form fills the page.
+# Returns (body, None), or (None, reason) when the form cannot be completed for this region
+# (the reason is the same message fill_form would stop with).
+def build_post_body(
+    schema: FormSchema, test_data: TestData, attempt: AttemptRecord
+) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    region = test_data.region
+    body = default_form_values(schema)
+
+    # Term: test_data.term_index picks the self-subscription term
+    self_terms = [
+        f
+        for f in schema.find("cds_term_value", tag="input")
+        if not f.disabled and f.type != "hidden"
+    ]
+    term_index = test_data.term_index
+    if self_terms:
+        if term_index >= len(self_terms):
+            return None, f"No term at index {term_index} ({len(self_terms)} self terms on page)"
+        body["cds_term_value"] = self_terms[term_index].value or ""
+        attempt.term = f"cds_term_value={self_terms[term_index].value}"
+
+    # Gift term (checkbox/radio, or a dropdown on gift-only pages)
+    gift_terms = [
+        f
+        for f in schema.fields
+        if f.name.startswith("cds_donee")
+        and f.name.endswith("_term_value")
+        and not f.disabled
+        and f.type != "hidden"
+    ]
+    if gift_terms:
+        term = gift_terms[0]
+        if term.tag == "select":
+            option_index = 0 if self_terms else term_index
+            if option_index >= len(term.options):
+                return None, f"No term at index {term_index} in {term.name} dropdown"
+            body[term.name] = term.options[option_index].value or ""
+        else:
+            body[term.name] = term.value or "on"
+        attempt.term = attempt.term or f"{term.name}={body[term.name]}"
+
+    # Donee block, when the page has one
+    donee = test_data.donee
+    if gift_terms and donee and schema.has("cds_donee1_name"):
+        body.update(present(schema, address_fields("cds_donee1", donee, "Unit 7")))
+        body.update(present(schema, postal_fields("cds_donee1", donee, region)))
+        body.update(present(schema, email_fields("cds_donee1", donee.email)))
+        donee_country = schema.first("cds_donee1_country", tag="select")
+        if donee_country and donee.country:
+            body["cds_donee1_country"] = choose_option(donee_country, donee.country) or ""
+        donee_state = schema.first("cds_donee1_state", tag="select")
+        if region in ["US", "CAN"] and donee.state and donee_state:
+            state = choose_option(donee_state, donee.state)
+            if state is None:
+                return None, f"Donee state '{donee.state}' not found in dropdown — skipping"
+            body["cds_donee1_state"] = state
+
+    # Buyer
+    buyer = test_data.buyer
+    body.update(present(schema, address_fields("cds", buyer, "Apt 28")))
+    country = schema.first("cds_country", tag="select")
+    if country and buyer.country:
+        chosen = choose_option(country, buyer.country)
+        if chosen is None:
+            return None, f"Country '{buyer.country}' not found in dropdown"
+        body["cds_country"] = chosen
+
+    if region in ["US", "CAN"] and buyer.zip and not schema.has("cds_zip"):
+        return None, "Skipping page: ZIP field not found for US/CAN"
+    if region == "INTL" and buyer.postal and not schema.has("cds_postal"):
+        return None, "Skipping page: INTL selected but no cds_postal field found"
+    body.update(postal_fields("cds", buyer, region))
+    body.update(present(schema, email_fields("cds", buyer.email)))
+
+    state = schema.first("cds_state", tag="select")
+    if region in ["US", "CAN"] and buyer.state and state:
+        chosen = choose_option(state, buyer.state)
+        if chosen is None:
+            return None, f"Buyer state '{buyer.state}' not found in dropdown — skipping"
+        body["cds_state"] = chosen
+
+    # Payment: Visa (2) when offered, otherwise whatever is checked / listed first
+    pay_types = schema.find("cds_pay_type")
+    if pay_types:
+        if pay_types[0].tag == "select":
+            body["cds_pay_type"] = choose_option(pay_types[0], "2") or body.get("cds_pay_type", "")
+        elif not any(f.checked for f in pay_types):
+            visa = next((f for f in pay_types if f.value == "2"), pay_types[0])
+            body["cds_pay_type"] = visa.value or ""
+    body.update(card_fields(include_cvv=schema.has("cds_cc_security_code")))
+    return body, None
+
+
+# HTML elements that never have an end tag (they must not count as open inside the .error element)
+VOID_ELEMENTS = frozenset(
+    [
+        "area",
+        "base",
+        "br",
+        "col",
+        "embed",
+        "hr",
+        "img",
+        "input",
+        "link",
+        "meta",
+        "source",
+        "track",
+        "wbr",
+    ]
+)
+
+
+# Collects the text of the first element whose class list contains "error"
+class _ErrorTextParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.depth = 0  # Open elements inside the .error element (0 = not inside one)
+        self.found = False
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if self.depth:
+            if tag not in VOID_ELEMENTS:
+                self.depth += 1
+        elif not self.found and "error" in (dict(attrs).get("class") or "").split():
+            self.depth = 1
+            self.found = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.depth and tag not in VOID_ELEMENTS:
+            self.depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self.depth:
+            self.parts.append(data)
+
+
+# Text of the response's .error element, or None when it has none (fill_form's success rule)
+def response_error(html: str) -> Optional[str]:
+    parser = _ErrorTextParser()
+    parser.feed(html)
+    parser.close()
+    if not parser.found:
+        return None
+    # Parts are joined with spaces so <br>-separated words stay apart
+    return " ".join(" ".join(parser.parts).split())
+
+
+# Submits the static form for test_data.region with one HTTP request and fills in `attempt`
+async def submit_static_form(
+    request: APIRequestContext,
+    page: StaticPage,
+    test_data: TestData,
+    attempt: AttemptRecord,
+    timeout_ms: float,
+) -> AttemptRecord:
+    schema = page.form
+    with tracer.span("build_body", attempt):
+        body, reason = build_post_body(schema, test_data, attempt)
+    if body is None:
+        logging.warning(reason)
+        attempt.status = "incomplete"
+        attempt.error = reason
+        return attempt
+
+    logging.info(f"Submitting form over HTTP for region {test_data.region} at URL: {schema.url}")
+    # From here on the gateway may have taken the order: the "submit" phase in attempt.timings_ms
+    # makes every failure final (scheduler.classify_failure), including a request that raises
+    with tracer.span("submit", attempt):
+        if schema.method == "post":
+            response = await request.post(schema.action, form=body, timeout=timeout_ms)
+        else:
+            response = await request.get(schema.action, params=body, timeout=timeout_ms)
+        html = await response.text()
+
+    with tracer.span("result_check", attempt):
+        error_text = response_error(html)
+        if error_text:
+            logging.error(f"Submission error detected for region {test_data.region}: {error_text}")
+            attempt.status = "submission_error"
+            attempt.error = error_text
+        elif response.status >= 400:
+            logging.error(
+                f"Order POST for region {test_data.region} answered HTTP {response.status}; "
+                "not retried, the order may have been processed"
+            )
+            attempt.status = "submission_error"
+            attempt.error = f"HTTP {response.status} after the order POST"
+        else:
+            logging.info(f"Submission successful for region {test_data.region}")
+            attempt.status = "success"
+    return attempt
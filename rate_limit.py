@@ -0,0 +1,98 @@
+# Per-host token-bucket rate limiting of the requests that hit the gateway servlet: page loads
+# (one per region) and order submissions. Each host's bucket refills at `rate` tokens per second
+# up to `burst`; a request that finds it empty waits until its token is due. Tokens are reserved
+# in call order, so concurrent workers of one host queue up fairly instead of racing.
+# Subresources (scripts, stylesheets) are not counted: they are cheap and mostly cached.
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, Optional
+
+from data_models import AttemptRecord
+from deadline import Deadline
+from network_profile import host_of
+from tracing import tracer
+
+from config import HOST_RATE_LIMIT_RPS, HOST_RATE_LIMIT_BURST
+
+
+class TokenBucket:
+    def __init__(
+        self, rate: float, burst: int, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.rate = rate  # Tokens added per second
+        self.burst = max(1, burst)  # Bucket size
+        self.clock = clock
+        self.tokens = float(self.burst)
+        self.updated = clock()
+
+    # Takes one token and returns how long the caller must wait before using it (0 = at once).
+    # The balance may go negative: later callers then wait behind the ones already queued.
+    def reserve(self) -> float:
+        now = self.clock()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class HostRateLimiter:
+    def __init__(
+        self,
+        rate: float = HOST_RATE_LIMIT_RPS,
+        burst: int = HOST_RATE_LIMIT_BURST,
+        clock: Callable[[], float] = time.monotonic,  # Replaceable in tests
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self._buckets: Dict[str, TokenBucket] = {}
+        self.delayed_requests = 0
+        self.delayed_seconds = 0.0
+
+    # Reserves a token for one request to `host` and returns the wait in seconds
+    def reserve(self, host: str) -> float:
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst, self.clock)
+        wait = bucket.reserve()
+        if wait > 0:
+            self.delayed_requests += 1
+            self.delayed_seconds += wait
+        return wait
+
+    # Waits (without blocking other tasks) until a request to `host` may go out
+    async def acquire(self, host: str) -> None:
+        wait = self.reserve(host)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    # One line for the end-of-run log
+    def summary(self) -> str:
+        return (
+            f"Rate limiter ({self.rate:g} req/s per host, burst {self.burst}) delayed "
+            f"{self.delayed_requests} requests by {self.delayed_seconds:.1f} s in total"
+        )
+
+
+# Limiter built from config.py, or None when HOST_RATE_LIMIT_RPS is 0.
+# `share` divides the rate between processes that each run their own limiter (sharded runs).
+def limiter_from_config(share: int = 1) -> Optional[HostRateLimiter]:
+    if HOST_RATE_LIMIT_RPS <= 0:
+        return None
+    return HostRateLimiter(rate=HOST_RATE_LIMIT_RPS / max(1, share))
+
+
+# Waits for the host's token before a page load or submission of `url` (no-op without a
+# limiter). The wait is timed as the "rate_limit" phase of the attempt and, with a deadline, is
+# not charged to the attempt's budget.
+async def throttle(
+    limiter: Optional[HostRateLimiter],
+    url: str,
+    attempt: Optional[AttemptRecord] = None,
+    deadline: Optional[Deadline] = None,
+) -> None:
+    if limiter is None:
+        return
+    with tracer.span("rate_limit", attempt), deadline.paused() if deadline else nullcontext():
+        await limiter.acquire(host_of(url))
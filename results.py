@@ -0,0 +1,160 @@
+# Structured, streaming result records.
+# Every URL x region attempt becomes an AttemptRecord that is written out the moment it finishes,
+# so a huge run never holds its results in memory and a crash loses at most the attempts in flight
+# (plus SQLite rows still queued for the writer thread).
+# Files are appended to (never overwritten), which builds a queryable history across runs:
+#   JSONL  - one JSON object per line, easy to grep / load with pandas
+#   SQLite - an "attempts" table for SQL queries (throughput, failure rates per run, ...); rows
+#            are inserted and committed in batches by a background thread, so the engine's event
+#            loop never waits on a disk sync
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Any, List, Optional
+
+from data_models import AttemptRecord
+
+from config import RESULTS_JSONL_PATH, RESULTS_SQLITE_BATCH, RESULTS_SQLITE_PATH
+
+
+# Creates the parent folder of a results file if needed
+def _ensure_parent(path: str) -> None:
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+
+# New id for a run: start time plus process id, e.g. "20250610-124659-4242"
+def new_run_id() -> str:
+    return time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+
+
+class JsonlResultSink:
+    def __init__(self, path: str) -> None:
+        _ensure_parent(path)
+        # O_APPEND + one write() per record keeps lines whole when sharded workers share the file
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def write(self, record: AttemptRecord) -> None:
+        os.write(self._fd, (record.model_dump_json() + "\n").encode("utf-8"))
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+# Columns of the "attempts" table, in AttemptRecord field order
+ATTEMPT_COLUMNS = [
+    ("run_id", "TEXT NOT NULL"),
+    ("url", "TEXT NOT NULL"),
+    ("region", "TEXT NOT NULL"),
+    ("status", "TEXT NOT NULL"),
+    ("error", "TEXT"),
+    ("term", "TEXT"),
+    ("pay_type", "TEXT"),
+    ("kind", "TEXT NOT NULL DEFAULT 'region'"),
+    ("worker", "TEXT"),
+    ("started_at", "REAL NOT NULL"),
+    ("duration_ms", "REAL NOT NULL"),
+    ("timings_ms", "TEXT NOT NULL"),
+    ("artifacts", "TEXT"),
+    ("form_fingerprint", "TEXT"),
+]
+
+
+_STOP = object()  # Tells the SQLite writer thread to commit what is left and exit
+
+
+class SqliteResultSink:
+    def __init__(self, path: str, batch_size: int = RESULTS_SQLITE_BATCH) -> None:
+        _ensure_parent(path)
+        # timeout + WAL let sharded worker processes append to the same database. The schema is set
+        # up here so errors surface at once; afterwards only the writer thread uses the connection.
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        columns = ", ".join(f"{name} {kind}" for name, kind in ATTEMPT_COLUMNS)
+        self._db.execute(f"CREATE TABLE IF NOT EXISTS attempts ({columns})")
+        # Databases written by older versions get the newer columns added
+        existing = {row[1] for row in self._db.execute("PRAGMA table_info(attempts)")}
+        for name, kind in ATTEMPT_COLUMNS:
+            if name not in existing:
+                self._db.execute(f"ALTER TABLE attempts ADD COLUMN {name} {kind}")
+        self._db.execute("CREATE INDEX IF NOT EXISTS attempts_run ON attempts (run_id, status)")
+        self._db.commit()
+        names = [name for name, _ in ATTEMPT_COLUMNS]
+        self._insert = (
+            f"INSERT INTO attempts ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})"  # nosec B608: fixed column names
+        )
+        self.batch_size = max(1, batch_size)
+        self.written = 0
+        self.batches = 0  # Commits made by the writer thread
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    # Only turns the record into a row and queues it; the writer thread does the I/O
+    def write(self, record: AttemptRecord) -> None:
+        values = record.model_dump()
+        values["timings_ms"] = json.dumps(record.timings_ms)
+        self._queue.put([values[name] for name, _ in ATTEMPT_COLUMNS])
+
+    # Writer thread: inserts whatever is queued (up to one batch) and commits it in one go
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            rows: List[List[Any]] = []
+            item = self._queue.get()
+            while True:
+                if item is _STOP:
+                    stopping = True
+                else:
+                    rows.append(item)
+                if stopping or len(rows) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            if not rows:
+                continue
+            try:
+                self._db.executemany(self._insert, rows)
+                self._db.commit()
+                self.written += len(rows)
+                self.batches += 1
+            except sqlite3.Error as e:  # A locked or full database must not kill the thread
+                logging.error(f"Could not write {len(rows)} result rows to SQLite: {e}")
+
+    # Commits everything still queued and closes the database
+    def close(self) -> None:
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._db.close()
+
+
+# Fans each record out to every configured sink
+class ResultRecorder:
+    def __init__(self, sinks: List) -> None:
+        self.sinks = sinks
+        self.count = 0
+
+    def write(self, record: AttemptRecord) -> None:
+        for sink in self.sinks:
+            sink.write(record)
+        self.count += 1
+
+    def close(self) -> None:
+        for sink in self.sinks:
+            sink.close()
+
+
+# Opens the sinks configured in config.py, or returns None when both are turned off
+def recorder_from_config() -> Optional[ResultRecorder]:
+    sinks: List = []
+    if RESULTS_JSONL_PATH:
+        sinks.append(JsonlResultSink(RESULTS_JSONL_PATH))
+    if RESULTS_SQLITE_PATH:
+        sinks.append(SqliteResultSink(RESULTS_SQLITE_PATH))
+    return ResultRecorder(sinks) if sinks else None
@@ -0,0 +1,120 @@
+# Per-run services shared by every URL/region task of a discovery run.
+# Each one is optional: None switches the feature off. run_discovery builds one RunServices per
+# run (and each sharded worker process builds its own) and threads it down to run_region.
+import os
+from typing import Dict, List, Optional
+
+from artifacts import ArtifactStore, artifacts_from_config
+from data_models import AttemptRecord
+from deadline import DeadlinePolicy, deadlines_from_config
+from form_state import FormStateStore, state_store_from_config
+from memory import MemoryMonitor, monitor_from_config
+from prescreen import Prescreener, prescreener_from_config
+from rate_limit import HostRateLimiter, limiter_from_config
+from results import ResultRecorder, new_run_id, recorder_from_config
+from scheduler import CircuitBreaker, RetryPolicy
+from schema_cache import SchemaCache, cache_from_config
+from synthetic_data import TestDataPool, pool_from_config
+
+from config import INCREMENTAL, MATRIX_MODE, MATRIX_PAY_TYPES, PROTOCOL_SUBMIT
+
+
+class RunServices:
+    def __init__(
+        self,
+        schema_cache: Optional[SchemaCache] = None,
+        recorder: Optional[ResultRecorder] = None,
+        run_id: Optional[str] = None,
+        matrix_pay_types: Optional[List[str]] = None,
+        retry: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        prescreener: Optional[Prescreener] = None,
+        protocol_submit: bool = False,
+        form_state: Optional[FormStateStore] = None,
+        incremental: bool = False,
+        test_data: Optional[TestDataPool] = None,
+        artifacts: Optional[ArtifactStore] = None,
+        deadlines: Optional[DeadlinePolicy] = None,
+        memory: Optional[MemoryMonitor] = None,
+    ) -> None:
+        self.schema_cache = schema_cache  # Skips regions known to be unsupported (schema_cache.py)
+        self.recorder = recorder  # Streams one AttemptRecord per URL x region (results.py)
+        self.run_id = run_id or new_run_id()  # Shared by every record of the run
+        self.status_counts: Dict[str, int] = {}  # Attempts per AttemptRecord.status
+        # URL x region pairs per the status they ended the run with (retries only count once)
+        self.final_counts: Dict[str, int] = {}
+        # Payment types for term x payment matrix runs (form_matrix.py); None = single submission
+        self.matrix_pay_types = matrix_pay_types
+        self.retry = retry  # Which failed regions run again, and after what delay (scheduler.py)
+        self.breaker = breaker  # Stops contacting hosts that keep failing (scheduler.py)
+        self.limiter = limiter  # Requests per second per host (rate_limit.py)
+        self.prescreener = prescreener  # Skips unsupported regions from static HTML (prescreen.py)
+        # Posts JS-free forms over HTTP instead of through the browser (protocol_submit.py)
+        self.protocol_submit = protocol_submit
+        # Fingerprint + last result per page (form_state.py); filled in by the pre-screen stage
+        self.form_state = form_state
+        self.incremental = incremental  # Carry forward unchanged pages that passed last time
+        # Distinct buyer/donee data per test (synthetic_data.py); None = make_test_data
+        self.test_data = test_data
+        self.artifacts = artifacts  # Screenshot/DOM/network capture of failures (artifacts.py)
+        self.deadlines = deadlines  # Per-URL/region time budgets and watchdog (deadline.py)
+        self.memory = memory  # Per-URL memory samples; recycles the browser over limits (memory.py)
+
+    # Everything turned on/off according to config.py.
+    # Sharded workers pass the main process's run_id so all their records belong to one run.
+    # matrix_pay_types overrides MATRIX_MODE / MATRIX_PAY_TYPES (e.g. the GUI's payment types).
+    # `processes` is the number of processes running at once; they share the per-host rate and
+    # the failure artifact disk budget.
+    # Test data pools are seeded per run and per process, so workers hand out different data.
+    @classmethod
+    def from_config(
+        cls,
+        run_id: Optional[str] = None,
+        matrix_pay_types: Optional[List[str]] = None,
+        processes: int = 1,
+    ) -> "RunServices":
+        if matrix_pay_types is None and MATRIX_MODE:
+            matrix_pay_types = MATRIX_PAY_TYPES
+        run_id = run_id or new_run_id()
+        return cls(
+            schema_cache=cache_from_config(),
+            recorder=recorder_from_config(),
+            run_id=run_id,
+            matrix_pay_types=matrix_pay_types,
+            retry=RetryPolicy(),
+            breaker=CircuitBreaker(),
+            limiter=limiter_from_config(processes),
+            prescreener=prescreener_from_config(),
+            protocol_submit=PROTOCOL_SUBMIT,
+            form_state=state_store_from_config(),
+            incremental=INCREMENTAL,
+            test_data=pool_from_config(f"{run_id}:{os.getpid()}"),
+            artifacts=artifacts_from_config(run_id, processes),
+            deadlines=deadlines_from_config(),
+            memory=monitor_from_config(run_id),
+        )
+
+    # Counts a finished attempt and streams it to the results files (when recording is on)
+    def record(self, attempt: AttemptRecord) -> None:
+        self.status_counts[attempt.status] = self.status_counts.get(attempt.status, 0) + 1
+        if self.recorder is not None:
+            self.recorder.write(attempt)
+
+    # Counts the status each region of a finished URL ended with ({region: status})
+    def record_final(self, statuses: Dict[str, str]) -> None:
+        for status in statuses.values():
+            self.final_counts[status] = self.final_counts.get(status, 0) + 1
+
+    # Releases files and connections at the end of the run
+    def close(self) -> None:
+        if self.schema_cache is not None:
+            self.schema_cache.close()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.form_state is not None:
+            self.form_state.close()
+        if self.artifacts is not None:
+            self.artifacts.close()
+        if self.memory is not None:
+            self.memory.close()
@@ -0,0 +1,206 @@
+# Failure classification, retry backoff and a per-host circuit breaker for the discovery engine.
+# The engine (run_discovery_stream_async) works on WorkUnits: one URL plus the regions still to
+# run. After each pass, every region's AttemptRecord is classified:
+#   transient        - timeouts, connection errors, HTTP 5xx and used-up time budgets before the
+#                      order was submitted: retried with exponential backoff
+#   country_mismatch - the gateway rejected the term for the country: retried at once with the
+#                      next term (TestData.term_index + 1)
+#   missing_field    - the form lacks a field we need: final, retrying cannot help
+#   hard             - anything else, including every failure after the order was sent other
+#                      than a country mismatch (the gateway may have processed it): final
+# Retries are put back on the work queue after their delay instead of sleeping in a worker, and
+# a host whose requests keep failing trips its circuit breaker: its regions are recorded as
+# "circuit_open" without loading anything until the breaker's reset time has passed.
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from data_models import AttemptRecord
+
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_DELAY_SECONDS,
+    RETRY_MAX_TERMS,
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_SECONDS,
+)
+
+# Error text fragments of failures worth retrying later (lowercase)
+TRANSIENT_MARKERS = (
+    "timeout",
+    "net::err_",
+    "connection",
+    "econnrefused",
+    "econnreset",
+    "target closed",
+    "browser has been closed",
+    "http 5",
+)
+
+# Start of the error text of attempts that ran out of their time budget: DeadlineExceeded or the
+# watchdog (deadline.py; lowercase)
+DEADLINE_MARKER = "deadline exceeded"
+
+# Error text fragments of forms that lack something we need (lowercase)
+MISSING_FIELD_MARKERS = ("not found", "missing", "not selectable", "no term at index")
+
+
+# One URL and the regions that still have to run (term_indexes: region -> term to use)
+class WorkUnit(BaseModel):
+    index: int
+    url: str
+    regions: List[str]
+    tries: int = 0  # Passes already made for these regions
+    term_indexes: Dict[str, int] = {}
+    browser_only: bool = False  # The page needs JavaScript: no protocol-level submission
+
+
+# Whether the attempt got as far as sending the order (the "submit" span was entered)
+def was_submitted(attempt: AttemptRecord) -> bool:
+    return "submit" in attempt.timings_ms
+
+
+# Failure class of a finished attempt, or None when it needs no retry (success, skipped, ...)
+def classify_failure(attempt: Optional[AttemptRecord]) -> Optional[str]:
+    if attempt is None:
+        return "transient"  # Never ran: an earlier region of the same pass raised
+    if attempt.status in ("success", "skipped", "circuit_open"):
+        return None
+    error = (attempt.error or "").lower()
+    if attempt.status == "submission_error" and "country" in error and "match" in error:
+        return "country_mismatch"  # The gateway turned the order down: safe to try another term
+    if was_submitted(attempt):
+        return "hard"  # Whatever the error text says, sending the order again could duplicate it
+    if attempt.status == "error" and error.startswith(DEADLINE_MARKER):
+        return "transient"  # A slow page or hung renderer used up the budget: try another pass
+    if attempt.status == "incomplete" or any(m in error for m in MISSING_FIELD_MARKERS):
+        return "missing_field"
+    if attempt.status == "error" and any(m in error for m in TRANSIENT_MARKERS):
+        return "transient"
+    return "hard"
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = RETRY_MAX_ATTEMPTS,
+        base_delay: float = RETRY_BASE_DELAY_SECONDS,
+        max_delay: float = RETRY_MAX_DELAY_SECONDS,
+        max_terms: int = RETRY_MAX_TERMS,
+    ) -> None:
+        self.max_attempts = max_attempts  # Passes per region for transient failures (1 = no retry)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_terms = max_terms  # Terms tried per region when the country does not match
+
+    # Whether a failure of this class should run again after `tries` passes / at this term index
+    def should_retry(self, failure: Optional[str], tries: int, term_index: int) -> bool:
+        if failure == "transient":
+            return tries < self.max_attempts
+        if failure == "country_mismatch":
+            return term_index + 1 < self.max_terms
+        return False
+
+    # Exponential backoff with full jitter: a random delay up to base * 2^(tries - 1), capped
+    def delay(self, tries: int) -> float:
+        ceiling = min(self.max_delay, self.base_delay * 2 ** max(0, tries - 1))
+        return random.uniform(0, ceiling)  # nosec B311: jitter, not cryptography
+
+
+# Per-host circuit breaker: opens after `failure_threshold` consecutive transient failures and
+# lets one trial through (half-open) once `reset_seconds` have passed.
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_seconds: float = BREAKER_RESET_SECONDS,
+        clock: Callable[[], float] = time.monotonic,  # Replaceable in tests
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self._failures: Dict[str, int] = {}  # Consecutive transient failures per host
+        self._opened_at: Dict[str, float] = {}
+
+    # True when work for this host may run
+    def allow(self, host: str) -> bool:
+        opened_at = self._opened_at.get(host)
+        if opened_at is None:
+            return True
+        if self.clock() - opened_at >= self.reset_seconds:
+            # Half-open: let this trial through; another failure re-opens the breaker at once
+            del self._opened_at[host]
+            self._failures[host] = self.failure_threshold - 1
+            return True
+        return False
+
+    def record_success(self, host: str) -> None:
+        self._failures.pop(host, None)
+        self._opened_at.pop(host, None)
+
+    # Returns True when this failure tripped the breaker
+    def record_failure(self, host: str) -> bool:
+        self._failures[host] = self._failures.get(host, 0) + 1
+        if self.failure_threshold > 0 and self._failures[host] >= self.failure_threshold:
+            tripped = host not in self._opened_at
+            self._opened_at[host] = self.clock()
+            return tripped
+        return False
+
+    # Hosts whose breaker is currently open
+    def open_hosts(self) -> List[str]:
+        return sorted(self._opened_at)
+
+
+# Feeds one finished attempt into its host's breaker. Returns True when it tripped the breaker.
+def note_host_outcome(breaker: CircuitBreaker, host: str, attempt: AttemptRecord) -> bool:
+    if classify_failure(attempt) == "transient":
+        return breaker.record_failure(host)
+    if "schema" in attempt.timings_ms:  # The page loaded, so the host is up
+        breaker.record_success(host)
+    return False
+
+
+# Work to schedule after one pass of `unit`, as (delay in seconds, unit) pairs:
+# country mismatches run again at once with the next term, transient failures after a backoff.
+def plan_retries(
+    unit: WorkUnit, attempts: Dict[str, AttemptRecord], policy: RetryPolicy
+) -> List[Tuple[float, WorkUnit]]:
+    passes = unit.tries + 1
+    next_term: List[str] = []
+    later: List[str] = []
+    for region in unit.regions:
+        failure = classify_failure(attempts.get(region))
+        if policy.should_retry(failure, passes, unit.term_indexes.get(region, 0)):
+            (next_term if failure == "country_mismatch" else later).append(region)
+
+    plans: List[Tuple[float, WorkUnit]] = []
+    if next_term:
+        plans.append(
+            (
+                0.0,
+                unit.model_copy(
+                    update={
+                        "regions": next_term,
+                        "term_indexes": {r: unit.term_indexes.get(r, 0) + 1 for r in next_term},
+                    }
+                ),
+            )
+        )
+    if later:
+        plans.append(
+            (
+                policy.delay(passes),
+                unit.model_copy(
+                    update={
+                        "regions": later,
+                        "tries": passes,
+                        "term_indexes": {r: unit.term_indexes.get(r, 0) for r in later},
+                    }
+                ),
+            )
+        )
+    return plans
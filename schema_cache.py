@@ -0,0 +1,124 @@
+# Persistent on-disk cache of discovered form schemas.
+# Gateway pages are identified by their cds_mag_code / cds_page_id query parameters, and the same
+# pages come back night after night. Caching their FormSchema lets run_discovery skip regions a
+# page does not support without loading it at all. Entries expire after a TTL, and the least
+# recently used entries are evicted once the cache grows past its size limit.
+import os
+import sqlite3
+import time
+from typing import Callable, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from data_models import FormSchema
+
+from config import SCHEMA_CACHE_PATH, SCHEMA_CACHE_TTL_HOURS, SCHEMA_CACHE_MAX_ENTRIES
+
+
+# Returns (mag_code, page_id) for a gateway URL, or None when either parameter is missing
+def page_key(url: str) -> Optional[Tuple[str, str]]:
+    params = {k.lower(): v for k, v in parse_qs(urlparse(url).query).items()}
+    mag_code = params.get("cds_mag_code", [""])[0].strip().upper()
+    page_id = params.get("cds_page_id", [""])[0].strip()
+    if not mag_code or not page_id:
+        return None
+    return mag_code, page_id
+
+
+class SchemaCache:
+    def __init__(
+        self,
+        path: str = SCHEMA_CACHE_PATH,
+        ttl_seconds: float = SCHEMA_CACHE_TTL_HOURS * 3600,
+        max_entries: int = SCHEMA_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time,  # Replaceable in tests
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # timeout + WAL let sharded worker processes share the file safely
+        self._db = sqlite3.connect(path, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS form_schema (
+                mag_code TEXT NOT NULL,
+                page_id TEXT NOT NULL,
+                url TEXT NOT NULL,
+                schema_json TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (mag_code, page_id)
+            )
+            """
+        )
+        self._db.commit()
+
+    # Cached schema for this page, or None if it is unknown or older than the TTL
+    def get(self, url: str) -> Optional[FormSchema]:
+        key = page_key(url)
+        if key is None:
+            return None
+        row = self._db.execute(
+            "SELECT schema_json, stored_at FROM form_schema WHERE mag_code = ? AND page_id = ?",
+            key,
+        ).fetchone()
+        now = self.clock()
+        if row is None or now - row[1] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self._db.execute(
+            "UPDATE form_schema SET last_used = ? WHERE mag_code = ? AND page_id = ?",
+            (now, *key),
+        )
+        self._db.commit()
+        self.hits += 1
+        return FormSchema.model_validate_json(row[0])
+
+    # Stores (or refreshes) the schema for this page, then applies TTL and size eviction
+    def put(self, url: str, schema: FormSchema) -> None:
+        key = page_key(url)
+        if key is None:
+            return
+        now = self.clock()
+        self._db.execute(
+            """
+            INSERT OR REPLACE INTO form_schema
+                (mag_code, page_id, url, schema_json, stored_at, last_used)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (*key, url, schema.model_dump_json(), now, now),
+        )
+        self._evict(now)
+        self._db.commit()
+
+    # Drops expired entries, then the least recently used ones above max_entries
+    def _evict(self, now: float) -> None:
+        self._db.execute("DELETE FROM form_schema WHERE stored_at < ?", (now - self.ttl_seconds,))
+        if self.max_entries > 0:
+            self._db.execute(
+                """
+                DELETE FROM form_schema WHERE rowid NOT IN (
+                    SELECT rowid FROM form_schema ORDER BY last_used DESC LIMIT ?
+                )
+                """,
+                (self.max_entries,),
+            )
+
+    # Number of entries currently stored (expired ones included until the next put)
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM form_schema").fetchone()[0]
+
+    def close(self) -> None:
+        self._db.close()
+
+
+# Opens the cache configured in config.py, or returns None when caching is turned off
+def cache_from_config() -> Optional[SchemaCache]:
+    if not SCHEMA_CACHE_PATH:
+        return None
+    return SchemaCache()
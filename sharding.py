@@ -0,0 +1,242 @@
+# Multi-process sharding of a URL list.
+# Each worker process runs its own browser (BrowserPool) and asyncio engine and pulls URLs from
+# one shared queue, so fast workers simply take more URLs (dynamic balancing). Results come back
+# tagged with the URL's position and are merged into one report in the original order.
+# The URL source may be a stream (file, stdin): workers start on the first URLs while a feeder
+# thread is still reading the rest.
+#
+# Only the main process writes the log file: workers send their log records through a
+# multiprocessing queue to a QueueListener here, which hands them to the main process's log
+# writer (log_pipeline.py); it merges the lines of all processes in timestamp order.
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from log_pipeline import forwarding_handlers, queue_handler
+from network_profile import NetworkProfile, profile_from_config
+from results import new_run_id
+from tracing import tracer
+
+from config import TRACE_PATH
+
+# How long the main process waits for a result before checking that workers are still alive
+RESULT_POLL_SECONDS = 1.0
+
+
+# Entry point of each worker process (must be a top-level function so "spawn" can pickle it)
+def _shard_worker(
+    task_queue: multiprocessing.Queue,
+    result_queue: multiprocessing.Queue,
+    log_queue: multiprocessing.Queue,
+    concurrency: int,
+    parallel_regions: bool,
+    profile: NetworkProfile,
+    run_id: str,
+    matrix_pay_types: Optional[List[str]],
+    processes: int,
+) -> None:
+    # Send every log record to the main process instead of opening the log file here, tagged
+    # with this process's worker/URL/region context (log_pipeline.py)
+    root = logging.getLogger()
+    root.handlers = [queue_handler(log_queue)]
+    root.setLevel(logging.INFO)
+
+    # Each worker traces into its own tracer; the spans are sent back to be merged at the end
+    tracer.configure(enabled=bool(TRACE_PATH))
+
+    status_counts: Dict[str, int] = {}
+    final_counts: Dict[str, int] = {}
+    try:
+        status_counts, final_counts = asyncio.run(
+            _shard_main(
+                task_queue,
+                result_queue,
+                concurrency,
+                parallel_regions,
+                profile,
+                run_id,
+                matrix_pay_types,
+                processes,
+            )
+        )
+    except Exception as e:
+        # Logged through the queue so the crash shows up in the main log file
+        logging.error(f"Shard worker {multiprocessing.current_process().name} crashed: {e}")
+    finally:
+        result_queue.put(("done", tracer.events, tracer.samples, status_counts, final_counts))
+
+
+async def _shard_main(
+    task_queue: multiprocessing.Queue,
+    result_queue: multiprocessing.Queue,
+    concurrency: int,
+    parallel_regions: bool,
+    profile: NetworkProfile,
+    run_id: str,
+    matrix_pay_types: Optional[List[str]],
+    processes: int,
+) -> Tuple[Dict[str, int], Dict[str, int]]:
+    # Imported here so the main process can import this module without a circular import
+    from browser_pool import BrowserPool
+    from discover_fields import run_discovery_stream_async
+    from run_services import RunServices
+
+    pool = await BrowserPool(network_profile=profile).start()
+    # Each process opens its own cache/results connections but records under the same run_id,
+    # and its rate limiter gets 1/processes of the per-host rate
+    services = RunServices.from_config(run_id, matrix_pay_types, processes)
+
+    # The worker runs the same engine as a single-process run (retries, circuit breaker, ...),
+    # fed from the shared task queue. positions[n] is the global index of the n-th URL taken.
+    positions: List[int] = []
+
+    def take_urls() -> Iterator[str]:
+        for index, url in iter(task_queue.get, None):  # None is this worker's sentinel
+            positions.append(index)
+            yield url
+
+    # Each URL goes back to the main process as soon as it is done
+    def send_result(local_index: int, url: str, summary: Dict[str, str]) -> None:
+        result_queue.put(("result", positions[local_index], summary))
+
+    try:
+        await run_discovery_stream_async(
+            take_urls(),
+            concurrency,
+            parallel_regions,
+            pool=pool,
+            services=services,
+            on_result=send_result,
+        )
+    finally:
+        await pool.close()
+        services.close()
+
+    # Attempts and final region statuses per status, sent back so the main process can total
+    # the run
+    return services.status_counts, services.final_counts
+
+
+# Adds per-status `counts` to `total` (nothing to do when the caller did not ask for a total)
+def add_counts(total: Optional[Dict[str, int]], counts: Dict[str, int]) -> None:
+    if total is None:
+        return
+    for status, count in counts.items():
+        total[status] = total.get(status, 0) + count
+
+
+# Splits `urls` (a list or any stream of URLs) across `processes` worker processes and returns
+# {url: region_status} in the original URL order. Pass `status_counts` / `final_counts` to have
+# the number of attempts / final region statuses per status, summed over all workers, added to
+# them. `matrix_pay_types` turns on matrix runs in every worker (see RunServices.from_config).
+def run_sharded(
+    urls: Iterable[str],
+    processes: int,
+    concurrency: int,
+    parallel_regions: bool,
+    network_profile: Optional[NetworkProfile] = None,
+    status_counts: Optional[Dict[str, int]] = None,
+    matrix_pay_types: Optional[List[str]] = None,
+    final_counts: Optional[Dict[str, int]] = None,
+) -> Dict[str, Dict[str, str]]:
+    from discover_fields import REGIONS, log_run_report
+
+    if isinstance(urls, list):
+        processes = max(1, min(processes, len(urls) or 1))
+    # Workers add each URL's host to the allowlist as they receive it (see allow_url_host)
+    profile = network_profile or profile_from_config()
+    run_id = new_run_id()  # Shared by the result records of every worker
+
+    # "spawn" gives every worker a clean interpreter (forking a process that runs Playwright
+    # threads is unsafe)
+    ctx = multiprocessing.get_context("spawn")
+    task_queue = ctx.Queue()
+    result_queue = ctx.Queue()
+    log_queue = ctx.Queue()
+
+    # The single writer: forwards worker records to the handlers configured in this process
+    # (stderr when there are none)
+    listener = logging.handlers.QueueListener(
+        log_queue, *forwarding_handlers(), respect_handler_level=True
+    )
+    listener.start()
+
+    workers = [
+        ctx.Process(
+            target=_shard_worker,
+            args=(
+                task_queue,
+                result_queue,
+                log_queue,
+                concurrency,
+                parallel_regions,
+                profile,
+                run_id,
+                matrix_pay_types,
+                processes,
+            ),
+            name=f"shard-{n}",
+        )
+        for n in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Workers are already running while the feeder thread reads the URL source
+    fed: List[str] = []
+    feeding_done = threading.Event()
+
+    def feed() -> None:
+        try:
+            for url in urls:
+                task_queue.put((len(fed), url))
+                fed.append(url)
+        except Exception as e:
+            logging.error(f"Stopped reading URLs: {e}")
+        finally:
+            for _ in range(processes):
+                task_queue.put(None)  # One sentinel per worker process
+            feeding_done.set()
+
+    feeder = threading.Thread(target=feed, name="url-feeder", daemon=True)
+    feeder.start()
+
+    # Messages are ("result", index, summary) per URL and one
+    # ("done", events, samples, status_counts, final_counts) per worker
+    results: Dict[int, Dict[str, str]] = {}
+    workers_done = 0
+    try:
+        while not feeding_done.is_set() or len(results) < len(fed) or workers_done < processes:
+            try:
+                kind, *payload = result_queue.get(timeout=RESULT_POLL_SECONDS)
+                if kind == "result":
+                    index, summary = payload
+                    results[index] = summary
+                else:
+                    events, samples, counts, finals = payload
+                    tracer.merge(events, samples)
+                    add_counts(status_counts, counts)
+                    add_counts(final_counts, finals)
+                    workers_done += 1
+            except queue.Empty:
+                # Stop waiting if every worker has exited (e.g. crashed) without finishing
+                if not any(worker.is_alive() for worker in workers):
+                    break
+        for worker in workers:
+            worker.join()
+    finally:
+        listener.stop()
+
+    # Merge into one ordered report; URLs lost to a crashed worker are reported as skipped
+    report: Dict[str, Dict[str, str]] = {}
+    for index, url in enumerate(fed):
+        if index not in results:
+            logging.error(f"No result for {url} - its worker process exited early")
+        report[url] = results.get(index, {r: "Skipped" for r in REGIONS})
+
+    log_run_report(report)
+    return report
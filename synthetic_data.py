@@ -0,0 +1,302 @@
+# Bulk synthetic buyer/donee data for high-volume runs.
+# make_test_data hands every URL x region the same "Dan Ross"/"Don Rush" pair, which rebuilds
+# (and revalidates) the same Pydantic objects thousands of times and sends the gateway identical
+# orders that its duplicate-order checks may reject. TestDataPool builds large pools of distinct
+# addresses per region once, up front: real US state / Canadian province codes with ZIP / postal
+# codes in the matching format and prefix, and INTL countries with their own postal formats.
+# The pools are built with model_construct (the seed tables below are validated once instead of
+# every address), and take() hands out a TestData in constant time per test, preferring a state /
+# country the page's dropdown actually offers.
+import hashlib
+import random
+import string
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from data_models import Address, FormSchema, TestData
+
+from config import TEST_DATA_POOL_SIZE, TEST_EMAIL
+
+# US states: (code, city, first three ZIP digits valid for the state)
+US_PLACES: List[Tuple[str, str, str]] = [
+    ("AL", "Birmingham", "352"),
+    ("AZ", "Phoenix", "850"),
+    ("CA", "Sacramento", "958"),
+    ("CO", "Denver", "802"),
+    ("CT", "Hartford", "061"),
+    ("FL", "Orlando", "328"),
+    ("GA", "Atlanta", "303"),
+    ("IA", "Des Moines", "503"),
+    ("IL", "Springfield", "627"),
+    ("IN", "Indianapolis", "462"),
+    ("KS", "Wichita", "672"),
+    ("KY", "Louisville", "402"),
+    ("MA", "Boston", "021"),
+    ("MD", "Baltimore", "212"),
+    ("MI", "Lansing", "489"),
+    ("MN", "Minneapolis", "554"),
+    ("MO", "Kansas City", "641"),
+    ("NC", "Raleigh", "276"),
+    ("NE", "Omaha", "681"),
+    ("NJ", "Newark", "071"),
+    ("NY", "Albany", "122"),
+    ("OH", "Columbus", "432"),
+    ("OR", "Portland", "972"),
+    ("PA", "Pittsburgh", "152"),
+    ("TN", "Nashville", "372"),
+    ("TX", "Austin", "787"),
+    ("VA", "Richmond", "232"),
+    ("WA", "Seattle", "981"),
+    ("WI", "Madison", "537"),
+]
+
+# Canadian provinces: (code, city, forward sortation area letters used by the province)
+CAN_PLACES: List[Tuple[str, str, str]] = [
+    ("AB", "Calgary", "T"),
+    ("BC", "Vancouver", "V"),
+    ("MB", "Winnipeg", "R"),
+    ("NB", "Fredericton", "E"),
+    ("NL", "St. John's", "A"),
+    ("NS", "Halifax", "B"),
+    ("ON", "Toronto", "KLMNP"),
+    ("PE", "Charlottetown", "C"),
+    ("QC", "Montreal", "GHJ"),
+    ("SK", "Regina", "S"),
+]
+
+# Letters Canada Post uses in postal codes (D, F, I, O, Q and U never appear)
+CAN_POSTAL_LETTERS = "ABCEGHJKLMNPRSTVWXYZ"
+
+# INTL countries (cds_country option text): (country, city, postal format).
+# In a format "9" is a digit, "A" a letter; anything else is copied as is.
+INTL_PLACES: List[Tuple[str, str, str]] = [
+    ("United Kingdom", "London", "SW9 9AA"),
+    ("France", "Paris", "750##"),
+    ("Germany", "Berlin", "10999"),
+    ("Netherlands", "Amsterdam", "10#9 AA"),
+    ("Australia", "Sydney", "2999"),
+    ("Japan", "Tokyo", "199-9999"),
+    ("Ireland", "Dublin", "D99 A999"),
+    ("Spain", "Madrid", "280##"),
+]
+
+FIRST_NAMES = [
+    "Dan",
+    "Don",
+    "Ann",
+    "Maria",
+    "James",
+    "Priya",
+    "Chen",
+    "Olivia",
+    "Noah",
+    "Grace",
+    "Omar",
+    "Lucia",
+    "Ethan",
+    "Hannah",
+    "Mateo",
+    "Zoe",
+    "Kofi",
+    "Ingrid",
+    "Ravi",
+    "Elena",
+]
+LAST_NAMES = [
+    "Ross",
+    "Rush",
+    "Miller",
+    "Garcia",
+    "Nguyen",
+    "Patel",
+    "Johnson",
+    "Kim",
+    "Lopez",
+    "Brown",
+    "Okafor",
+    "Schmidt",
+    "Rossi",
+    "Dubois",
+    "Walsh",
+    "Tanaka",
+    "Larsen",
+    "Silva",
+    "Cohen",
+    "Hill",
+]
+STREETS = [
+    "Main St",
+    "Oak Ave",
+    "Maple Dr",
+    "Cedar Ln",
+    "Park Rd",
+    "Elm St",
+    "Lake Blvd",
+    "Hill Rd",
+    "River Way",
+    "Pine Ct",
+    "Church St",
+    "Mill Ln",
+]
+
+
+# Fills a postal format: "9" -> digit, "#" -> digit 0-2 (Paris/Madrid districts), "A" -> letter
+def fill_format(rng: random.Random, fmt: str) -> str:
+    out = []
+    for char in fmt:
+        if char == "9":
+            out.append(rng.choice(string.digits))
+        elif char == "#":
+            out.append(rng.choice("012"))
+        elif char == "A":
+            out.append(rng.choice(string.ascii_uppercase))
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+# Canadian postal code for one of the province's first letters, e.g. "M5H2N2" (no space, like
+# make_test_data)
+def can_postal(rng: random.Random, first_letters: str) -> str:
+    return (
+        rng.choice(first_letters)
+        + rng.choice(string.digits)
+        + rng.choice(CAN_POSTAL_LETTERS)
+        + rng.choice(string.digits)
+        + rng.choice(CAN_POSTAL_LETTERS)
+        + rng.choice(string.digits)
+    )
+
+
+# Plus-addressed variant of `base` ("me@home.com" -> "me+k3f0042@home.com") so every order has
+# its own email but still lands in the same inbox
+def tagged_email(base: str, tag: str) -> str:
+    local, _, domain = base.partition("@")
+    return f"{local}+{tag}@{domain}" if domain else base
+
+
+# Pools of distinct addresses per region, built in bulk; take() is O(1) per test
+class TestDataPool:
+    __test__ = False  # Not a pytest test class despite the name
+
+    def __init__(self, size: int = TEST_DATA_POOL_SIZE, seed: str = "", email: str = TEST_EMAIL):
+        self.size = size  # Addresses per region
+        self._rng = random.Random(seed)  # nosec B311 - test data, not security
+        # Short tag that keeps emails from different runs/processes apart
+        self._tag = hashlib.sha256(seed.encode("utf-8")).hexdigest()[:4]
+        self._email = email
+        self._serial = 0
+        # (region, state code or country) -> addresses, and the next one to hand out
+        self._addresses: Dict[Tuple[str, str], List[Address]] = {}
+        self._next: Dict[Tuple[str, str], int] = {}
+        self._keys: Dict[str, List[str]] = {}  # region -> its state codes / countries
+        self._rotation: Dict[str, int] = {}  # region -> counter spreading tests over keys
+        self.handed_out = 0
+        self._build("US", [(code, city, "United States", zip3) for code, city, zip3 in US_PLACES])
+        self._build("CAN", [(code, city, "Canada", letters) for code, city, letters in CAN_PLACES])
+        self._build("INTL", [(country, city, country, fmt) for country, city, fmt in INTL_PLACES])
+
+    # Builds `size` addresses for a region, spread evenly over its places
+    def _build(self, region: str, places: List[Tuple[str, str, str, str]]) -> None:
+        per_place = max(1, -(-self.size // len(places)))  # Ceiling division
+        self._keys[region] = [key for key, _, _, _ in places]
+        self._rotation[region] = 0
+        for key, city, country, postal_spec in places:
+            self._addresses[(region, key)] = [
+                self._address(region, key, city, country, postal_spec) for _ in range(per_place)
+            ]
+            self._next[(region, key)] = 0
+
+    # One synthetic address; Address.model_construct skips validation (the tables are checked
+    # once by validate())
+    def _address(self, region: str, key: str, city: str, country: str, postal_spec: str) -> Address:
+        rng = self._rng
+        self._serial += 1
+        fields = {
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "address1": f"{rng.randint(100, 9899)} {rng.choice(STREETS)}",
+            "city": city,
+            "country": country,
+            "email": tagged_email(self._email, f"{self._tag}{self._serial:05d}"),
+        }
+        if region == "US":
+            fields.update(state=key, zip=postal_spec + fill_format(rng, "99"))
+        elif region == "CAN":
+            fields.update(state=key, zip=can_postal(rng, postal_spec))
+        else:
+            fields.update(postal=fill_format(rng, postal_spec))
+        return Address.model_construct(**fields)
+
+    # Next address for (region, key), cycling through its pool
+    def _take_address(self, region: str, key: str) -> Address:
+        addresses = self._addresses[(region, key)]
+        index = self._next[(region, key)]
+        self._next[(region, key)] = (index + 1) % len(addresses)
+        return addresses[index]
+
+    # Next state code / country for the region, restricted to `allowed` when it overlaps
+    def _pick_key(self, region: str, allowed: Optional[Iterable[str]]) -> str:
+        keys = self._keys[region]
+        if allowed is not None:
+            wanted = {value.lower() for value in allowed}
+            keys = [key for key in keys if key.lower() in wanted] or keys
+        turn = self._rotation[region]
+        self._rotation[region] = turn + 1
+        return keys[turn % len(keys)]
+
+    # A fresh TestData for one test. With the page's schema, buyer and donee use a state (US/CAN)
+    # or country (INTL) its dropdowns offer, so fill_form does not skip over a pool choice.
+    def take(
+        self,
+        region: str,
+        term_index: int = 0,
+        is_gift_page: bool = True,
+        schema: Optional[FormSchema] = None,
+    ) -> TestData:
+        if region not in self._keys:
+            raise ValueError(f"Unsupported region: {region}")
+        buyer_choices = donee_choices = None
+        if schema is not None:
+            buyer_field = "cds_state" if region in ("US", "CAN") else "cds_country"
+            buyer_choices = option_choices(schema, buyer_field)
+            donee_choices = option_choices(schema, f"cds_donee1_{buyer_field[4:]}")
+        buyer = self._take_address(region, self._pick_key(region, buyer_choices))
+        donee = None
+        if is_gift_page:
+            donee = self._take_address(region, self._pick_key(region, donee_choices))
+        self.handed_out += 1
+        return TestData.model_construct(
+            region=region, term_index=term_index, buyer=buyer, donee=donee
+        )
+
+    # One-line report for the end-of-run log
+    def summary(self) -> str:
+        pooled = sum(len(addresses) for addresses in self._addresses.values())
+        return f"Synthetic test data: {self.handed_out} tests drawn from {pooled} pooled addresses"
+
+    # Every pool entry, e.g. for validate()
+    def addresses(self, region: str) -> List[Address]:
+        return [a for key in self._keys[region] for a in self._addresses[(region, key)]]
+
+    # Re-validates every pooled address through the normal Pydantic path (tests / debugging)
+    def validate(self) -> None:
+        for region in self._keys:
+            for address in self.addresses(region):
+                Address.model_validate(address.model_dump())
+
+
+# Option values and texts of a <select> (None when the page has no such dropdown)
+def option_choices(schema: FormSchema, name: str) -> Optional[List[str]]:
+    field = schema.first(name, tag="select")
+    if field is None:
+        return None
+    choices = [option.value for option in field.options if option.value]
+    choices.extend(option.text for option in field.options if option.text)
+    return choices
+
+
+# Pool per config.py (None when TEST_DATA_POOL_SIZE is 0: every test uses make_test_data).
+# Seed with the run_id (plus something per process) so runs and workers get different data.
+def pool_from_config(seed: str = "") -> Optional[TestDataPool]:
+    if TEST_DATA_POOL_SIZE <= 0:
+        return None
+    return TestDataPool(TEST_DATA_POOL_SIZE, seed, TEST_EMAIL)
@@ -0,0 +1,80 @@
+# Shared pytest fixtures.
+# pytest loads this file automatically for every test in this folder.
+import sys
+import os
+from types import SimpleNamespace
+from typing import Iterator, List
+
+import pytest
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from browser_pool import BrowserPool
+from gateway_stub import GatewayStub
+from network_profile import NetworkProfile, NetworkStats
+
+
+# One Chromium for the whole test session. Each test borrows a fresh context from it,
+# so a large suite pays browser startup once instead of once per test case.
+# Host contexts are never reused here: every test starts without cookies or storage.
+@pytest.fixture(scope="session")
+def browser_pool() -> Iterator[BrowserPool]:
+    pool = BrowserPool.start_sync(reuse_host_contexts=False)
+    yield pool
+    pool.close_sync()
+
+
+# Local OrdersGateway stand-in (tests/gateway_stub.py) for offline form tests and benchmarks
+@pytest.fixture(scope="session")
+def gateway() -> Iterator[GatewayStub]:
+    stub = GatewayStub().start()
+    yield stub
+    stub.stop()
+
+
+# Response of the fake HTTP client below
+class FakeResponse:
+    def __init__(self, html: str) -> None:
+        self.ok = True
+        self.status = 200
+        self.html = html
+
+    async def text(self) -> str:
+        return self.html
+
+
+# Stand-in for the pool's APIRequestContext: every GET answers 200 with `html` (set it in the
+# test) and is remembered in `fetched`
+class FakeRequest:
+    def __init__(self) -> None:
+        self.html = ""
+        self.fetched: List[str] = []
+
+    async def get(self, url: str, timeout: float) -> FakeResponse:
+        self.fetched.append(url)
+        return FakeResponse(self.html)
+
+
+@pytest.fixture
+def fake_request() -> FakeRequest:
+    return FakeRequest()
+
+
+# Stand-in for BrowserPool in engine tests that replace the browser stage (inspect_url_pooled,
+# attempt_region...) with fakes: only the settings and counters the engine reads, plus
+# api_request() serving fake_request to the pre-screen
+@pytest.fixture
+def fake_pool(fake_request: FakeRequest) -> SimpleNamespace:
+    async def api_request() -> FakeRequest:
+        return fake_request
+
+    return SimpleNamespace(
+        network_profile=NetworkProfile(enabled=False),
+        network_stats=NetworkStats(),
+        har_mode="off",
+        contexts_lent=0,
+        contexts_reused=0,
+        recycles={},
+        api_request=api_request,
+    )
@@ -0,0 +1,256 @@
+# Local stand-in for the OrdersGateway servlet, so the form runner can be tested and
+# benchmarked offline. Every page is generated from its query string:
+#   /servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=1&countries=all&gift=1&reveal_ms=200
+# countries  - "us", "can", "intl" or "all" for a cds_country dropdown with those countries,
+#              "hidden_us" / "hidden_can" for a hidden cds_country input
+# gift       - "1" adds a gift term checkbox whose donee fields are revealed by JavaScript
+# reveal_ms  - delay before JavaScript reveals the donee block / the ZIP or postal row
+# result     - "success" or "error" (the order response shows a .error message)
+# script     - "0" serves the form without its <script> (a plain HTML form: nothing is revealed,
+#              but the protocol-level path can post it)
+# Run it by hand with `python tests/gateway_stub.py [port]` to look at the pages in a browser.
+import html
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from pydantic import BaseModel, Field
+
+GATEWAY_PATH = "/servlet/OrdersGateway"
+ORDER_PATH = "/servlet/OrdersGateway/order"
+
+# Option values of the buyer country dropdown for each "countries" variant
+COUNTRY_OPTIONS = {
+    "us": ["United States"],
+    "can": ["Canada"],
+    "intl": ["United Kingdom", "France", "Germany"],
+    "all": ["United States", "Canada", "United Kingdom", "France", "Germany"],
+}
+
+# Hidden cds_country value for the hidden-input variants
+HIDDEN_COUNTRY = {"hidden_us": "United States", "hidden_can": "Canada"}
+
+STATES = ["IA", "IL", "ON", "QC"]
+
+# Fields an order needs; a submission without them gets a .error response
+REQUIRED_FIELDS = ["cds_name", "cds_address_1", "cds_city", "cds_email", "cds_cc_number"]
+
+
+# One generated form variant (parsed from / turned into the page's query string)
+class StubPage(BaseModel):
+    page_id: str = "1"
+    countries: str = Field("all", pattern="^(us|can|intl|all|hidden_us|hidden_can)$")
+    gift: bool = False
+    reveal_ms: int = 0
+    result: str = Field("success", pattern="^(success|error)$")
+    script: bool = True
+
+    def query(self) -> str:
+        return urlencode(
+            {
+                "cds_mag_code": "STUB",
+                "cds_page_id": self.page_id,
+                "countries": self.countries,
+                "gift": "1" if self.gift else "0",
+                "reveal_ms": self.reveal_ms,
+                "result": self.result,
+                "script": "1" if self.script else "0",
+            }
+        )
+
+    @classmethod
+    def from_query(cls, query: str) -> "StubPage":
+        params = {k: v[0] for k, v in parse_qs(query).items()}
+        return cls(
+            page_id=params.get("cds_page_id", "1"),
+            countries=params.get("countries", "all"),
+            gift=params.get("gift") == "1",
+            reveal_ms=int(params.get("reveal_ms", "0")),
+            result=params.get("result", "success"),
+            script=params.get("script") != "0",
+        )
+
+
+def _options(values: List[str]) -> str:
+    return "".join(f'<option value="{html.escape(v)}">{html.escape(v)}</option>' for v in values)
+
+
+# Payment dropdown: "Bill me" plus two cards and PayPal
+def _pay_options() -> str:
+    pay_types = [("1", "Bill me"), ("2", "Visa"), ("3", "MasterCard"), ("5", "PayPal")]
+    return "".join(f'<option value="{value}">{text}</option>' for value, text in pay_types)
+
+
+# Donee block: hidden until the gift term is checked, then revealed after reveal_ms
+def _donee_block() -> str:
+    return f"""
+    <input type="checkbox" name="cds_donee1_term_value" value="12"> Give a gift subscription
+    <div id="donee" style="display:none">
+      <input name="cds_donee1_name"> <input name="cds_donee1_address_1">
+      <input name="cds_donee1_address_2"> <input name="cds_donee1_city">
+      <select name="cds_donee1_state">{_options(STATES)}</select>
+      <input name="cds_donee1_zip"> <input name="cds_donee1_postal">
+      <input name="cds_donee1_email">
+    </div>"""
+
+
+# Reveals the donee block / ZIP or postal row after reveal_ms, like the real gateway pages
+def _script(page: StubPage) -> str:
+    return f"""<script>
+    const delay = {page.reveal_ms};
+    const show = (id, visible) => {{
+      document.getElementById(id).style.display = visible ? "block" : "none";
+    }};
+    const gift = document.querySelector('[name="cds_donee1_term_value"]');
+    if (gift) gift.addEventListener("change", () => setTimeout(() => show("donee", gift.checked), delay));
+    const country = document.querySelector('select[name="cds_country"]');
+    if (country) country.addEventListener("change", () => setTimeout(() => {{
+      const domestic = ["United States", "Canada"].includes(country.value);
+      show("zip_row", domestic);
+      show("postal_row", !domestic);
+    }}, delay));
+  </script>"""
+
+
+# Full order form page for one variant
+def render_form(page: StubPage) -> str:
+    if page.countries in HIDDEN_COUNTRY:
+        country = (
+            f'<input type="hidden" name="cds_country" value="{HIDDEN_COUNTRY[page.countries]}">'
+        )
+        first_country = HIDDEN_COUNTRY[page.countries]
+    else:
+        country = f'<select name="cds_country">{_options(COUNTRY_OPTIONS[page.countries])}</select>'
+        first_country = COUNTRY_OPTIONS[page.countries][0]
+    domestic = first_country in ("United States", "Canada")
+
+    return f"""<!DOCTYPE html>
+<html><head><title>Order {page.page_id}</title></head>
+<body>
+  <form method="post" action="{ORDER_PATH}?{html.escape(page.query())}">
+    <label><input type="radio" name="cds_term_value" value="12" checked>12 issues</label>
+    <label><input type="radio" name="cds_term_value" value="24">24 issues</label>
+    {_donee_block() if page.gift else ""}
+    <input name="cds_name"> <input name="cds_address_1"> <input name="cds_address_2">
+    <input name="cds_city">
+    {country}
+    <select name="cds_state">{_options(STATES)}</select>
+    <div id="zip_row" style="display:{"block" if domestic else "none"}"><input name="cds_zip"></div>
+    <div id="postal_row" style="display:{"none" if domestic else "block"}"><input name="cds_postal"></div>
+    <input name="cds_email">
+    <select name="cds_pay_type">{_pay_options()}</select>
+    <input name="cds_cc_number"> <input name="cds_cc_exp_month"> <input name="cds_cc_exp_year">
+    <input name="cds_cc_security_code">
+    <input type="submit" name="send" value="Order">
+  </form>
+  {_script(page) if page.script else ""}
+</body></html>"""
+
+
+# Order response: a confirmation, or a page with a .error message
+def render_order_result(page: StubPage, form: Dict[str, str]) -> str:
+    missing = [name for name in REQUIRED_FIELDS if not form.get(name)]
+    if missing:
+        message = f"Please fill in: {', '.join(missing)}"
+    elif page.result == "error":
+        message = "Country does not match the selected term"
+    else:
+        return "<html><body><h1>Thank you for your order</h1></body></html>"
+    return f'<html><body><div class="error">{html.escape(message)}</div></body></html>'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubHTTPServer"
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        if url.path != GATEWAY_PATH:
+            self._send(404, "<html><body>Not found</body></html>")
+            return
+        self._send(200, render_form(StubPage.from_query(url.query)))
+
+    def do_POST(self) -> None:
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+        form = {k: v[0] for k, v in parse_qs(body).items()}
+        with self.server.lock:
+            self.server.submissions.append(form)
+        self._send(200, render_order_result(StubPage.from_query(url.query), form))
+
+    def _send(self, status: int, body: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Keep pytest output clean
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    submissions: List[Dict[str, str]]
+    lock: threading.Lock
+
+
+# The stand-in server, running on a background thread (port 0 picks a free port)
+class GatewayStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = _StubHTTPServer((host, port), _Handler)
+        self._server.submissions = []
+        self._server.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    # Every form body posted so far, in arrival order
+    @property
+    def submissions(self) -> List[Dict[str, str]]:
+        with self._server.lock:
+            return list(self._server.submissions)
+
+    # URL of one generated page variant
+    def url(self, page: StubPage) -> str:
+        return f"{self.base_url}{GATEWAY_PATH}?{page.query()}"
+
+    def start(self) -> "GatewayStub":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="gateway-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# A repeatable mix of every variant, `count` pages long (used by the benchmarks)
+def page_mix(count: int) -> List[StubPage]:
+    variants = [
+        StubPage(countries="all"),
+        StubPage(countries="us", gift=True, reveal_ms=100),
+        StubPage(countries="can"),
+        StubPage(countries="intl", reveal_ms=50),
+        StubPage(countries="hidden_us"),
+        StubPage(countries="hidden_can", gift=True),
+        StubPage(countries="all", result="error"),
+    ]
+    return [
+        variants[n % len(variants)].model_copy(update={"page_id": str(n + 1)}) for n in range(count)
+    ]
+
+
+if __name__ == "__main__":
+    stub = GatewayStub(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080)
+    print(f"Serving stand-in pages at {stub.url(StubPage())}")
+    stub._server.serve_forever()
@@ -0,0 +1,118 @@
+# Unit tests for failure artifact capture (fake page, so no browser is needed)
+import sys
+import os
+import asyncio
+import gzip
+import json
+import threading
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from artifacts import ArtifactStore, artifact_name
+from data_models import AttemptRecord
+
+URL = "http://127.0.0.1/servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=7"
+
+
+# Stands in for a Playwright page: a screenshot and the two page.evaluate dumps
+class FakePage:
+    def __init__(self, fail_screenshot: bool = False, screenshot_bytes: int = 100) -> None:
+        self.fail_screenshot = fail_screenshot
+        self.screenshot_bytes = screenshot_bytes
+
+    async def screenshot(self, **kwargs) -> bytes:
+        if self.fail_screenshot:
+            raise TimeoutError("screenshot timed out")
+        return b"\xff\xd8jpeg" + b"x" * self.screenshot_bytes
+
+    async def evaluate(self, script: str):
+        if "performance" in script:
+            return [{"url": URL, "type": "navigation", "status": 200, "duration_ms": 12}]
+        return '<form><input name="cds_name" value="Dan Ross"></form>'
+
+
+def failed_attempt() -> AttemptRecord:
+    return AttemptRecord(url=URL, region="US", status="submission_error", error="Bad card")
+
+
+def test_artifact_name() -> None:
+    assert artifact_name(URL, "CAN", 3) == "STUB-7-CAN-3"  # nosec
+    assert artifact_name("http://x/", "US", 1).endswith("-US-1")  # nosec
+
+
+# Capture writes the screenshot as is and the text dumps gzipped, in the background
+def test_capture_writes_compressed_files(tmp_path) -> None:
+    store = ArtifactStore(str(tmp_path / "run-1"), max_bytes=0)
+    attempt = failed_attempt()
+    asyncio.run(store.capture(FakePage(), attempt))
+    store.close()
+    folder = attempt.artifacts
+    assert folder and folder.endswith("STUB-7-US-1")  # nosec
+    assert sorted(os.listdir(folder)) == [  # nosec
+        "attempt.json.gz",
+        "form.html.gz",
+        "network.json.gz",
+        "screenshot.jpg",
+    ]
+    with gzip.open(os.path.join(folder, "form.html.gz"), "rt") as f:
+        assert 'value="Dan Ross"' in f.read()  # nosec
+    with gzip.open(os.path.join(folder, "network.json.gz"), "rt") as f:
+        assert json.load(f)[0]["status"] == 200  # nosec
+    assert store.captured == 1 and store.bytes_written > 0  # nosec
+
+
+# A page that cannot be screenshotted still gets its DOM/network dump
+def test_capture_survives_screenshot_failure(tmp_path) -> None:
+    store = ArtifactStore(str(tmp_path / "run-1"), max_bytes=0)
+    attempt = failed_attempt()
+    asyncio.run(store.capture(FakePage(fail_screenshot=True), attempt))
+    store.close()
+    assert "screenshot.jpg" not in os.listdir(attempt.artifacts)  # nosec
+    assert "form.html.gz" in os.listdir(attempt.artifacts)  # nosec
+
+
+# Captures reserve their size when queued, so a burst cannot overshoot the disk budget
+def test_disk_budget(tmp_path) -> None:
+    attempts = [failed_attempt() for _ in range(4)]
+
+    async def burst(store: ArtifactStore) -> None:
+        for attempt in attempts:
+            await store.capture(FakePage(screenshot_bytes=10_000), attempt)
+
+    # ~10.5 kB per capture: two fit, whatever the writer has done by the third
+    store = ArtifactStore(str(tmp_path / "run-1"), max_bytes=25_000)
+    asyncio.run(burst(store))
+    store.close()
+    assert [bool(a.artifacts) for a in attempts] == [True, True, False, False]  # nosec
+    assert store.captured == 2 and store.dropped == 2  # nosec
+    assert store.bytes_written <= store.max_bytes  # nosec
+    assert "2 failures not captured" in store.summary()  # nosec
+
+
+# Captures waiting for a stuck writer are bounded: the rest are dropped, not held in memory
+def test_queue_is_bounded(tmp_path) -> None:
+    store = ArtifactStore(str(tmp_path / "run-1"), max_bytes=0, queue_size=1)
+    writing, release = threading.Event(), threading.Event()
+    write = store._write
+
+    def slow_write(*args) -> None:
+        writing.set()
+        release.wait(5)
+        write(*args)
+
+    store._write = slow_write
+    attempts = [failed_attempt() for _ in range(3)]
+
+    async def burst() -> None:
+        await store.capture(FakePage(), attempts[0])
+        await asyncio.to_thread(writing.wait, 5)  # The writer holds the first capture
+        for attempt in attempts[1:]:
+            await store.capture(FakePage(), attempt)
+
+    asyncio.run(burst())
+    release.set()
+    store.close()
+    assert [bool(a.artifacts) for a in attempts] == [True, True, False]  # nosec
+    assert store.captured == 2 and store.dropped_busy == 1  # nosec
+    assert "writer queue full" in store.summary()  # nosec
@@ -0,0 +1,131 @@
+# Throughput benchmarks for run_discovery against the local stand-in server (tests/gateway_stub.py).
+# Skipped by default because the large sizes take a while; run them with
+#   RUN_BENCHMARKS=1 python -m pytest -q -s tests/test_benchmark.py
+# Each size logs URLs/minute and p50/p95/p99 per fill_form phase, and appends them to
+# BENCHMARK_HISTORY_PATH (default results/benchmarks.jsonl). A run fails when its throughput is
+# below BENCHMARK_TOLERANCE (default 0.5) times the best recorded run of the same size, or below
+# BENCHMARK_MIN_URLS_PER_MIN, so performance regressions are caught on the same machine.
+import sys
+import os
+import json
+import time
+from typing import Dict, List
+
+import pytest
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import AttemptRecord
+from discover_fields import REGIONS, run_discovery_async
+from gateway_stub import StubPage, page_mix
+from results import ResultRecorder
+from run_services import RunServices
+from tracing import percentile, tracer
+
+RUN_BENCHMARKS = os.getenv("RUN_BENCHMARKS", "").lower() in ("1", "true", "yes")
+BENCHMARK_HISTORY_PATH = os.getenv("BENCHMARK_HISTORY_PATH", "results/benchmarks.jsonl")
+BENCHMARK_TOLERANCE = float(os.getenv("BENCHMARK_TOLERANCE", "0.5"))
+BENCHMARK_MIN_URLS_PER_MIN = float(os.getenv("BENCHMARK_MIN_URLS_PER_MIN", "0"))
+
+# Regions each "countries" variant supports
+SUPPORTED_REGIONS = {
+    "us": {"US"},
+    "can": {"CAN"},
+    "intl": {"INTL"},
+    "all": {"US", "CAN", "INTL"},
+    "hidden_us": {"US"},
+    "hidden_can": {"CAN"},
+}
+
+
+# Keeps the attempt records in memory instead of writing result files
+class MemorySink:
+    def __init__(self) -> None:
+        self.records: List[AttemptRecord] = []
+
+    def write(self, record: AttemptRecord) -> None:
+        self.records.append(record)
+
+    def close(self) -> None:
+        pass
+
+
+# Status the runner should report for one region of a stand-in page
+def expected_status(page: StubPage, region: str) -> str:
+    if region not in SUPPORTED_REGIONS[page.countries]:
+        return "skipped"
+    return "submission_error" if page.result == "error" else "success"
+
+
+# Best URLs/minute recorded so far for this many pages (0 when there is no history)
+def best_recorded(pages: int) -> float:
+    if not os.path.exists(BENCHMARK_HISTORY_PATH):
+        return 0.0
+    with open(BENCHMARK_HISTORY_PATH, encoding="utf-8") as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    return max((run["urls_per_min"] for run in runs if run["pages"] == pages), default=0.0)
+
+
+def append_history(entry: Dict) -> None:
+    if os.path.dirname(BENCHMARK_HISTORY_PATH):
+        os.makedirs(os.path.dirname(BENCHMARK_HISTORY_PATH), exist_ok=True)
+    with open(BENCHMARK_HISTORY_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+@pytest.mark.skipif(not RUN_BENCHMARKS, reason="set RUN_BENCHMARKS=1 to run the benchmarks")
+@pytest.mark.parametrize("pages", [10, 100, 1000])
+def test_discovery_throughput(browser_pool, gateway, pages: int) -> None:
+    stub_pages = page_mix(pages)
+    urls = [gateway.url(page) for page in stub_pages]
+    sink = MemorySink()
+    services = RunServices(recorder=ResultRecorder([sink]))
+
+    tracer.configure(enabled=True)
+    try:
+        start = time.perf_counter()
+        browser_pool.run(run_discovery_async(urls, pool=browser_pool, services=services))
+        elapsed = time.perf_counter() - start
+        samples = {name: sorted(values) for name, values in tracer.samples.items()}
+        summary = tracer.summary_lines()
+    finally:
+        tracer.configure(enabled=False)
+
+    # Every page/region must end the way the stand-in was set up to answer
+    expected = {
+        (url, region): expected_status(page, region)
+        for url, page in zip(urls, stub_pages)
+        for region in REGIONS
+    }
+    actual = {(r.url, r.region): r.status for r in sink.records}
+    wrong = {
+        key: (status, expected[key]) for key, status in actual.items() if status != expected[key]
+    }
+    assert len(actual) == len(expected), "Some page/region attempts were not recorded"  # nosec
+    assert not wrong, f"Unexpected statuses (got, expected): {wrong}"  # nosec
+
+    urls_per_min = pages / elapsed * 60
+    entry = {
+        "pages": pages,
+        "at": time.time(),
+        "elapsed_s": round(elapsed, 2),
+        "urls_per_min": round(urls_per_min, 1),
+        "phases_ms": {
+            name: {
+                "p50": round(percentile(values, 50), 1),
+                "p95": round(percentile(values, 95), 1),
+                "p99": round(percentile(values, 99), 1),
+            }
+            for name, values in samples.items()
+        },
+    }
+    best = best_recorded(pages)
+    append_history(entry)
+
+    print(f"\n{pages} pages in {elapsed:.1f} s = {urls_per_min:.1f} URLs/min (best {best:.1f})")
+    for line in summary:
+        print(f"  {line}")
+
+    assert urls_per_min >= BENCHMARK_MIN_URLS_PER_MIN  # nosec
+    assert urls_per_min >= best * BENCHMARK_TOLERANCE, "Throughput regressed"  # nosec
@@ -0,0 +1,48 @@
+# Tests for bulk form filling against the local stand-in pages (tests/gateway_stub.py)
+import sys
+import os
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from bulk_fill import bulk_fill
+from gateway_stub import StubPage
+
+# Current value of every named control, read back after the fill
+READ_VALUES_JS = """
+() => Object.fromEntries(
+    Array.from(document.querySelectorAll("[name]")).map((el) => [el.name, el.value])
+)
+"""
+
+
+# Fields that are not on the page (or hidden, hidden by CSS, disabled) come back as missing, dropdown values
+# without a matching option as unmatched; everything else is filled in one round trip
+def test_bulk_fill_reports_missing_and_unmatched(browser_pool, gateway) -> None:
+    url = gateway.url(StubPage(countries="hidden_us"))
+
+    async def scenario():
+        async with browser_pool.context(url) as context:
+            page = await context.new_page()
+            await page.goto(url)
+            result = await bulk_fill(
+                page,
+                {
+                    "cds_name": "Dan Ross",
+                    "cds_zip": "50010",
+                    "cds_pay_type": "Visa",  # Matched by option text
+                    "cds_state": "ZZ",  # No such option
+                    "cds_country": "Canada",  # Hidden input: never filled
+                    "cds_postal": "K1A 0B1",  # In a display:none row on a US page
+                    "cds_fax": "555-0100",  # Not on the page
+                },
+            )
+            return result, await page.evaluate(READ_VALUES_JS)
+
+    result, values = browser_pool.run(scenario())
+    assert result["filled"] == ["cds_name", "cds_zip", "cds_pay_type"]  # nosec
+    assert result["missing"] == ["cds_country", "cds_postal", "cds_fax"]  # nosec
+    assert result["unmatched"] == ["cds_state"]  # nosec
+    assert values["cds_name"] == "Dan Ross" and values["cds_pay_type"] == "2"  # nosec
+    assert values["cds_state"] == "IA" and values["cds_country"] == "United States"  # nosec
+    assert values["cds_postal"] == ""  # nosec
@@ -0,0 +1,84 @@
+# Unit tests for the headless CLI helpers and the exit code of a run (fake browser stage, so no
+# browser is needed)
+import sys
+import os
+import asyncio
+import io
+from typing import List
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cli
+import discover_fields
+from cli import EXIT_FAILED, EXIT_NO_URLS, EXIT_OK, exit_code, iter_urls, parse_args
+from data_models import AttemptRecord
+from discover_fields import REGIONS
+from run_services import RunServices
+from scheduler import RetryPolicy
+
+
+# Blank lines and comments are dropped, URLs are stripped, and nothing is read ahead
+def test_iter_urls_streams_lines() -> None:
+    stream = io.StringIO("# nightly list\nhttps://a.example/form\n\n  https://b.example/form  \n")
+    urls = iter_urls(stream)
+    assert next(urls) == "https://a.example/form"  # nosec
+    assert stream.read() == "\n  https://b.example/form  \n"  # nosec
+
+
+# 0 only when every region of every URL ended with a good status
+def test_exit_code() -> None:
+    assert exit_code(0, {}, 3) == EXIT_NO_URLS  # nosec
+    assert exit_code(1, {"success": 1, "skipped": 2}, 3) == EXIT_OK  # nosec
+    assert exit_code(1, {"success": 2, "submission_error": 1}, 3) == EXIT_FAILED  # nosec
+    assert exit_code(1, {"success": 2, "not_attempted": 1}, 3) == EXIT_FAILED  # nosec
+    # A URL whose worker process crashed leaves no final statuses at all
+    assert exit_code(2, {"success": 3}, 3) == EXIT_FAILED  # nosec
+
+
+# A region that failed once and passed on its retry does not fail the run
+def test_retry_that_succeeds_exits_ok(monkeypatch, fake_pool) -> None:
+    passes: List[List[str]] = []
+
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        passes.append(list(regions))
+        failed = len(passes) == 1
+        attempts = {
+            r: AttemptRecord(
+                url=url,
+                region=r,
+                status="error" if failed else "success",
+                error="Timeout 5000ms exceeded" if failed else None,
+            )
+            for r in regions
+        }
+        for attempt in attempts.values():
+            services.record(attempt)  # As run_region does
+        return attempts
+
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    services = RunServices(retry=RetryPolicy(max_attempts=2, base_delay=0, max_delay=0))
+    url = "http://gw.example/form"
+    results = asyncio.run(
+        discover_fields.run_discovery_stream_async([url], pool=fake_pool, services=services)
+    )
+
+    assert passes == [REGIONS, REGIONS]  # nosec
+    assert services.status_counts == {"error": 3, "success": 3}  # nosec
+    assert services.final_counts == {"success": 3}  # nosec
+    assert exit_code(len(results), services.final_counts, len(REGIONS)) == EXIT_OK  # nosec
+
+
+# Reads stdin by default
+def test_parse_args_defaults_to_stdin() -> None:
+    args = parse_args([])
+    assert args.source == "-"  # nosec
+    assert args.gui is False  # nosec
+
+
+# --no-parallel-regions overrides PARALLEL_REGIONS=true from the environment
+def test_parallel_regions_flag_can_be_turned_off(monkeypatch) -> None:
+    monkeypatch.setattr(cli, "PARALLEL_REGIONS", True)
+    assert parse_args([]).parallel_regions is True  # nosec
+    assert parse_args(["--no-parallel-regions"]).parallel_regions is False  # nosec
+    assert parse_args(["--parallel-regions"]).parallel_regions is True  # nosec
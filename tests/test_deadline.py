@@ -0,0 +1,142 @@
+# Unit tests for time budgets and the watchdog (fake page/pool, so no browser is needed)
+import sys
+import os
+import asyncio
+from typing import List
+
+import pytest
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+from deadline import Deadline, DeadlineExceeded, DeadlinePolicy
+from rate_limit import HostRateLimiter
+from run_services import RunServices
+
+URL = "http://127.0.0.1/servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=1"
+
+
+# Step timeouts are the step's cap until the budget runs low, then what is left, then an error
+def test_deadline_timeouts() -> None:
+    now = [0.0]
+    deadline = Deadline(10_000, clock=lambda: now[0])
+    assert deadline.timeout(3000) == 3000  # nosec
+    now[0] = 8.0
+    assert deadline.timeout(3000) == pytest.approx(2000)  # nosec
+    assert deadline.clamped_ms == pytest.approx(1000)  # nosec
+    child = deadline.child(5000)
+    assert child.budget_ms == pytest.approx(2000)  # nosec  (only 2 s left of the URL)
+    now[0] = 10.5
+    assert deadline.expired()  # nosec
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(500)
+    assert Deadline.unlimited().timeout(3000) == 3000  # nosec
+
+
+# Time spent waiting for a rate-limit token is charged neither to the region nor to its URL
+def test_paused_deadline_is_not_charged() -> None:
+    now = [0.0]
+    url_deadline = Deadline(10_000, clock=lambda: now[0])
+    region = url_deadline.child(5000)
+    with region.paused():
+        now[0] = 4.0
+        assert region.remaining_ms() == pytest.approx(5000)  # nosec
+    now[0] = 5.0
+    assert region.remaining_ms() == pytest.approx(4000)  # nosec
+    assert url_deadline.remaining_ms() == pytest.approx(9000)  # nosec
+
+
+# A throttled region keeps its whole budget for the page, and the watchdog waits for it
+def test_rate_limit_wait_outside_region_budget() -> None:
+    policy = DeadlinePolicy(url_budget_ms=1000, region_budget_ms=100, grace_ms=20)
+    limiter = HostRateLimiter(rate=1, burst=1)
+    services = RunServices(deadlines=policy, limiter=limiter)
+
+    class SlowPage(HungPage):
+        async def goto(self, url: str, timeout: float) -> None:
+            self.goto_timeout = timeout
+            raise RuntimeError("stop after the page load")
+
+    async def run() -> List:
+        await limiter.acquire("127.0.0.1")  # Next token in ~1 s, far past the region budget
+        page = SlowPage()
+        attempt = await discover_fields.run_region(page, URL, "US", services)
+        return [attempt, page]
+
+    attempt, page = asyncio.run(run())
+    assert policy.watchdog_kills == 0 and policy.exhausted == 0  # nosec
+    assert attempt.timings_ms["rate_limit"] > 500  # nosec
+    assert page.goto_timeout == pytest.approx(100, abs=20)  # nosec
+    assert "stop after the page load" in attempt.error  # nosec
+
+
+# Page whose navigation never finishes (a hung renderer)
+class HungPage:
+    def __init__(self) -> None:
+        self.closed = False
+        self.url = URL
+
+    async def goto(self, url: str, timeout: float) -> None:
+        await asyncio.sleep(3600)
+
+    def is_closed(self) -> bool:
+        return self.closed
+
+    async def close(self) -> None:
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self) -> None:
+        self.page = HungPage()
+
+    async def new_page(self) -> HungPage:
+        return self.page
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.released: List[bool] = []
+        self.contexts: List[FakeContext] = []
+
+    async def new_context(self, url: str) -> FakeContext:
+        self.contexts.append(FakeContext())
+        return self.contexts[-1]
+
+    async def release(self, context: FakeContext, reuse: bool = True) -> None:
+        self.released.append(reuse)
+
+
+# The watchdog cancels a region past its budget, closes the page and recycles the context
+def test_watchdog_recycles_hung_page() -> None:
+    policy = DeadlinePolicy(url_budget_ms=1000, region_budget_ms=50, grace_ms=20)
+    services = RunServices(deadlines=policy)
+    pool = FakePool()
+    attempts = asyncio.run(
+        discover_fields.inspect_url_pooled(pool, URL, False, services, ["US", "CAN"])
+    )
+    assert list(attempts) == ["US"]  # nosec  (the page is gone, CAN is left to the scheduler)
+    assert attempts["US"].status == "error"  # nosec
+    assert discover_fields.watchdog_cancelled(attempts["US"])  # nosec
+    assert attempts["US"].duration_ms < 1000  # nosec
+    assert pool.contexts[0].page.closed and pool.released == [False]  # nosec
+    assert policy.watchdog_kills == 1 and policy.exhausted == 1  # nosec
+    assert "1 cancelled by the watchdog" in policy.summary()  # nosec
+    # The watchdog fires after the budget plus its grace, and reports that overrun
+    assert 20 <= policy.max_overrun_ms == policy.watchdog_overrun_ms < 1000  # nosec
+    assert "upper bound" in policy.summary()  # nosec
+
+
+# Matrix runs submit many times from one page, so they are not put under the region budget
+def test_matrix_runs_are_not_bounded() -> None:
+    policy = DeadlinePolicy(region_budget_ms=50, grace_ms=20)
+    services = RunServices(deadlines=policy, matrix_pay_types=["2"])
+    page = HungPage()
+
+    async def run() -> None:
+        await asyncio.wait_for(discover_fields.run_region(page, URL, "US", services), 0.3)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert policy.watchdog_kills == 0  # nosec
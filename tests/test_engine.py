@@ -0,0 +1,151 @@
+# Unit tests for the async discovery engine: ordering, bounded concurrency, failure isolation and
+# the parallel-regions merge (inspect_url_pooled / prescreen_unit / attempt_region are replaced
+# by fakes, so no browser is needed)
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+from data_models import AttemptRecord
+from prescreen import Prescreener
+from run_services import RunServices
+
+URLS = [f"http://gw.example/form/{n}" for n in range(8)]
+
+
+def succeeded(url: str, regions: List[str]) -> dict:
+    return {r: AttemptRecord(url=url, region=r, status="success") for r in regions}
+
+
+# Runs the engine over `urls`; fails the test instead of hanging if it never finishes
+def run_engine(pool, urls: List[str], concurrency: int, services: RunServices, finished: List[str]):
+    return asyncio.run(
+        asyncio.wait_for(
+            discover_fields.run_discovery_stream_async(
+                urls,
+                concurrency=concurrency,
+                pool=pool,
+                services=services,
+                on_result=lambda index, url, summary: finished.append(url),
+            ),
+            timeout=5,
+        )
+    )
+
+
+# URLs finish in any order, but the report keeps the input order
+def test_results_keep_input_order(monkeypatch, fake_pool) -> None:
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        await asyncio.sleep(0.005 * (len(URLS) - URLS.index(url)))  # Later URLs finish first
+        return succeeded(url, regions)
+
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    finished: List[str] = []
+    results = run_engine(fake_pool, URLS, 4, RunServices(), finished)
+
+    assert list(results) == URLS  # nosec
+    tested = {"US": "Tested", "CAN": "Tested", "INTL": "Tested"}
+    assert all(summary == tested for summary in results.values())  # nosec
+    assert sorted(finished) == sorted(URLS) and finished != URLS  # nosec  (really out of order)
+
+
+# No more URLs are in flight at once than there are workers
+def test_concurrency_is_bounded(monkeypatch, fake_pool) -> None:
+    active = [0]
+    peak = [0]
+
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return succeeded(url, regions)
+
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    urls = [f"http://gw.example/other/{n}" for n in range(12)]
+    results = run_engine(fake_pool, urls, 3, RunServices(), [])
+    assert list(results) == urls and peak[0] == 3  # nosec
+
+
+# A worker or pre-screen exception is logged and the URL reported as skipped; the run still ends
+def test_exceptions_do_not_hang_the_engine(monkeypatch, fake_pool) -> None:
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        if url == URLS[1]:
+            raise RuntimeError("browser crashed")
+        return succeeded(url, regions)
+
+    async def fake_prescreen(pool, unit, services, prescreener):
+        if unit.url == URLS[2]:
+            raise RuntimeError("prescreen fetch failed")
+        return unit, None
+
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    monkeypatch.setattr(discover_fields, "prescreen_unit", fake_prescreen)
+    finished: List[str] = []
+    services = RunServices(prescreener=Prescreener(concurrency=2))
+    results = run_engine(fake_pool, URLS[:4], 2, services, finished)
+
+    assert list(results) == URLS[:4] and sorted(finished) == sorted(URLS[:4])  # nosec
+    assert results[URLS[1]] == {"US": "Skipped", "CAN": "Skipped", "INTL": "Skipped"}  # nosec
+    # A failed pre-screen just leaves every region to the browser
+    assert results[URLS[2]] == {"US": "Tested", "CAN": "Tested", "INTL": "Tested"}  # nosec
+
+
+# Context whose tab records the region it served (or cannot even be opened)
+class FakeContext:
+    def __init__(self, broken: bool = False) -> None:
+        self.broken = broken
+        self.regions: List[str] = []
+
+    async def new_page(self) -> SimpleNamespace:
+        if self.broken:
+            raise RuntimeError("Target closed")
+
+        async def close() -> None:
+            pass
+
+        return SimpleNamespace(context=self, close=close, is_closed=lambda: False)
+
+
+# Parallel regions: every record lands under its own region, and one failing region does not
+# drop the others
+def test_parallel_regions_merge(monkeypatch) -> None:
+    delays = {"US": 0.02, "CAN": 0.0, "INTL": 0.01}  # Finish out of order
+
+    async def fake_attempt(page, url, region, services, attempt, term_index, deadline):
+        page.context.regions.append(region)
+        await asyncio.sleep(delays[region])
+        if region == "CAN":
+            raise RuntimeError("CAN form blew up")
+        attempt.status = "success"
+        attempt.term = f"term {term_index}"
+
+    monkeypatch.setattr(discover_fields, "attempt_region", fake_attempt)
+    contexts = [FakeContext(), FakeContext(), FakeContext()]
+    attempts = asyncio.run(
+        discover_fields.inspect_url_parallel(
+            contexts, URLS[0], RunServices(), ["US", "CAN", "INTL"], {"INTL": 2}
+        )
+    )
+    assert [c.regions for c in contexts] == [["US"], ["CAN"], ["INTL"]]  # nosec
+    assert {r: (a.region, a.status) for r, a in attempts.items()} == {  # nosec
+        "US": ("US", "success"),
+        "CAN": ("CAN", "error"),
+        "INTL": ("INTL", "success"),
+    }
+    assert attempts["INTL"].term == "term 2" and "blew up" in attempts["CAN"].error  # nosec
+
+    # A region whose tab cannot be opened is left out for the scheduler; the others still run
+    contexts = [FakeContext(), FakeContext(broken=True), FakeContext()]
+    attempts = asyncio.run(
+        discover_fields.inspect_url_parallel(
+            contexts, URLS[0], RunServices(), ["US", "INTL", "CAN"]
+        )
+    )
+    assert sorted(attempts) == ["CAN", "US"]  # nosec
+    assert attempts["US"].status == "success" and attempts["CAN"].status == "error"  # nosec
@@ -0,0 +1,151 @@
+# Unit tests for the term x payment-type matrix choices (hand-built snapshots) and submit paths
+# (fake page, so no browser is needed)
+import sys
+import os
+import asyncio
+from typing import Any, List
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import AttemptRecord, FieldInfo, FormSchema, OptionInfo
+from form_matrix import (
+    SELECT_CHOICE_JS,
+    SUBMIT_IN_PAGE_JS,
+    pay_type_choices,
+    run_matrix,
+    summarize_matrix,
+    term_choices,
+)
+from gateway_stub import StubPage, render_form
+
+
+def matrix_schema() -> FormSchema:
+    return FormSchema(
+        url="http://localhost/form",
+        fields=[
+            FieldInfo(
+                name="cds_term_value", tag="input", type="radio", value="12", label="12 issues"
+            ),
+            FieldInfo(
+                name="cds_term_value", tag="input", type="radio", value="24", label="24 issues"
+            ),
+            FieldInfo(name="cds_term_value", tag="input", type="radio", value="6", disabled=True),
+            FieldInfo(
+                name="cds_pay_type",
+                tag="select",
+                options=[
+                    OptionInfo(value="", text="Choose one"),
+                    OptionInfo(value="1", text="Bill me"),
+                    OptionInfo(value="2", text="Visa"),
+                    OptionInfo(value="3", text="MasterCard"),
+                    OptionInfo(value="5", text="PayPal"),
+                ],
+            ),
+        ],
+    )
+
+
+# Enabled term radios only, in page order
+def test_term_choices() -> None:
+    values = [value for _, value, _ in term_choices(matrix_schema())]
+    assert values == ["12", "24"]  # nosec
+
+
+# Payment options are matched to the GUI's payment type names by their text
+def test_pay_type_choices_follow_wanted_types() -> None:
+    schema = matrix_schema()
+    cards = [text for _, _, text in pay_type_choices(schema, ["Credit Card"])]
+    assert cards == ["Visa", "MasterCard"]  # nosec
+    everything = [value for _, value, _ in pay_type_choices(schema, [])]
+    assert everything == ["1", "2", "3", "5"]  # nosec
+
+
+# The region record only succeeds when every combination did
+def test_summarize_matrix() -> None:
+    attempt = AttemptRecord(url="http://localhost/form", region="US", status="filled")
+    combinations = [
+        AttemptRecord(url=attempt.url, region="US", kind="combination", status="success"),
+        AttemptRecord(url=attempt.url, region="US", kind="combination", status="submission_error"),
+    ]
+    summarize_matrix(attempt, combinations)
+    assert attempt.status == "submission_error"  # nosec
+    assert attempt.error == "1 of 2 combinations failed"  # nosec
+
+
+# Filled page: logs every selection, fetch() post, click on send and donee wait
+class FakePage:
+    url = "http://localhost/form"
+
+    def __init__(self, html: str) -> None:
+        self.html = html
+        self.log: List[Any] = []
+
+    async def content(self) -> str:
+        return self.html
+
+    async def evaluate(self, script: str, arg: Any = None) -> Any:
+        if script == SELECT_CHOICE_JS:
+            self.log.append(tuple(arg))
+            return True
+        assert script == SUBMIT_IN_PAGE_JS  # nosec
+        self.log.append("fetch")
+        return {"status": 200, "error": None}
+
+    def locator(self, selector: str) -> "FakePage":
+        assert selector == '[name="send"]'  # nosec
+        return self
+
+    async def click(self) -> None:
+        self.log.append("click")
+
+    async def wait_for_timeout(self, timeout: float) -> None:
+        pass
+
+    async def query_selector(self, selector: str) -> None:
+        return None
+
+    async def wait_for_function(self, script: str, arg: Any, timeout: float) -> None:
+        self.log.append(f"wait {arg}")
+
+
+def run(page: FakePage, schema: FormSchema, refills: List[str]) -> List[AttemptRecord]:
+    async def refill(combination: AttemptRecord) -> None:
+        refills.append(combination.term)
+        page.log.append("refill")
+
+    base = AttemptRecord(url=page.url, region="US", status="filled")
+    return asyncio.run(run_matrix(page, schema, ["PayPal"], base, refill=refill))
+
+
+# A page with scripts is submitted by clicking send, and reloaded and refilled before every
+# further combination; with a donee block each term change waits for it again
+def test_scripted_page_is_submitted_by_click() -> None:
+    schema = matrix_schema()
+    schema.fields.append(FieldInfo(name="cds_donee1_name", tag="input", type="text"))
+    page = FakePage(render_form(StubPage(countries="us")))
+    refills: List[str] = []
+
+    combinations = run(page, schema, refills)
+
+    assert [c.status for c in combinations] == ["success", "success"]  # nosec
+    assert refills == ["cds_term_value=24"]  # nosec
+    term, pay, wait = (
+        ("cds_term_value", "12"),
+        ("cds_pay_type", "5"),
+        'wait [name="cds_donee1_name"]',
+    )
+    assert page.log[:4] == [term, pay, wait, "click"]  # nosec
+    assert page.log[4:] == ["refill", ("cds_term_value", "24"), pay, wait, "click"]  # nosec
+
+
+# A script-free page keeps the fetch() shortcut: one fill, no clicks, no donee waits
+def test_script_free_page_is_posted_in_page() -> None:
+    page = FakePage(render_form(StubPage(countries="us", script=False)))
+    refills: List[str] = []
+
+    combinations = run(page, matrix_schema(), refills)
+
+    assert [c.status for c in combinations] == ["success", "success"]  # nosec
+    assert refills == [] and page.log.count("fetch") == 2  # nosec
+    assert "click" not in page.log  # nosec
@@ -0,0 +1,69 @@
+# Unit tests for the region checks computed from a form snapshot.
+# These build FormSchema objects by hand, so no browser or network is needed.
+import sys
+import os
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import FieldInfo, FormSchema, OptionInfo
+from form_schema import region_skip_reason
+
+
+# Helper: a schema with a cds_country dropdown holding the given option values
+def dropdown_schema(*values: str) -> FormSchema:
+    return FormSchema(
+        url="http://localhost/form",
+        fields=[
+            FieldInfo(
+                name="cds_country",
+                tag="select",
+                options=[OptionInfo(value=v, text=v) for v in values],
+            )
+        ],
+    )
+
+
+# Helper: a schema with a hidden cds_country input
+def hidden_input_schema(value: str) -> FormSchema:
+    return FormSchema(
+        url="http://localhost/form",
+        fields=[FieldInfo(name="cds_country", tag="input", type="hidden", value=value)],
+    )
+
+
+# A dropdown with US, Canada and others supports all three regions
+def test_dropdown_with_all_countries_supports_every_region() -> None:
+    schema = dropdown_schema("United States", "Canada", "France")
+    for region in ["US", "CAN", "INTL"]:
+        assert region_skip_reason(schema, region) is None  # nosec
+
+
+# A US/CAN-only dropdown must skip INTL
+def test_dropdown_without_other_countries_skips_intl() -> None:
+    schema = dropdown_schema("United States", "Canada")
+    assert region_skip_reason(schema, "US") is None  # nosec
+    assert "INTL" in region_skip_reason(schema, "INTL")  # nosec
+
+
+# Options without a value attribute are ignored (they don't make INTL supported)
+def test_dropdown_placeholder_option_is_ignored() -> None:
+    schema = dropdown_schema("United States")
+    schema.fields[0].options.append(OptionInfo(value=None, text="Choose a country"))
+    assert region_skip_reason(schema, "INTL") is not None  # nosec
+    assert region_skip_reason(schema, "CAN") is not None  # nosec
+
+
+# A hidden input only supports the region it names
+def test_hidden_input_supports_only_its_region() -> None:
+    schema = hidden_input_schema("Canada")
+    assert region_skip_reason(schema, "CAN") is None  # nosec
+    assert region_skip_reason(schema, "US") is not None  # nosec
+    assert region_skip_reason(schema, "INTL") is not None  # nosec
+
+
+# Pages without any cds_country field are tested for every region
+def test_no_country_field_supports_every_region() -> None:
+    schema = FormSchema(url="http://localhost/form")
+    for region in ["US", "CAN", "INTL"]:
+        assert region_skip_reason(schema, region) is None  # nosec
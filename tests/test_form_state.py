@@ -0,0 +1,140 @@
+# Unit tests for form fingerprints, the page state store and incremental runs (fake pool, fake
+# order POST and fake page, so no browser is needed)
+import sys
+import os
+import asyncio
+from typing import List
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+from data_models import AttemptRecord
+from form_state import FormStateStore, form_fingerprint
+from gateway_stub import StubPage, render_form
+from prescreen import parse_static_form
+from run_services import RunServices
+
+URL = "http://127.0.0.1/servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=1"
+
+
+# Values (e.g. session tokens) do not change the fingerprint; fields and options do
+def test_form_fingerprint() -> None:
+    html = render_form(StubPage(countries="all"))
+    base = form_fingerprint(parse_static_form(html, URL))
+    token = html.replace("<label>", '<input type="hidden" name="cds_token" value="a"><label>', 1)
+    other_token = token.replace('name="cds_token" value="a"', 'name="cds_token" value="b"')
+    with_token = form_fingerprint(parse_static_form(token, URL))
+    assert with_token == form_fingerprint(parse_static_form(other_token, URL))  # nosec
+    assert with_token != base  # nosec  (a new field is a change)
+    us_only = form_fingerprint(parse_static_form(render_form(StubPage(countries="us")), URL))
+    assert us_only != base  # nosec
+
+
+# Only an unchanged, passing, fresh result covering every region is carried forward
+def test_state_store_unchanged(tmp_path) -> None:
+    now = [1000.0]
+    store = FormStateStore(str(tmp_path / "state.sqlite"), max_age_seconds=60, clock=lambda: now[0])
+    store.put(URL, "fp", {"US": "success", "CAN": "skipped"}, "run-1")
+    assert store.unchanged(URL, "fp", ["US", "CAN"]).run_id == "run-1"  # nosec
+    assert store.unchanged(URL, "changed", ["US", "CAN"]) is None  # nosec
+    assert store.unchanged(URL, "fp", ["US", "CAN", "INTL"]) is None  # nosec
+    now[0] = 1061.0
+    assert store.unchanged(URL, "fp", ["US"]) is None  # nosec  (stale)
+    store.put(URL, "fp", {"US": "submission_error"}, "run-2")
+    assert store.unchanged(URL, "fp", ["US"]) is None  # nosec  (failed last time)
+    store.close()
+
+
+# Fake order POST (protocol path): records the region and succeeds
+def fake_submit(submitted: List[str]):
+    async def submit(request, page, test_data, attempt, timeout_ms) -> None:
+        submitted.append(attempt.region)
+        attempt.status = "success"
+
+    return submit
+
+
+# The second incremental run re-submits nothing for a page that did not change, and needs no
+# pre-screen: the fingerprint is taken from the form the protocol pass loaded
+def test_incremental_run_carries_forward(tmp_path, monkeypatch, fake_pool, fake_request) -> None:
+    submitted: List[str] = []
+    fake_request.html = render_form(StubPage(countries="all", script=False))
+    monkeypatch.setattr(discover_fields, "submit_static_form", fake_submit(submitted))
+
+    def run() -> tuple:
+        services = RunServices(
+            protocol_submit=True,
+            form_state=FormStateStore(str(tmp_path / "state.sqlite")),
+            incremental=True,
+        )
+        try:
+            results = asyncio.run(
+                discover_fields.run_discovery_stream_async([URL], pool=fake_pool, services=services)
+            )
+        finally:
+            services.close()
+        return results, services.status_counts
+
+    first, _ = run()
+    second, counts = run()
+    assert submitted == ["US", "CAN", "INTL"]  # nosec  (first run only)
+    assert first[URL] == {"US": "Tested", "CAN": "Tested", "INTL": "Tested"}  # nosec
+    assert set(second[URL].values()) == {"Carried forward"}  # nosec
+    assert counts == {"carried_forward": 3}  # nosec
+
+    # Carrying forward keeps the statuses the page was actually tested with
+    store = FormStateStore(str(tmp_path / "state.sqlite"))
+    assert set(store.get(URL).statuses.values()) == {"success"}  # nosec
+    store.close()
+
+
+# Page stand-in for run_region: loading always works, nothing is ever closed
+class FakePage:
+    url = URL
+
+    async def goto(self, url: str, timeout: float) -> None:
+        pass
+
+    async def wait_for_selector(self, selector: str, timeout: float) -> None:
+        pass
+
+    def is_closed(self) -> bool:
+        return False
+
+
+# The fingerprint comes from the rendered form: a field a script adds after load is a change
+# even though the served HTML is the same, so the region is filled and submitted again
+def test_rendered_change_defeats_carry_forward(tmp_path, monkeypatch) -> None:
+    served = parse_static_form(render_form(StubPage(countries="all")), URL)
+    rendered = parse_static_form(
+        render_form(StubPage(countries="all")).replace(
+            "<label>", '<input type="text" name="cds_js_field"><label>', 1
+        ),
+        URL,
+    )
+    schemas = [served]
+    filled: List[str] = []
+
+    async def fake_extract(page):
+        return schemas[0]
+
+    async def fake_fill(page, test_data, schema, attempt, **kwargs) -> None:
+        filled.append(attempt.region)
+        attempt.status = "success"
+
+    monkeypatch.setattr(discover_fields, "extract_schema", fake_extract)
+    monkeypatch.setattr(discover_fields, "fill_form", fake_fill)
+    store = FormStateStore(str(tmp_path / "state.sqlite"))
+    store.put(URL, form_fingerprint(served), {"US": "success"}, "run-1")
+    services = RunServices(form_state=store, incremental=True)
+
+    def run_us() -> AttemptRecord:
+        return asyncio.run(discover_fields.run_region(FakePage(), URL, "US", services))
+
+    assert run_us().status == "carried_forward" and filled == []  # nosec
+    schemas[0] = rendered
+    attempt = run_us()
+    assert attempt.status == "success" and filled == ["US"]  # nosec
+    assert attempt.form_fingerprint == form_fingerprint(rendered)  # nosec
+    store.close()
@@ -3,16 +3,19 @@
 import sys
 import os
 
+import pytest
+
 # Add the parent directory to sys.path so imports work when running pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 # Import your existing helpers
 from discover_fields import make_test_data  # Generate a test data object
 from discover_fields import run_test  # Handles field detection and form submission
+from gateway_stub import StubPage  # Local stand-in pages (tests/gateway_stub.py)
 
 
 # Basic smoke test for a working US form submission
-def test_us_form_submission() -> None:
+def test_us_form_submission(browser_pool) -> None:
     # Examples test URL - working US test page.
     test_url = "https://admin.buysub.com/servlet/OrdersGateway?cds_mag_code=CSI&cds_page_id=283316"
 
@@ -20,7 +23,41 @@ def test_us_form_submission() -> None:
     test_data = make_test_data(region="US", is_gift_page=False)
 
     # Run your existing form logic — right now this function doesn't return anything meaningful
-    result = run_test(test_url, test_data)
+    # browser_pool (tests/conftest.py) shares one browser across the whole test session
+    result = run_test(test_url, test_data, pool=browser_pool)
 
     # Assert that the test succeeded
     assert result is True, "Form submission failed - expected success"  # nosec
+
+
+# Same smoke test against the local stand-in server, so it also runs offline
+def test_us_form_submission_offline(browser_pool, gateway) -> None:
+    test_url = gateway.url(StubPage(countries="us"))
+
+    test_data = make_test_data(region="US", is_gift_page=False)
+
+    result = run_test(test_url, test_data, pool=browser_pool)
+
+    assert result is True, "Form submission failed - expected success"  # nosec
+    assert gateway.submissions[-1]["cds_zip"] == "50010"  # nosec
+
+
+# Matrix mode on the stand-in: 2 terms x 3 card/PayPal options. The scripted page is submitted
+# by clicking send (and refilled), the script-free one from one filled form with fetch()
+@pytest.mark.parametrize("script", [True, False])
+def test_matrix_run_offline(browser_pool, gateway, script: bool) -> None:
+    from discover_fields import run_discovery_async
+    from run_services import RunServices
+
+    test_url = gateway.url(StubPage(countries="us", page_id="matrix", script=script))
+    services = RunServices(matrix_pay_types=["Credit Card", "PayPal"])
+    before = len(gateway.submissions)
+
+    browser_pool.run(run_discovery_async([test_url], pool=browser_pool, services=services))
+
+    orders = gateway.submissions[before:]
+    assert len(orders) == 6  # nosec
+    assert {(o["cds_term_value"], o["cds_pay_type"]) for o in orders} == {  # nosec
+        (term, pay) for term in ("12", "24") for pay in ("2", "3", "5")
+    }
+    assert services.status_counts == {"success": 7, "skipped": 2}  # nosec
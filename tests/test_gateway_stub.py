@@ -0,0 +1,48 @@
+# Checks the local OrdersGateway stand-in itself over plain HTTP (no browser needed)
+import sys
+import os
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from gateway_stub import ORDER_PATH, StubPage, page_mix
+
+
+# Variants are generated from the query string
+def test_form_variants(gateway) -> None:
+    dropdown = urlopen(gateway.url(StubPage(countries="intl"))).read().decode()  # nosec
+    assert '<select name="cds_country">' in dropdown  # nosec
+    assert 'value="United States"' not in dropdown  # nosec
+
+    hidden = urlopen(gateway.url(StubPage(countries="hidden_can", gift=True))).read().decode()  # nosec
+    assert '<input type="hidden" name="cds_country" value="Canada">' in hidden  # nosec
+    assert 'name="cds_donee1_name"' in hidden  # nosec
+
+
+# Orders succeed only with the required fields, and "error" pages always show a .error message
+def test_order_responses(gateway) -> None:
+    order = {
+        "cds_name": "Dan Ross",
+        "cds_address_1": "1234 Street",
+        "cds_city": "Ames",
+        "cds_email": "me@home.com",
+        "cds_cc_number": "4111111111111111",
+    }
+
+    def post(page: StubPage, form: dict) -> str:
+        url = f"{gateway.base_url}{ORDER_PATH}?{page.query()}"
+        return urlopen(url, data=urlencode(form).encode()).read().decode()  # nosec
+
+    assert "Thank you" in post(StubPage(), order)  # nosec
+    assert 'class="error"' in post(StubPage(result="error"), order)  # nosec
+    assert "cds_cc_number" in post(StubPage(), {**order, "cds_cc_number": ""})  # nosec
+    assert gateway.submissions[-1]["cds_name"] == "Dan Ross"  # nosec
+
+
+# Benchmark pages cycle through every variant with distinct page ids
+def test_page_mix() -> None:
+    pages = page_mix(14)
+    assert len({p.page_id for p in pages}) == 14  # nosec
+    assert {p.countries for p in pages} == {"all", "us", "can", "intl", "hidden_us", "hidden_can"}  # nosec
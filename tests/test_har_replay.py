@@ -0,0 +1,52 @@
+# Unit tests for the HAR record/replay helpers (no browser needed)
+import sys
+import os
+import asyncio
+
+import pytest
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from browser_pool import BrowserPool
+from har_replay import attach_har, har_path
+
+
+# One file per gateway page, whatever the other query parameters; other URLs get a hash
+def test_har_path() -> None:
+    url = "https://admin.buysub.com/servlet/OrdersGateway?cds_mag_code=csi&cds_page_id=283316&x=1"
+    assert har_path("har", url) == os.path.join("har", "CSI-283316.har")  # nosec
+    other = har_path("har", "https://example.com/form")
+    assert other.startswith(os.path.join("har", "")) and other.endswith(".har")  # nosec
+
+
+# Replaying a page that was never recorded fails before any request is made
+def test_replay_without_recording(tmp_path) -> None:
+    url = "https://admin.buysub.com/servlet/OrdersGateway?cds_mag_code=CSI&cds_page_id=1"
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(attach_har(None, url, "replay", str(tmp_path)))
+
+
+def test_unknown_har_mode() -> None:
+    with pytest.raises(ValueError):
+        BrowserPool(har_mode="rewind")
+
+
+# Record a stand-in page once, then replay it: the submission never reaches the server
+def test_record_then_replay(gateway, tmp_path) -> None:
+    from discover_fields import make_test_data, run_test
+    from gateway_stub import StubPage
+
+    url = gateway.url(StubPage(countries="us", page_id="har"))
+    test_data = make_test_data(region="US", is_gift_page=False)
+
+    for mode in ("record", "replay"):
+        pool = BrowserPool.start_sync(har_mode=mode, har_dir=str(tmp_path))
+        try:
+            submissions = len(gateway.submissions)
+            assert run_test(url, test_data, pool=pool) is True  # nosec
+        finally:
+            pool.close_sync()
+
+    assert os.path.exists(har_path(str(tmp_path), url))  # nosec
+    assert len(gateway.submissions) == submissions  # nosec
@@ -0,0 +1,108 @@
+# Unit tests for the queue-based logging pipeline (no browser needed)
+import sys
+import os
+import asyncio
+import logging
+import logging.handlers
+import queue
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from log_pipeline import (
+    LogWriter,
+    forwarding_handlers,
+    log_context,
+    queue_handler,
+    set_log_context,
+)
+
+
+# A logger that only feeds the given writer (the root logger is left alone)
+def pipeline_logger(writer: LogWriter, name: str) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.handlers = [queue_handler(writer.queue)]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    return logger
+
+
+# Lines carry the worker, URL and region of the asyncio task that logged them
+def test_lines_are_tagged_per_task(tmp_path) -> None:
+    path = str(tmp_path / "field_log.txt")
+    writer = LogWriter(path, max_bytes=0, merge_window_ms=0).start()
+    logger = pipeline_logger(writer, "test_tagged")
+
+    async def work(number: int, url: str) -> None:
+        set_log_context(worker=f"w{number}")
+        with log_context(url=url):
+            with log_context(region="US"):
+                await asyncio.sleep(0)
+                logger.info(f"filling {number}")
+            logger.info(f"done {number}")
+
+    async def run() -> None:
+        await asyncio.gather(work(0, "http://a/1"), work(1, "http://b/2"))
+
+    logger.info("outside")
+    asyncio.run(run())
+    writer.stop()
+    lines = open(path, encoding="utf-8").read().splitlines()
+    assert len(lines) == 5 and writer.written == 5  # nosec
+    assert lines[0].endswith("[main|-|-] outside")  # nosec
+    assert any(line.endswith("[main/w0|US|http://a/1] filling 0") for line in lines)  # nosec
+    assert any(line.endswith("[main/w1|US|http://b/2] filling 1") for line in lines)  # nosec
+    assert any(line.endswith("[main/w1|-|http://b/2] done 1") for line in lines)  # nosec
+
+
+# Records from several processes arrive out of order and are written in timestamp order
+def test_records_are_merged_in_time_order(tmp_path) -> None:
+    path = str(tmp_path / "field_log.txt")
+    writer = LogWriter(path, max_bytes=0, merge_window_ms=10_000).start()
+    for created, process in ((3.0, "shard-1"), (1.0, "shard-0"), (2.0, "shard-1")):
+        record = logging.makeLogRecord({"msg": f"at {created}", "levelname": "INFO"})
+        record.created = created
+        record.processName = process
+        writer.queue.put(record)
+    writer.stop()  # Flushes everything still held in the merge window
+    lines = open(path, encoding="utf-8").read().splitlines()
+    assert [line.split("] ")[1] for line in lines] == ["at 1.0", "at 2.0", "at 3.0"]  # nosec
+    assert "[shard-0|-|-]" in lines[0]  # nosec
+
+
+# The file rotates by size and keeps `backups` old files
+def test_rotation(tmp_path) -> None:
+    path = str(tmp_path / "field_log.txt")
+    writer = LogWriter(path, max_bytes=300, backups=2, batch_size=1, merge_window_ms=0).start()
+    logger = pipeline_logger(writer, "test_rotation")
+    for n in range(40):
+        logger.info(f"line {n:02d} " + "x" * 40)
+    writer.stop()
+    assert writer.rotations > 2  # nosec
+    assert os.path.exists(path + ".1") and os.path.exists(path + ".2")  # nosec
+    assert not os.path.exists(path + ".3")  # nosec
+    for name in (path, path + ".1", path + ".2"):
+        assert os.path.getsize(name) <= 300  # nosec
+    assert open(path, encoding="utf-8").read().splitlines()[-1].endswith("x" * 40)  # nosec
+
+
+# Without any logging set up, records forwarded from worker processes go to stderr, not nowhere
+def test_forwarded_records_have_a_fallback(monkeypatch, capsys) -> None:
+    monkeypatch.setattr(logging.getLogger(), "handlers", [])
+    log_queue: queue.Queue = queue.Queue()
+    listener = logging.handlers.QueueListener(
+        log_queue, *forwarding_handlers(), respect_handler_level=True
+    )
+    listener.start()
+    worker = logging.getLogger("test_forwarded")
+    worker.handlers = [queue_handler(log_queue)]
+    worker.propagate = False
+    worker.setLevel(logging.INFO)
+    with log_context(worker="w0", url="http://a/1", region="CAN"):
+        worker.info("filled the form")
+    listener.stop()
+    assert "[main/w0|CAN|http://a/1] filled the form" in capsys.readouterr().err  # nosec
+
+    configured = logging.NullHandler()
+    monkeypatch.setattr(logging.getLogger(), "handlers", [configured])
+    assert forwarding_handlers() == [configured]  # nosec
@@ -0,0 +1,85 @@
+# Unit tests for memory telemetry and memory-triggered recycling (no browser needed)
+import sys
+import os
+import asyncio
+import json
+import subprocess
+from typing import List
+
+import pytest
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+import memory
+from memory import MemoryMonitor, browser_pss_mb, descendants, pss_mb, rss_mb
+
+needs_proc = pytest.mark.skipif(not os.path.isdir("/proc"), reason="RSS is read from /proc")
+
+
+# Child processes (like the Playwright driver and Chromium) count towards the browser PSS
+@needs_proc
+def test_rss_of_process_tree() -> None:
+    assert rss_mb(os.getpid()) > 0  # nosec
+    child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])  # nosec
+    try:
+        assert child.pid in descendants(os.getpid())  # nosec
+        assert browser_pss_mb() > 0  # nosec
+        assert pss_mb(child.pid) <= rss_mb(child.pid)  # nosec  (shared pages are split)
+    finally:
+        child.kill()
+        child.wait()
+
+
+# PSS comes from smaps_rollup; without it (old kernels), resident minus shared pages from statm
+def test_pss_from_rollup_or_statm(tmp_path, monkeypatch) -> None:
+    (tmp_path / "100").mkdir()
+    (tmp_path / "100" / "smaps_rollup").write_text("Rss:  8192 kB\nPss:  2048 kB\n")
+    (tmp_path / "101").mkdir()
+    (tmp_path / "101" / "statm").write_text("5000 3000 1000 10 0 900 0\n")
+    monkeypatch.setattr(memory, "PROC", str(tmp_path))
+    page_mb = os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    assert pss_mb(100) == 2.0 and pss_mb(101) == 2000 * page_mb  # nosec
+    assert pss_mb(102) is None  # nosec  (process gone)
+
+
+# Samples are taken every `every` URLs and appended as JSON lines
+def test_samples_are_written(tmp_path) -> None:
+    path = str(tmp_path / "memory.jsonl")
+    monitor = MemoryMonitor("run-1", path, every=2, python_limit_mb=0, browser_limit_mb=0)
+
+    async def run() -> List:
+        return [await monitor.url_done(f"http://x/{n}") for n in range(5)]
+
+    samples = asyncio.run(run())
+    monitor.close()
+    assert [s is not None for s in samples] == [False, True, False, True, False]  # nosec
+    lines = [json.loads(line) for line in open(path, encoding="utf-8")]
+    assert [line["urls_done"] for line in lines] == [2, 4]  # nosec
+    assert lines[0]["run_id"] == "run-1" and lines[0]["url"] == "http://x/1"  # nosec
+    assert monitor.recycle_reason(samples[1]) is None  # nosec  (no limits)
+
+
+class FakePool:
+    def __init__(self) -> None:
+        self.reasons: List[str] = []
+
+    def request_recycle(self, reason: str) -> None:
+        self.reasons.append(reason)
+
+
+# Over the limit the browser is recycled, then not again until the cooldown has passed
+@needs_proc
+def test_limits_recycle_with_cooldown() -> None:
+    monitor = MemoryMonitor("run-1", "", every=1, python_limit_mb=1, browser_limit_mb=0, cooldown=3)
+    pool = FakePool()
+
+    async def run() -> None:
+        for n in range(7):
+            await discover_fields.sample_memory(pool, monitor, f"http://x/{n}")
+
+    asyncio.run(run())
+    assert len(pool.reasons) == 3 and pool.reasons[0].startswith("Python RSS")  # nosec
+    assert monitor.recycles == 3 and monitor.samples == 7  # nosec
+    assert "3 memory-triggered browser recycles" in monitor.summary()  # nosec
@@ -0,0 +1,33 @@
+# Unit tests for the request-blocking decisions of the network profile (no browser needed)
+import sys
+import os
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from network_profile import NetworkProfile, block_reason
+
+GATEWAY = "https://admin.buysub.com/servlet/OrdersGateway?cds_mag_code=CSI"
+
+
+# Images are blocked; the form page and first-party scripts are not
+def test_blocks_resource_types_but_never_the_document() -> None:
+    profile = NetworkProfile(blocked_resource_types=["image", "font"])
+    assert block_reason(profile, "image", "https://admin.buysub.com/logo.png") == "image"  # nosec
+    assert block_reason(profile, "document", GATEWAY) == ""  # nosec
+    assert block_reason(profile, "script", "https://admin.buysub.com/app.js") == ""  # nosec
+
+
+# Third-party blocking keeps allowlisted hosts (and their subdomains) loading
+def test_third_party_blocking_respects_allowlist() -> None:
+    profile = NetworkProfile(allowed_hosts=["buysub.com"], block_third_party=True)
+    assert block_reason(profile, "script", "https://cdn.buysub.com/app.js") == ""  # nosec
+    assert block_reason(profile, "script", "https://tracker.example/t.js") == "third-party"  # nosec
+
+
+# Denylisted hosts are blocked even for documents; a disabled profile blocks nothing
+def test_denylist_and_disabled_profile() -> None:
+    profile = NetworkProfile(blocked_hosts=["ads.example"])
+    assert block_reason(profile, "document", "https://ads.example/frame") == "denylist"  # nosec
+    disabled = NetworkProfile(enabled=False, blocked_hosts=["ads.example"])
+    assert block_reason(disabled, "document", "https://ads.example/frame") == ""  # nosec
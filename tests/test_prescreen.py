@@ -0,0 +1,92 @@
+# Unit tests for the HTTP-only pre-screen stage: static form parsing and region decisions on
+# stand-in pages, a real fetch from the local stand-in server (Playwright's HTTP client, no
+# browser) and the engine forwarding only testable regions (fake pool, no browser)
+import sys
+import os
+import asyncio
+from typing import List
+
+from playwright.async_api import async_playwright
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+from data_models import AttemptRecord
+from gateway_stub import StubPage, render_form
+from prescreen import Prescreener, parse_static_form, screen_schema
+from run_services import RunServices
+
+URL = "http://127.0.0.1/servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=1"
+
+
+# The static parser sees the same cds_* fields and options the browser snapshot would
+def test_parse_static_form() -> None:
+    schema = parse_static_form(render_form(StubPage(countries="all", gift=True)), URL)
+    assert schema.option_values("cds_country")[:2] == ["United States", "Canada"]  # nosec
+    assert len(schema.find("cds_term_value")) == 2 and schema.has("cds_donee1_name")  # nosec
+    assert schema.method == "post" and schema.action.startswith("http://127.0.0.1/")  # nosec
+
+
+def screen_stub(countries: str):
+    return screen_schema(
+        parse_static_form(render_form(StubPage(countries=countries)), URL), ["US", "CAN", "INTL"]
+    )
+
+
+def test_screen_dropdown_and_hidden_input() -> None:
+    us_only = screen_stub("us")
+    assert us_only.testable == ["US"] and set(us_only.skipped) == {"CAN", "INTL"}  # nosec
+    assert us_only.term_count == 2 and not us_only.has_gift_fields  # nosec
+
+    assert screen_stub("hidden_can").testable == ["CAN"]  # nosec
+
+
+# Without a cds_country field in the served HTML nothing is decided: every region goes on
+def test_screen_without_country_field_forwards_everything() -> None:
+    schema = parse_static_form("<form><input name='cds_name'></form>", URL)
+    result = screen_schema(schema, ["US", "CAN"])
+    assert result.testable == ["US", "CAN"] and not result.decided and not result.skipped  # nosec
+
+
+# Fetches a stand-in page over HTTP with Playwright's request context (no browser needed)
+def test_prescreener_fetches_stub(gateway) -> None:
+    async def scenario():
+        async with async_playwright() as playwright:
+            request = await playwright.request.new_context()
+            try:
+                prescreener = Prescreener()
+                url = gateway.url(StubPage(countries="intl", page_id="pre"))
+                found = await prescreener.screen(request, url, ["US", "CAN", "INTL"])
+                missing = await prescreener.screen(request, gateway.base_url + "/nope", ["US"])
+                return found, missing, prescreener
+            finally:
+                await request.dispose()
+
+    found, missing, prescreener = asyncio.run(scenario())
+    assert found.testable == ["INTL"]  # nosec
+    assert missing is None and prescreener.undecided == 1  # nosec
+
+
+# Only the regions the static HTML allows reach the browser stage; the rest are recorded skipped
+def test_engine_forwards_only_testable_regions(monkeypatch, fake_pool, fake_request) -> None:
+    browser_regions: List[List[str]] = []
+
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        browser_regions.append(list(regions))
+        return {r: AttemptRecord(url=url, region=r, status="success") for r in regions}
+
+    fake_request.html = render_form(StubPage(countries="can"))
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    services = RunServices(prescreener=Prescreener(concurrency=2))
+
+    results = asyncio.run(
+        discover_fields.run_discovery_stream_async(
+            [URL], concurrency=2, pool=fake_pool, services=services
+        )
+    )
+
+    assert browser_regions == [["CAN"]]  # nosec
+    assert results == {URL: {"US": "Skipped", "CAN": "Tested", "INTL": "Skipped"}}  # nosec
+    # The fake browser stage records nothing, so only the pre-screen's records are counted
+    assert services.status_counts == {"skipped": 2}  # nosec
@@ -0,0 +1,191 @@
+# Unit tests for protocol-level submission: JavaScript detection, POST body building and response
+# classification on stand-in pages, real HTTP submissions to the local stand-in server
+# (Playwright's HTTP client only, no browser needed) and the engine's hand-over between the
+# protocol and browser paths (fake pool and browser stage)
+import sys
+import os
+import asyncio
+from types import SimpleNamespace
+from typing import List
+
+from playwright.async_api import async_playwright
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+from data_models import AttemptRecord
+from discover_fields import inspect_url_protocol, make_test_data
+from gateway_stub import StubPage, render_form
+from prescreen import Prescreener, parse_static_form, parse_static_page
+from protocol_submit import browser_reason, build_post_body, response_error, submit_static_form
+from run_services import RunServices
+from scheduler import RetryPolicy, WorkUnit, classify_failure, plan_retries
+
+URL = "http://127.0.0.1/servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=1"
+
+
+# Any script on the page may intercept the submit, so only script-free forms are posted
+def test_browser_reason() -> None:
+    plain = render_form(StubPage(script=False))
+    assert browser_reason(parse_static_page(plain, URL)) is None  # nosec
+    scripted = browser_reason(parse_static_page(render_form(StubPage()), URL))
+    assert "<script>" in scripted and "inline" in scripted  # nosec
+    intercepted = plain.replace(
+        "</body>",
+        '<script src="/js/order.js"></script><script>document.forms[0].addEventListener('
+        '"submit", (e) => { e.preventDefault(); fetch("/api/order"); });</script></body>',
+    )
+    assert "src=/js/order.js, inline" in browser_reason(parse_static_page(intercepted, URL))  # nosec
+    data_block = plain.replace("</body>", '<script type="application/ld+json">{}</script></body>')
+    assert browser_reason(parse_static_page(data_block, URL)) is None  # nosec
+    hooked = parse_static_page(plain.replace("<form ", '<form onsubmit="return check()" '), URL)
+    assert "form onsubmit" in browser_reason(hooked)  # nosec
+    shell = parse_static_page("<form action='/order'><div id='app'></div></form>", URL)
+    assert "cds_name" in browser_reason(shell)  # nosec
+
+
+# The body carries the served defaults plus what fill_form would have filled in
+def test_build_post_body() -> None:
+    schema = parse_static_page(render_form(StubPage(countries="all", gift=True)), URL).form
+    attempt = AttemptRecord(url=URL, region="US")
+    test_data = make_test_data("US", is_gift_page=True)
+    test_data.term_index = 1
+    body, reason = build_post_body(schema, test_data, attempt)
+    assert reason is None  # nosec
+    assert body["cds_term_value"] == "24" and attempt.term == "cds_term_value=24"  # nosec
+    assert body["cds_country"] == "United States" and body["cds_state"] == "IA"  # nosec
+    assert body["cds_donee1_name"] == "Don Rush" and body["cds_pay_type"] == "2"  # nosec
+    assert body["cds_cc_number"] and body["send"] == "Order"  # nosec
+
+    test_data.term_index = 5
+    assert build_post_body(schema, test_data, attempt)[1].startswith("No term at index 5")  # nosec
+
+
+def test_response_error() -> None:
+    page = '<html><body><div class="msg error"> Country does <b>not</b> match </div></body></html>'
+    assert response_error(page) == "Country does not match"  # nosec
+    assert response_error("<html><body><h1>Thank you</h1></body></html>") is None  # nosec
+    # Void elements inside the .error element do not stretch it over the text after it
+    broken = '<div class="error">Card<br>declined<img src="x.png"></div><p>Call us on 555-0100</p>'
+    assert response_error(broken) == "Card declined"  # nosec
+    assert response_error('<p class="error">Card<br/>declined</p><p>Call us</p>') == "Card declined"  # nosec
+
+
+# A failed order POST (error status or no answer) is final: the gateway may have processed it
+def test_failed_post_is_not_retried() -> None:
+    page = parse_static_page(render_form(StubPage(countries="us")), URL)
+
+    async def unavailable(*args, **kwargs):
+        async def text():
+            return "<html><body>Service unavailable</body></html>"
+
+        return SimpleNamespace(status=503, text=text)
+
+    async def timed_out(*args, **kwargs):
+        raise TimeoutError("Request timed out after 10000ms")
+
+    async def scenario():
+        answered = AttemptRecord(url=URL, region="US")
+        request = SimpleNamespace(post=unavailable)
+        await submit_static_form(request, page, make_test_data("US", False), answered, 1000)
+        lost = AttemptRecord(url=URL, region="US")
+        try:
+            await submit_static_form(
+                SimpleNamespace(post=timed_out), page, make_test_data("US", False), lost, 1000
+            )
+        except TimeoutError as e:  # inspect_url_protocol records it as an error
+            lost.status, lost.error = "error", str(e)
+        return answered, lost
+
+    answered, lost = asyncio.run(scenario())
+    assert answered.status == "submission_error" and "HTTP 503" in answered.error  # nosec
+    assert "submit" in lost.timings_ms  # nosec
+    assert classify_failure(answered) == classify_failure(lost) == "hard"  # nosec
+    unit = WorkUnit(index=0, url=URL, regions=["US"])
+    assert plan_retries(unit, {"US": answered}, RetryPolicy(max_attempts=3)) == []  # nosec
+    assert plan_retries(unit, {"US": lost}, RetryPolicy(max_attempts=3)) == []  # nosec
+
+
+# Real submissions to the stand-in: success, a .error response and an unsupported region
+def test_inspect_url_protocol(gateway) -> None:
+    async def scenario():
+        async with async_playwright() as playwright:
+            request = await playwright.request.new_context()
+
+            async def api_request():
+                return request
+
+            pool = SimpleNamespace(api_request=api_request)
+            try:
+                ok_url = gateway.url(StubPage(countries="us", script=False))
+                error_url = gateway.url(StubPage(countries="us", result="error", script=False))
+                ok, ok_reason = await inspect_url_protocol(
+                    pool, ok_url, RunServices(), ["US", "CAN"]
+                )
+                failed, _ = await inspect_url_protocol(pool, error_url, RunServices(), ["US"])
+                assert ok_reason is None  # nosec
+                return ok, failed
+            finally:
+                await request.dispose()
+
+    submissions = len(gateway.submissions)
+    ok, failed = asyncio.run(scenario())
+    assert ok["US"].status == "success" and ok["CAN"].status == "skipped"  # nosec
+    assert failed["US"].status == "submission_error"  # nosec
+    assert "does not match" in failed["US"].error  # nosec
+    assert len(gateway.submissions) == submissions + 2  # nosec
+    assert gateway.submissions[-2]["cds_zip"] == "50010"  # nosec
+
+
+# Fake order POST: records the region and succeeds
+def fake_submit(submitted: List[str]):
+    async def submit(request, page, test_data, attempt, timeout_ms) -> None:
+        submitted.append(attempt.region)
+        attempt.timings_ms["submit"] = 1.0
+        attempt.status = "success"
+
+    return submit
+
+
+# The protocol pass posts every region from the page the pre-screen already fetched
+def test_protocol_pass_reuses_prescreen_page(monkeypatch, fake_pool, fake_request) -> None:
+    submitted: List[str] = []
+    monkeypatch.setattr(discover_fields, "submit_static_form", fake_submit(submitted))
+    fake_request.html = render_form(StubPage(countries="all", script=False))
+    services = RunServices(prescreener=Prescreener(), protocol_submit=True)
+
+    results = asyncio.run(
+        discover_fields.run_discovery_stream_async([URL], pool=fake_pool, services=services)
+    )
+
+    assert fake_request.fetched == [URL]  # nosec  (one GET, by the pre-screen)
+    assert submitted == ["US", "CAN", "INTL"]  # nosec
+    assert results[URL] == {"US": "Tested", "CAN": "Tested", "INTL": "Tested"}  # nosec
+    assert services.status_counts == {"success": 3}  # nosec
+
+
+# A page found to need JavaScript after a region was already recorded (here skipped by the schema
+# cache) only sends the other regions to the browser, so nothing is recorded twice
+def test_needs_browser_hands_over_unrecorded_regions(monkeypatch, fake_pool, fake_request) -> None:
+    browser_regions: List[List[str]] = []
+
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        browser_regions.append(list(regions))
+        return {r: AttemptRecord(url=url, region=r, status="success") for r in regions}
+
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    monkeypatch.setattr(discover_fields, "submit_static_form", fake_submit([]))
+    fake_request.html = render_form(StubPage(countries="can"))  # Has <script>: needs the browser
+    cached = parse_static_form(render_form(StubPage(countries="can", script=False)), URL)
+    cache = SimpleNamespace(get=lambda url: cached, put=lambda url, schema: None)
+    services = RunServices(schema_cache=cache, protocol_submit=True)
+
+    results = asyncio.run(
+        discover_fields.run_discovery_stream_async([URL], pool=fake_pool, services=services)
+    )
+
+    assert browser_regions == [["CAN", "INTL"]]  # nosec
+    assert results[URL] == {"US": "Skipped", "CAN": "Tested", "INTL": "Tested"}  # nosec
+    # Only the protocol pass recorded anything (the fake browser stage records nothing)
+    assert services.status_counts == {"skipped": 1}  # nosec
@@ -0,0 +1,65 @@
+# Unit tests for the per-host token buckets (fake clock, no browser needed) and for host
+# context reuse in the browser pool (needs Chromium)
+import sys
+import os
+import asyncio
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from browser_pool import BrowserPool
+from rate_limit import HostRateLimiter, TokenBucket
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# A full bucket lets `burst` requests through, then spaces the rest 1 / rate apart
+def test_token_bucket_burst_then_rate() -> None:
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock)
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 0.5, 1.0]  # nosec
+
+    # Refills while idle, never above the burst size
+    clock.now = 10.0
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 0.5]  # nosec
+
+
+# Each host has its own bucket, and delays are counted for the end-of-run summary
+def test_limiter_is_per_host() -> None:
+    limiter = HostRateLimiter(rate=1, burst=1, clock=FakeClock())
+    assert limiter.reserve("a.example") == 0.0  # nosec
+    assert limiter.reserve("b.example") == 0.0  # nosec
+    assert limiter.reserve("a.example") == 1.0  # nosec
+    assert limiter.delayed_requests == 1 and limiter.delayed_seconds == 1.0  # nosec
+    assert "delayed 1 requests" in limiter.summary()  # nosec
+
+
+# A released context is lent again for the same host, never for another host, never to two
+# URLs at once, and never to a caller asking for a fresh one (reuse=False, e.g. run_test)
+def test_pool_reuses_contexts_per_host() -> None:
+    async def scenario() -> None:
+        pool = await BrowserPool(reuse_host_contexts=True).start()
+        try:
+            first = await pool.new_context("http://a.example/form?p=1")
+            await pool.release(first)
+            again = await pool.new_context("http://a.example/form?p=2")
+            parallel = await pool.new_context("http://a.example/form?p=3")
+            other = await pool.new_context("http://b.example/form")
+            assert again is first  # nosec
+            assert parallel is not first and other is not first  # nosec
+            assert pool.contexts_reused == 1  # nosec
+            await pool.release(again)
+            fresh = await pool.new_context("http://a.example/form?p=4", reuse=False)
+            assert fresh is not first and pool.contexts_reused == 1  # nosec
+            await pool.release(fresh)
+            assert pool._idle["a.example"] == [first]  # nosec
+        finally:
+            await pool.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+# Unit tests for the streaming result sinks (temporary files, no browser)
+import sys
+import os
+import json
+import sqlite3
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import AttemptRecord
+from results import JsonlResultSink, ResultRecorder, SqliteResultSink
+from tracing import tracer
+
+
+def make_attempt(status: str) -> AttemptRecord:
+    attempt = AttemptRecord(run_id="run-1", url="http://localhost/form", region="US", status=status)
+    with tracer.span("goto", attempt):
+        pass
+    return attempt
+
+
+# Each record lands in both sinks as soon as it is written, and files are appended across runs
+def test_records_are_streamed_to_jsonl_and_sqlite(tmp_path) -> None:
+    jsonl_path = str(tmp_path / "attempts.jsonl")
+    sqlite_path = str(tmp_path / "attempts.sqlite")
+
+    for status in ["success", "submission_error"]:
+        recorder = ResultRecorder([JsonlResultSink(jsonl_path), SqliteResultSink(sqlite_path)])
+        recorder.write(make_attempt(status))
+        recorder.close()
+
+    with open(jsonl_path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["status"] for line in lines] == ["success", "submission_error"]  # nosec
+    assert "goto" in lines[0]["timings_ms"]  # nosec
+
+    db = sqlite3.connect(sqlite_path)
+    rows = db.execute("SELECT status FROM attempts WHERE run_id = 'run-1'").fetchall()
+    db.close()
+    assert sorted(r[0] for r in rows) == ["submission_error", "success"]  # nosec
+
+
+# A database created before the pay_type/kind columns existed is upgraded in place
+def test_sqlite_sink_adds_new_columns(tmp_path) -> None:
+    sqlite_path = str(tmp_path / "attempts.sqlite")
+    db = sqlite3.connect(sqlite_path)
+    db.execute(
+        "CREATE TABLE attempts (run_id TEXT NOT NULL, url TEXT NOT NULL, region TEXT NOT NULL,"
+        " status TEXT NOT NULL, error TEXT, term TEXT, worker TEXT, started_at REAL NOT NULL,"
+        " duration_ms REAL NOT NULL, timings_ms TEXT NOT NULL)"
+    )
+    db.close()
+
+    sink = SqliteResultSink(sqlite_path)
+    attempt = make_attempt("success")
+    attempt.pay_type = "cds_pay_type=2 (Visa)"
+    attempt.kind = "combination"
+    sink.write(attempt)
+    sink.close()
+
+    db = sqlite3.connect(sqlite_path)
+    row = db.execute("SELECT pay_type, kind FROM attempts").fetchone()
+    db.close()
+    assert row == ("cds_pay_type=2 (Visa)", "combination")  # nosec
+
+
+# Rows are written by a background thread in batches; close() commits whatever is still queued
+def test_sqlite_sink_batches_commits(tmp_path) -> None:
+    sqlite_path = str(tmp_path / "attempts.sqlite")
+    sink = SqliteResultSink(sqlite_path, batch_size=50)
+    for n in range(230):
+        attempt = make_attempt("success")
+        attempt.url = f"http://localhost/form/{n}"
+        sink.write(attempt)
+    sink.close()
+    assert sink.written == 230 and 5 <= sink.batches <= 230  # nosec  (at most 50 rows per commit)
+
+    db = sqlite3.connect(sqlite_path)
+    urls = [row[0] for row in db.execute("SELECT url FROM attempts ORDER BY rowid")]
+    db.close()
+    assert urls == [f"http://localhost/form/{n}" for n in range(230)]  # nosec
@@ -0,0 +1,134 @@
+# Unit tests for failure classification, retry planning, the circuit breaker and the engine's
+# retry loop (inspect_url_pooled is replaced by a fake, so no browser is needed)
+import sys
+import os
+import asyncio
+from typing import Dict, List
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import discover_fields
+from data_models import AttemptRecord
+from deadline import WATCHDOG_ERROR, Deadline, DeadlineExceeded
+from run_services import RunServices
+from scheduler import CircuitBreaker, RetryPolicy, WorkUnit, classify_failure, plan_retries
+
+
+def attempt(region: str, status: str, error: str = "") -> AttemptRecord:
+    return AttemptRecord(
+        url="http://gw.example/form", region=region, status=status, error=error or None
+    )
+
+
+def test_classify_failure() -> None:
+    assert classify_failure(attempt("US", "success")) is None  # nosec
+    assert classify_failure(None) == "transient"  # nosec
+    assert classify_failure(attempt("US", "error", "Timeout 5000ms exceeded")) == "transient"  # nosec
+    mismatch = attempt("US", "submission_error", "Country does not match the selected term")
+    assert classify_failure(mismatch) == "country_mismatch"  # nosec
+    assert classify_failure(attempt("US", "incomplete", "ZIP field not found")) == "missing_field"  # nosec
+    assert classify_failure(attempt("US", "submission_error", "Card declined")) == "hard"  # nosec
+
+
+# A region that used up its time budget (step timeout or watchdog) gets another pass, unless the
+# order was already sent
+def test_deadline_exceeded_is_transient() -> None:
+    try:
+        Deadline(0).timeout(1000)
+    except DeadlineExceeded as e:
+        out_of_budget = attempt("US", "error", str(e))
+    cancelled = attempt("CAN", "error", f"{WATCHDOG_ERROR}: 20000 ms region budget")
+    assert classify_failure(out_of_budget) == "transient"  # nosec
+    assert classify_failure(cancelled) == "transient"  # nosec
+    cancelled.timings_ms = {"submit": 30.0}
+    assert classify_failure(cancelled) == "hard"  # nosec
+
+
+# Once the order was sent nothing is retried, however transient the error text looks
+def test_submitted_attempts_are_final() -> None:
+    timed_out = attempt("US", "error", "locator.inner_text: Timeout 5000ms exceeded")
+    timed_out.timings_ms = {"goto": 800.0, "submit": 120.0, "result_check": 5000.0}
+    assert classify_failure(timed_out) == "hard"  # nosec
+    error_page = attempt("CAN", "submission_error", "Connection to the bank timed out")
+    error_page.timings_ms = {"submit": 95.0}
+    assert classify_failure(error_page) == "hard"  # nosec
+    # Before the click the same error is retried
+    assert classify_failure(attempt("US", "error", "Timeout 5000ms exceeded")) == "transient"  # nosec
+
+    unit = WorkUnit(index=0, url="http://gw.example/form", regions=["US", "CAN"])
+    attempts = {"US": timed_out, "CAN": error_page}
+    assert plan_retries(unit, attempts, RetryPolicy(max_attempts=3)) == []  # nosec
+
+
+# Country mismatches go again at once with the next term; transient failures after a backoff
+def test_plan_retries() -> None:
+    unit = WorkUnit(index=0, url="http://gw.example/form", regions=["US", "CAN", "INTL"])
+    attempts = {
+        "US": attempt("US", "submission_error", "Country does not match"),
+        "CAN": attempt("CAN", "error", "net::ERR_CONNECTION_RESET"),
+        "INTL": attempt("INTL", "submission_error", "Card declined"),
+    }
+    plans = plan_retries(unit, attempts, RetryPolicy(max_attempts=2, base_delay=1, max_delay=1))
+    assert [(p.regions, p.term_indexes, p.tries) for _, p in plans] == [  # nosec
+        (["US"], {"US": 1}, 0),
+        (["CAN"], {"CAN": 0}, 1),
+    ]
+    assert plans[0][0] == 0.0 and 0 <= plans[1][0] <= 1  # nosec
+
+    # The second pass used up the transient budget
+    assert plan_retries(plans[1][1], {"CAN": attempts["CAN"]}, RetryPolicy(max_attempts=2)) == []  # nosec
+
+
+def test_circuit_breaker_opens_and_half_opens() -> None:
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=60, clock=lambda: now[0])
+    assert breaker.record_failure("gw") is False  # nosec
+    assert breaker.record_failure("gw") is True  # nosec
+    assert breaker.allow("gw") is False and breaker.allow("other") is True  # nosec
+
+    now[0] = 61.0
+    assert breaker.allow("gw") is True  # nosec  (one trial)
+    assert breaker.record_failure("gw") is True  # nosec  (trial failed: open again)
+    now[0] = 122.0
+    assert breaker.allow("gw") is True  # nosec
+    breaker.record_success("gw")
+    assert breaker.open_hosts() == []  # nosec
+
+
+# The engine re-queues failed regions and reports each URL once, after its last pass
+def test_engine_retries_failed_regions(monkeypatch, fake_pool) -> None:
+    calls: List[Dict] = []
+
+    async def fake_inspect(pool, url, parallel_regions, services, regions, term_indexes):
+        calls.append({"regions": list(regions), "term_indexes": dict(term_indexes)})
+        results = {}
+        for region in regions:
+            if region == "US" and not term_indexes.get("US"):
+                results[region] = attempt(region, "submission_error", "Country does not match")
+            elif region == "CAN" and len(calls) == 1:
+                continue  # Page never loaded for CAN on the first pass
+            else:
+                results[region] = attempt(region, "success")
+        return results
+
+    monkeypatch.setattr(discover_fields, "inspect_url_pooled", fake_inspect)
+    services = RunServices(retry=RetryPolicy(max_attempts=3, base_delay=0, max_delay=0))
+    finished = []
+
+    results = asyncio.run(
+        discover_fields.run_discovery_stream_async(
+            ["http://gw.example/form"],
+            concurrency=2,
+            pool=fake_pool,
+            services=services,
+            on_result=lambda index, url, summary: finished.append(url),
+        )
+    )
+
+    assert results == {
+        "http://gw.example/form": {"US": "Tested", "CAN": "Tested", "INTL": "Tested"}
+    }  # nosec
+    assert finished == ["http://gw.example/form"]  # nosec
+    assert {"regions": ["US"], "term_indexes": {"US": 1}} in calls  # nosec
+    assert {"regions": ["CAN"], "term_indexes": {"CAN": 0}} in calls  # nosec
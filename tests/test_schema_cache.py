@@ -0,0 +1,65 @@
+# Unit tests for the on-disk form schema cache (uses a temporary SQLite file, no browser)
+import sys
+import os
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import FieldInfo, FormSchema
+from schema_cache import SchemaCache, page_key
+
+URL = "https://admin.buysub.com/servlet/OrdersGateway?cds_mag_code=CSI&cds_page_id=283316"
+
+
+# Simple controllable clock so TTL tests don't need to sleep
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_schema(url: str) -> FormSchema:
+    return FormSchema(url=url, fields=[FieldInfo(name="cds_name", tag="input", type="text")])
+
+
+# The key comes from cds_mag_code and cds_page_id, whatever the gateway path or extra params
+def test_page_key() -> None:
+    assert page_key(URL) == ("CSI", "283316")  # nosec
+    assert page_key(URL.replace("OrdersGateway", "GiftsGateway") + "&x=1") == ("CSI", "283316")  # nosec
+    assert page_key("https://admin.buysub.com/servlet/OrdersGateway") is None  # nosec
+
+
+# A stored schema comes back until its TTL runs out
+def test_get_respects_ttl(tmp_path) -> None:
+    clock = FakeClock()
+    cache = SchemaCache(str(tmp_path / "cache.sqlite"), ttl_seconds=60, clock=clock)
+    cache.put(URL, make_schema(URL))
+
+    assert cache.get(URL).has("cds_name")  # nosec
+    clock.now += 61
+    assert cache.get(URL) is None  # nosec
+    cache.close()
+
+
+# Above max_entries the least recently used page is evicted
+def test_size_eviction_drops_least_recently_used(tmp_path) -> None:
+    clock = FakeClock()
+    cache = SchemaCache(
+        str(tmp_path / "cache.sqlite"), ttl_seconds=3600, max_entries=2, clock=clock
+    )
+    urls = [URL.replace("283316", str(n)) for n in range(3)]
+
+    cache.put(urls[0], make_schema(urls[0]))
+    clock.now += 1
+    cache.put(urls[1], make_schema(urls[1]))
+    clock.now += 1
+    cache.get(urls[0])  # Touch page 0 so page 1 becomes the least recently used
+    clock.now += 1
+    cache.put(urls[2], make_schema(urls[2]))
+
+    assert len(cache) == 2  # nosec
+    assert cache.get(urls[1]) is None  # nosec
+    assert cache.get(urls[0]) is not None  # nosec
+    cache.close()
@@ -0,0 +1,83 @@
+# Unit tests for the ordered merge of sharded runs. The worker processes are replaced by threads
+# running a fake shard that speaks the same queue protocol, so no browser or process is needed.
+import sys
+import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, List
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import sharding
+from network_profile import NetworkProfile
+
+URLS = [f"http://gw.example/form/{n}" for n in range(30)]
+
+
+# Stands in for multiprocessing's "spawn" context: plain queues, threads instead of processes
+class InProcessContext:
+    Queue = queue.Queue
+
+    @staticmethod
+    def Process(target, args, name) -> threading.Thread:
+        return threading.Thread(target=target, args=args, name=name, daemon=True)
+
+
+# Fake shard: takes URLs from the shared queue and answers each after a random delay, so results
+# reach the main process out of order
+def make_fake_shard(handled: List[int], lock: threading.Lock):
+    def fake_shard(task_queue, result_queue, log_queue, *args) -> None:
+        rng = random.Random(threading.current_thread().name)
+        counts: Dict[str, int] = {}
+        pending = []
+        for index, url in iter(task_queue.get, None):
+            with lock:
+                handled.append(index)
+            pending.append((index, url))
+            if len(pending) == 3 or rng.random() < 0.3:
+                rng.shuffle(pending)
+                for done_index, done_url in pending:
+                    time.sleep(rng.random() / 500)
+                    region = "Tested" if done_index % 2 else "Skipped"
+                    summary = {"US": region, "CAN": "Tested", "INTL": "Tested", "url": done_url}
+                    result_queue.put(("result", done_index, summary))
+                    counts["success"] = counts.get("success", 0) + 1
+                pending = []
+        for done_index, done_url in pending:
+            summary = {"US": "Tested", "CAN": "Tested", "INTL": "Tested", "url": done_url}
+            result_queue.put(("result", done_index, summary))
+            counts["success"] = counts.get("success", 0) + 1
+        finals = {"success": 3 * counts.get("success", 0)}  # One final status per region
+        result_queue.put(("done", [], {}, counts, finals))
+
+    return fake_shard
+
+
+# Results come back from several shards in any order, but the report follows the input order
+# and every URL was run (and reported) exactly once
+def test_sharded_results_are_merged_in_order(monkeypatch) -> None:
+    handled: List[int] = []
+    monkeypatch.setattr(sharding.multiprocessing, "get_context", lambda method: InProcessContext)
+    monkeypatch.setattr(sharding, "_shard_worker", make_fake_shard(handled, threading.Lock()))
+    status_counts: Dict[str, int] = {}
+    final_counts: Dict[str, int] = {}
+
+    report = sharding.run_sharded(
+        (url for url in URLS),  # A stream, like a file or stdin
+        processes=3,
+        concurrency=2,
+        parallel_regions=False,
+        network_profile=NetworkProfile(enabled=False),
+        status_counts=status_counts,
+        final_counts=final_counts,
+    )
+
+    assert list(report) == URLS  # nosec
+    assert all(summary["url"] == url for url, summary in report.items())  # nosec
+    assert sorted(handled) == list(range(len(URLS)))  # nosec  (no URL run twice or lost)
+    assert status_counts == {"success": len(URLS)}  # nosec
+    assert final_counts == {"success": 3 * len(URLS)}  # nosec
+    assert report[URLS[1]]["US"] == "Tested" and report[URLS[2]]["US"] == "Skipped"  # nosec
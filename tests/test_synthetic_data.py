@@ -0,0 +1,80 @@
+# Unit tests for the synthetic test data pools (no browser needed)
+import sys
+import os
+import re
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import AttemptRecord
+from discover_fields import region_test_data
+from gateway_stub import StubPage, render_form
+from prescreen import parse_static_form
+from protocol_submit import build_post_body
+from run_services import RunServices
+from synthetic_data import TestDataPool, US_PLACES
+
+URL = "http://127.0.0.1/servlet/OrdersGateway?cds_mag_code=STUB&cds_page_id=1"
+
+
+# Every pooled address passes normal validation and has the region's postal format
+def test_pool_addresses_are_valid() -> None:
+    pool = TestDataPool(size=300, seed="run-1")
+    pool.validate()
+    zip3 = {code: prefix for code, _, prefix in US_PLACES}
+    for address in pool.addresses("US"):
+        assert re.fullmatch(r"\d{5}", address.zip) and address.zip[:3] == zip3[address.state]  # nosec
+    for address in pool.addresses("CAN"):
+        assert re.fullmatch(r"[A-Z]\d[A-Z]\d[A-Z]\d", address.zip)  # nosec
+        assert address.country == "Canada"  # nosec
+    for address in pool.addresses("INTL"):
+        assert address.postal and address.state is None  # nosec
+    emails = [a.email for region in ("US", "CAN", "INTL") for a in pool.addresses(region)]
+    assert len(set(emails)) == len(emails) >= 900  # nosec
+    assert all(e.startswith("me+") and e.endswith("@home.com") for e in emails)  # nosec
+
+
+# Same seed -> same data; different seeds (runs/processes) -> different emails
+def test_pool_seeding() -> None:
+    first = TestDataPool(size=30, seed="a").take("US")
+    assert first.buyer == TestDataPool(size=30, seed="a").take("US").buyer  # nosec
+    assert first.buyer.email != TestDataPool(size=30, seed="b").take("US").buyer.email  # nosec
+
+
+# take() follows the page's dropdowns, and the POST body builder accepts what it hands out
+def test_take_matches_page_options() -> None:
+    pool = TestDataPool(size=200, seed="run-1")
+    schema = parse_static_form(render_form(StubPage(countries="all", gift=True)), URL)
+    seen = set()
+    for _ in range(20):
+        for region, allowed in (("US", {"IA", "IL"}), ("CAN", {"ON", "QC"})):
+            test_data = pool.take(region, term_index=0, schema=schema)
+            assert test_data.buyer.state in allowed  # nosec
+            assert test_data.donee.state in allowed  # nosec
+            body, reason = build_post_body(schema, test_data, AttemptRecord(url=URL, region=region))
+            assert reason is None, reason  # nosec
+        intl = pool.take("INTL", term_index=0, schema=schema)
+        assert intl.buyer.country in {"United Kingdom", "France", "Germany"}  # nosec
+        seen.add(intl.buyer.email)
+    assert len(seen) == 20  # nosec  (no address handed out twice)
+    assert pool.handed_out == 60  # nosec
+
+    # No dropdown on the page: any pooled state, and no donee for non-gift pages
+    test_data = pool.take("US", term_index=2, is_gift_page=False)
+    assert test_data.term_index == 2 and test_data.donee is None  # nosec
+
+
+# Pools cycle when a run needs more tests than they hold
+def test_pool_cycles() -> None:
+    pool = TestDataPool(size=1, seed="run-1")
+    emails = [pool.take("INTL", is_gift_page=False).buyer.email for _ in range(20)]
+    assert len(set(emails)) == 8  # nosec  (one address per INTL country)
+
+
+# Without a pool the engine keeps make_test_data's fixed addresses
+def test_region_test_data_fallback() -> None:
+    schema = parse_static_form(render_form(StubPage(countries="all")), URL)
+    fixed = region_test_data(RunServices(), "US", 1, schema)
+    assert fixed.buyer.name == "Dan Ross" and fixed.term_index == 1  # nosec
+    pooled = region_test_data(RunServices(test_data=TestDataPool(10, "x")), "US", 1, schema)
+    assert pooled.buyer.state in {"IA", "IL"} and pooled.term_index == 1  # nosec
@@ -0,0 +1,47 @@
+# Unit tests for the span API and its trace/percentile output (no browser needed)
+import sys
+import os
+import json
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from data_models import AttemptRecord
+from tracing import Tracer, percentile
+
+
+# Nearest-rank percentiles on a sorted list
+def test_percentile() -> None:
+    values = [float(n) for n in range(1, 101)]
+    assert percentile(values, 50) == 50.0  # nosec
+    assert percentile(values, 99) == 99.0  # nosec
+    assert percentile([], 95) == 0.0  # nosec
+
+
+# Disabled tracer still times attempts for the result records, but keeps no trace events
+def test_disabled_tracer_only_fills_attempt_timings() -> None:
+    tracer = Tracer()
+    attempt = AttemptRecord(url="http://localhost/form", region="US")
+    with tracer.span("goto", attempt):
+        pass
+    with tracer.span("untracked"):
+        pass
+    assert "goto" in attempt.timings_ms  # nosec
+    assert tracer.events == []  # nosec
+
+
+# Enabled tracer exports Chrome "complete" events with URL/region args
+def test_enabled_tracer_exports_chrome_trace(tmp_path) -> None:
+    tracer = Tracer()
+    tracer.configure(enabled=True)
+    attempt = AttemptRecord(url="http://localhost/form", region="CAN")
+    for _ in range(3):
+        with tracer.span("submit", attempt):
+            pass
+
+    path = tmp_path / "trace.json"
+    tracer.export(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    assert [e["ph"] for e in events] == ["X", "X", "X"]  # nosec
+    assert events[0]["args"] == {"url": "http://localhost/form", "region": "CAN"}  # nosec
+    assert tracer.summary_lines()[0].startswith("submit")  # nosec
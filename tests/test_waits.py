@@ -0,0 +1,126 @@
+# Unit tests for the condition-based waits (a fake page evaluates the conditions, so no browser
+# is needed)
+import sys
+import os
+import asyncio
+import time
+from typing import Any, Callable, Dict, List
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Add the parent directory to sys.path so imports work when running pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from waits import (
+    DOM_QUIET_JS,
+    OPTIONS_JS,
+    VISIBLE_JS,
+    wait_for_dom_quiet,
+    wait_for_donee_reveal,
+    wait_for_options,
+    wait_for_postal_field,
+    wait_for_visible,
+)
+
+
+# Page whose elements show up / get their options after a delay, polled like wait_for_function
+class FakePage:
+    def __init__(self, visible_after: Dict[str, float], options_after: Dict[str, float]) -> None:
+        self.start = time.monotonic()
+        self.visible_after = visible_after  # Selector -> seconds until it is rendered
+        self.options_after = options_after  # Selector -> seconds until the dropdown is filled
+        self.dom_settles = True
+        self.waited_for: List[Any] = []
+
+    def _ready(self, delays: Dict[str, float], selector: str) -> bool:
+        return selector in delays and time.monotonic() - self.start >= delays[selector]
+
+    async def wait_for_function(self, script: str, arg: Any, timeout: float) -> None:
+        conditions: Dict[str, Callable[[], bool]] = {
+            VISIBLE_JS: lambda: self._ready(self.visible_after, arg),
+            OPTIONS_JS: lambda: self._ready(self.options_after, arg[0]),
+        }
+        self.waited_for.append(arg)
+        end = time.monotonic() + timeout / 1000
+        while not conditions[script]():
+            if time.monotonic() >= end:
+                raise PlaywrightTimeoutError(f"Timeout {timeout:.0f}ms exceeded.")
+            await asyncio.sleep(0.005)
+
+    async def evaluate(self, script: str, arg: Any) -> bool:
+        assert script == DOM_QUIET_JS  # nosec
+        quiet_ms, timeout_ms = arg
+        await asyncio.sleep(min(quiet_ms, timeout_ms) / 1000)
+        return self.dom_settles
+
+
+# Each wait returns True as soon as its condition holds, well before the timeout
+def test_waits_succeed_early() -> None:
+    page = FakePage({'[name="cds_zip"]': 0.02}, {'[name="cds_state"]': 0.02})
+
+    async def run():
+        start = time.monotonic()
+        results = [
+            await wait_for_visible(page, '[name="cds_zip"]', 2000),
+            await wait_for_options(page, '[name="cds_state"]', 2000),
+            await wait_for_dom_quiet(page, 2000, quiet_ms=10),
+        ]
+        return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == [True, True, True] and elapsed < 1  # nosec
+    assert page.waited_for[1] == ['[name="cds_state"]', 2]  # nosec  (placeholder + one option)
+
+
+# On timeout the helpers return False instead of raising (like the old fixed sleeps)
+def test_waits_time_out_quietly() -> None:
+    page = FakePage({}, {})
+    page.dom_settles = False
+
+    async def run():
+        start = time.monotonic()
+        results = [
+            await wait_for_visible(page, '[name="cds_zip"]', 50),
+            await wait_for_options(page, '[name="cds_state"]', 50, min_options=5),
+            await wait_for_dom_quiet(page, 50),
+        ]
+        return results, time.monotonic() - start
+
+    results, elapsed = asyncio.run(run())
+    assert results == [False, False, False] and elapsed < 1  # nosec
+
+
+# The donee wait looks for the name field itself; the postal wait picks the region's field
+def test_reveal_and_postal_waits() -> None:
+    page = FakePage({'[name="cds_donee1_name"]': 0.01, '[name="cds_zip"]': 0.01}, {})
+
+    async def run():
+        return [
+            await wait_for_donee_reveal(page, 500),
+            await wait_for_postal_field(page, "US", 500),
+            await wait_for_postal_field(page, "INTL", 50),  # No visible cds_postal: times out
+        ]
+
+    assert asyncio.run(run()) == [True, True, False]  # nosec
+    assert page.waited_for == [  # nosec
+        '[name="cds_donee1_name"]',
+        '[name="cds_zip"]',
+        'input[name="cds_postal"]:not([type="hidden"])',
+    ]
+
+
+# A donee block revealed from a setTimeout after the DOM has gone quiet is still waited for;
+# a term without gift fields just costs the timeout
+def test_donee_reveal_waits_for_delayed_fields() -> None:
+    delayed = FakePage({'[name="cds_donee1_name"]': 0.3}, {})
+    no_gift = FakePage({}, {})
+
+    async def run():
+        start = time.monotonic()
+        revealed = await wait_for_donee_reveal(delayed, 1000)
+        elapsed = time.monotonic() - start
+        return revealed, elapsed, await wait_for_donee_reveal(no_gift, 100)
+
+    revealed, elapsed, missing = asyncio.run(run())
+    assert revealed is True and 0.3 <= elapsed < 1  # nosec
+    assert missing is False  # nosec
@@ -0,0 +1,150 @@
+# Lightweight span API for per-phase timing.
+#   with tracer.span("goto", attempt, url=url, region=region):
+#       await page.goto(url)
+# A span always adds its wall time to attempt.timings_ms (that feeds the result records).
+# When tracing is enabled it is also kept as a Chrome trace event ("X" complete event, open the
+# exported file in chrome://tracing or https://ui.perfetto.dev) and as a sample for the
+# p50/p95/p99 summary logged at the end of the run. When tracing is disabled and no attempt is
+# passed, span() hands back one shared no-op object, so instrumented code pays almost nothing.
+#
+# Like the logging module, there is one module-level `tracer` per process.
+import asyncio
+import json
+import logging
+import math
+import os
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional
+
+from data_models import AttemptRecord
+
+# Shared do-nothing span for the disabled path
+_NO_SPAN = nullcontext()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attempt", "args", "start")
+
+    def __init__(
+        self, tracer: "Tracer", name: str, attempt: Optional[AttemptRecord], args: Dict[str, Any]
+    ) -> None:
+        self.tracer = tracer
+        self.name = name
+        self.attempt = attempt
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        end = time.perf_counter()
+        elapsed_ms = (end - self.start) * 1000
+        if self.attempt is not None:
+            timings = self.attempt.timings_ms
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed_ms
+        if self.tracer.enabled:
+            self.tracer._add(self.name, self.start, end, self.args)
+
+
+class Tracer:
+    def __init__(self) -> None:
+        self.enabled = False
+        self.events: List[Dict[str, Any]] = []
+        self.samples: Dict[str, List[float]] = {}  # Phase name -> durations in ms
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()  # Wall clock keeps merged worker traces aligned
+        self._task_ids: Dict[int, int] = {}  # asyncio task -> small "thread" id for the trace
+
+    # Turns tracing on or off and clears anything collected so far
+    def configure(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self.events = []
+        self.samples = {}
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+        self._task_ids = {}
+
+    def span(self, name: str, attempt: Optional[AttemptRecord] = None, **args: Any) -> Any:
+        if not self.enabled and attempt is None:
+            return _NO_SPAN
+        if attempt is not None and "url" not in args:
+            args["url"] = attempt.url
+            args["region"] = attempt.region
+        return _Span(self, name, attempt, args)
+
+    def _add(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        args: Dict[str, Any],
+    ) -> None:
+        # Each asyncio task (one URL/region worker) becomes its own row in the trace viewer
+        try:
+            task_key = id(asyncio.current_task())
+        except RuntimeError:
+            task_key = 0
+        tid = self._task_ids.setdefault(task_key, len(self._task_ids) + 1)
+        self.events.append(
+            {
+                "name": name,
+                "cat": "phase",
+                "ph": "X",
+                "ts": (self._wall_origin + start - self._origin) * 1e6,  # Microseconds
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": args,
+            }
+        )
+        self.samples.setdefault(name, []).append((end - start) * 1000)
+
+    # Adds events/samples collected by another process (sharded workers)
+    def merge(self, events: List[Dict[str, Any]], samples: Dict[str, List[float]]) -> None:
+        self.events.extend(events)
+        for name, values in samples.items():
+            self.samples.setdefault(name, []).extend(values)
+
+    # Writes the Chrome trace-event JSON file
+    def export(self, path: str) -> None:
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+    # One line per phase: count, p50, p95, p99 and max (milliseconds)
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for name, values in sorted(self.samples.items()):
+            ordered = sorted(values)
+            lines.append(
+                f"{name:<20} n={len(ordered):<6} "
+                f"p50={percentile(ordered, 50):8.1f}  p95={percentile(ordered, 95):8.1f}  "
+                f"p99={percentile(ordered, 99):8.1f}  max={ordered[-1]:8.1f} ms"
+            )
+        return lines
+
+    # Exports the trace (if a path is given) and logs the percentile summary
+    def finish(self, path: str) -> None:
+        if not self.enabled:
+            return
+        if path:
+            self.export(path)
+            logging.info(f"Chrome trace written to {path} ({len(self.events)} spans)")
+        logging.info("Phase timing summary:")
+        for line in self.summary_lines():
+            logging.info(f"  {line}")
+
+
+# Nearest-rank percentile of an already sorted list
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+# The process-wide tracer used by run_discovery and fill_form
+tracer = Tracer()
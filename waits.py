@@ -0,0 +1,94 @@
+# Condition-based waits used by fill_form instead of fixed wait_for_timeout sleeps.
+# Every helper returns as soon as the DOM is ready and treats its timeout as an upper bound:
+# on timeout it returns False instead of raising, so callers behave like the old sleeps did.
+from playwright.async_api import Page
+
+
+# True when the first element matching the selector is rendered (same rule as the snapshot)
+VISIBLE_JS = """
+(selector) => {
+    const el = document.querySelector(selector);
+    if (!el) return false;
+    const rect = el.getBoundingClientRect();
+    return (rect.width > 0 || rect.height > 0)
+        && window.getComputedStyle(el).visibility !== "hidden";
+}
+"""
+
+# True when the first <select> matching the selector has at least `minOptions` options
+OPTIONS_JS = """
+([selector, minOptions]) => {
+    const el = document.querySelector(selector);
+    return !!el && el.options && el.options.length >= minOptions;
+}
+"""
+
+# Resolves once the document has gone `quietMs` without any DOM mutation (or after `timeoutMs`).
+# Used when there is no specific field to wait for but the page may still be inserting markup.
+DOM_QUIET_JS = """
+([quietMs, timeoutMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    let hardTimer = null;
+    const done = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(hardTimer);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => done(true), quietMs);
+    });
+    observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true,
+    });
+    quietTimer = setTimeout(() => done(true), quietMs);
+    hardTimer = setTimeout(() => done(false), timeoutMs);
+})
+"""
+
+
+# Waits until the selector's first match is visible. Returns False if it never shows up in time.
+async def wait_for_visible(page: Page, selector: str, timeout_ms: float) -> bool:
+    try:
+        await page.wait_for_function(VISIBLE_JS, arg=selector, timeout=timeout_ms)
+        return True
+    except Exception:
+        return False
+
+
+# Waits until a dropdown is populated (by default: more than a single placeholder option)
+async def wait_for_options(
+    page: Page, selector: str, timeout_ms: float, min_options: int = 2
+) -> bool:
+    try:
+        await page.wait_for_function(OPTIONS_JS, arg=[selector, min_options], timeout=timeout_ms)
+        return True
+    except Exception:
+        return False
+
+
+# Waits until the DOM stops changing for quiet_ms, bounded by timeout_ms
+async def wait_for_dom_quiet(page: Page, timeout_ms: float, quiet_ms: float = 50) -> bool:
+    try:
+        return bool(await page.evaluate(DOM_QUIET_JS, [quiet_ms, timeout_ms]))
+    except Exception:
+        return False
+
+
+# After a gift term is picked, waits for the donee block to be revealed.
+# Gateways reveal it from a setTimeout as often as synchronously, and the snapshot may not know
+# the field yet, so always wait for the donee name field itself rather than for the DOM to settle.
+# A timeout means the term has no gift fields.
+async def wait_for_donee_reveal(page: Page, timeout_ms: float) -> bool:
+    return await wait_for_visible(page, '[name="cds_donee1_name"]', timeout_ms)
+
+
+# After the buyer country changes, waits for the region's postal field to appear.
+# INTL forms use cds_postal; US/CAN forms use cds_zip.
+async def wait_for_postal_field(page: Page, region: str, timeout_ms: float) -> bool:
+    if region == "INTL":
+        selector = 'input[name="cds_postal"]:not([type="hidden"])'
+    else:
+        selector = '[name="cds_zip"]'
+    return await wait_for_visible(page, selector, timeout_ms)